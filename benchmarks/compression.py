@@ -0,0 +1,122 @@
+"""
+Benchmark of the compression of the uploaded rover and base files
+
+The test files of the repository (replicated to a realistic size) are
+compressed with the available encodings and levels. The CPU time spent and
+the bytes saved are reported, along with the resulting upload time for
+several link speeds. Since the compression is streamed along with the upload,
+the upload time is bounded by the slowest of both. Note that the ratios of
+files smaller than the compression window (e.g. the smartphone log) are
+overestimated, since their replicas are compressed as back-references.
+
+A real submission to the local stand-in server (see test.server) with
+and without compression is also timed.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.compression --repeat 200
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from jason_gnss import compression, jason
+
+from test.server import StandInServer
+
+FILES = [
+    ('RINEX rover', os.path.join('test', 'jason_gnss_test_file_rover.txt')),
+    ('RINEX base', os.path.join('test', 'jason_gnss_test_file_base.txt')),
+    ('Smartphone log', os.path.join('test', 'jason_gnss_test_file_smartphone.txt'))
+]
+
+LEVELS = {compression.GZIP: [1, 6, 9], compression.ZSTD: [1, 3, 10]}
+
+LINK_SPEEDS_MBPS = [1, 10, 100, 1000]
+
+# ------------------------------------------------------------------------------
+
+def build_file(filename, output_filename, repeat):
+
+    with open(filename, 'rb') as fh:
+        content = fh.read()
+
+    with open(output_filename, 'wb') as fh:
+        for _ in range(repeat):
+            fh.write(content)
+
+    return output_filename
+
+
+def run(name, filename):
+
+    size = os.path.getsize(filename)
+
+    sys.stdout.write('{} ({:.1f} MB)\n'.format(name, size / 1e6))
+    sys.stdout.write('    {:<10} {:>9} {:>8} {:>8}'.format('encoding', 'size MB', 'ratio', 'CPU s'))
+    sys.stdout.write(''.join('  {:>7}'.format('{}Mb/s'.format(s)) for s in LINK_SPEEDS_MBPS) + '\n')
+
+    sys.stdout.write('    {:<10} {:9.2f} {:8.1f} {:8.3f}'.format('none', size / 1e6, 1.0, 0.0))
+    sys.stdout.write(''.join('  {:7.2f}'.format(size * 8 / (s * 1e6)) for s in LINK_SPEEDS_MBPS) + '\n')
+
+    for encoding in compression.get_available():
+        for level in LEVELS[encoding]:
+            with open(filename, 'rb') as fh:
+                tic = time.process_time()
+                compressed_size = sum(len(c) for c in compression.compress_stream(fh, encoding, level=level))
+                cpu_time = time.process_time() - tic
+
+            upload_times = [max(cpu_time, compressed_size * 8 / (s * 1e6)) for s in LINK_SPEEDS_MBPS]
+
+            sys.stdout.write('    {:<10} {:9.2f} {:8.1f} {:8.3f}'.format(
+                             '{}-{}'.format(encoding, level), compressed_size / 1e6, size / compressed_size, cpu_time))
+            sys.stdout.write(''.join('  {:7.2f}'.format(t) for t in upload_times) + '\n')
+
+    sys.stdout.write('\n')
+
+
+def run_submission(filename):
+
+    os.environ.setdefault('JASON_API_KEY', 'stand-in')
+    os.environ.setdefault('JASON_SECRET_TOKEN', 'stand-in')
+
+    capabilities = ['compression:{}'.format(e) for e in compression.get_available()]
+
+    with StandInServer(capabilities=capabilities) as server:
+        jason.API_URL = server.api_url
+
+        sys.stdout.write('Submission to the local stand-in server ({:.1f} MB rover file)\n'.format(
+                         os.path.getsize(filename) / 1e6))
+
+        for encoding in ['none'] + compression.get_available():
+            tic = time.time()
+            cpu_tic = time.process_time()
+            ret, _ = jason.submit_process(filename, compression=encoding)
+            elapsed = time.time() - tic
+            cpu_time = time.process_time() - cpu_tic
+
+            sys.stdout.write('    {:<10} uploaded {:8.2f} MB in {:7.3f} s ({:.3f} s CPU)\n'.format(
+                             encoding, server.processes[ret['id']]['size'] / 1e6, elapsed, cpu_time))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--repeat', type=int, default=200, help='Number of times the test files are replicated')
+    args = argParser.parse_args()
+
+    sys.stdout.write('Upload time (s) of the compressed files by link speed\n\n')
+
+    folder = tempfile.mkdtemp()
+    try:
+        for name, filename in FILES:
+            output_filename = os.path.join(folder, os.path.basename(filename))
+            run(name, build_file(filename, output_filename, args.repeat))
+
+        run_submission(os.path.join(folder, os.path.basename(FILES[0][1])))
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,76 @@
+"""
+Benchmark of the client-side decimation of high rate rover files
+
+Synthetic high rate files are built from the 1 Hz test files of the
+repository (epochs are replicated at fractional seconds) and decimated back
+to the requested rate. The bytes saved and the CPU time spent decimating are
+reported, along with the upload time saved for several link speeds.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.decimation --input_rate 20 --output_rate 1
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from jason_gnss import decimation, rinex
+
+from test.helpers import build_high_rate_rinex, build_high_rate_ubx
+
+RINEX_FILE = os.path.join('test', 'jason_gnss_test_file_rover.txt')
+UBX_FILE = os.path.join('test', 'ubx_with_tim_tp.ubx')
+
+LINK_SPEEDS_MBPS = [1, 10, 100]
+
+# ------------------------------------------------------------------------------
+
+def run(name, filename, output_rate):
+
+    size = os.path.getsize(filename)
+
+    tic = time.process_time()
+    output_filename = decimation.decimate(filename, output_rate)
+    cpu_time = time.process_time() - tic
+
+    decimated_size = os.path.getsize(output_filename)
+    rinex.remove(output_filename)
+
+    saved = size - decimated_size
+
+    sys.stdout.write('{}\n'.format(name))
+    sys.stdout.write('    input size        {:12d} bytes\n'.format(size))
+    sys.stdout.write('    decimated size    {:12d} bytes ({:.1f}% saved)\n'.format(
+                     decimated_size, 100.0 * saved / size))
+    sys.stdout.write('    decimation time   {:12.3f} s CPU ({:.1f} MB/s)\n'.format(
+                     cpu_time, size / 1.0e6 / max(cpu_time, 1e-9)))
+
+    for speed in LINK_SPEEDS_MBPS:
+        upload_time_saved = saved * 8 / (speed * 1.0e6)
+        sys.stdout.write('    upload time saved {:12.3f} s at {} Mbit/s (net {:.3f} s)\n'.format(
+                         upload_time_saved, speed, upload_time_saved - cpu_time))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--input_rate', type=int, default=20, help='Rate (Hz) of the synthetic rover files')
+    argParser.add_argument('--output_rate', type=float, default=1.0, help='Decimation rate (Hz)')
+    argParser.add_argument('--repeat', type=int, default=5, help='Number of times the test files are replicated')
+    args = argParser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        rinex_file = os.path.join(folder, 'rover.obs')
+        build_high_rate_rinex(RINEX_FILE, rinex_file, args.input_rate, repeat=args.repeat)
+        run('RINEX {} Hz -> {} Hz'.format(args.input_rate, args.output_rate), rinex_file, args.output_rate)
+
+        ubx_file = os.path.join(folder, 'rover.ubx')
+        build_high_rate_ubx(UBX_FILE, ubx_file, args.input_rate, repeat=args.repeat)
+        run('UBX {} Hz -> {} Hz'.format(args.input_rate, args.output_rate), ubx_file, args.output_rate)
+    finally:
+        shutil.rmtree(folder)
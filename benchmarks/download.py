@@ -0,0 +1,81 @@
+"""
+Benchmark of the segmented download of results bundles
+
+A results bundle is served by the local stand-in server (see
+test.server) with a throughput cap per connection, which emulates the
+bandwidth of a single connection through a wide area network. The bundle is
+downloaded with an increasing number of connections and the throughput and
+speedup with respect to a single stream are reported, as well as the
+download with a server that does not support Range requests.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.download --bundle_size 200 --connection_rate 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from jason_gnss import download
+
+from test.server import StandInServer
+
+CONNECTIONS = [1, 2, 4, 8]
+
+# ------------------------------------------------------------------------------
+
+def run(url, filename, connections, segment_size, verify=True):
+
+    tic = time.time()
+    download.download(url, filename, connections=connections, segment_size=segment_size, verify=verify)
+    elapsed = time.time() - tic
+
+    size = os.path.getsize(filename)
+    os.remove(filename)
+
+    return elapsed, size
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--bundle_size', type=float, default=200, help='Size (MB) of the results bundle')
+    argParser.add_argument('--connection_rate', type=float, default=20,
+                           help='Maximum throughput (MB/s) of each connection (0 for no limit)')
+    argParser.add_argument('--segment_size', type=float, default=16, help='Size (MB) of the segments')
+    args = argParser.parse_args()
+
+    segment_size = int(args.segment_size * 1024 * 1024)
+    connection_rate = args.connection_rate * 1e6 if args.connection_rate else None
+
+    folder = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(folder, 'results.zip')
+
+        with StandInServer(bundle_size=int(args.bundle_size * 1e6), connection_rate=connection_rate) as server:
+
+            sys.stdout.write('Bundle of {:.1f} MB, {} per connection\n'.format(
+                             os.path.getsize(server.bundle_file) / 1e6,
+                             '{:.1f} MB/s'.format(args.connection_rate) if connection_rate else 'no limit'))
+
+            baseline = None
+            for connections in CONNECTIONS:
+                elapsed, size = run(server.results_url, filename, connections, segment_size)
+                baseline = baseline or elapsed
+                sys.stdout.write('    {} connection(s)   {:8.3f} s {:8.1f} MB/s (speedup {:.2f}x)\n'.format(
+                                 connections, elapsed, size / 1e6 / elapsed, baseline / elapsed))
+
+            elapsed, size = run(server.results_url, filename, CONNECTIONS[-1], segment_size, verify=False)
+            sys.stdout.write('    {} connections, not verified {:8.3f} s {:8.1f} MB/s\n'.format(
+                             CONNECTIONS[-1], elapsed, size / 1e6 / elapsed))
+
+            server.range_requests = False
+            elapsed, size = run(server.results_url, filename, CONNECTIONS[-1], segment_size)
+            sys.stdout.write('    no Range support   {:8.3f} s {:8.1f} MB/s (single stream fallback)\n'.format(
+                             elapsed, size / 1e6 / elapsed))
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,105 @@
+"""
+Benchmark of the geotagging of images with the trajectory of a results file
+
+A synthetic 10 Hz trajectory and a folder with copies of a test image (with
+their timestamps in the camera metadata file, as generated when submitting a
+process with images) are built. The time spent interpolating the positions
+and writing the sidecar CSV and, optionally, the GPS EXIF tags is reported.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.geotag --images 10000 --exif
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from jason_gnss import geotag
+
+IMAGE_FILE = os.path.join('test', 'data', 'exif', 'DJI_0001_small.JPG')
+
+START = datetime.datetime(2020, 3, 10, 12, 44, 13)
+GPS_WEEK = 2096
+GPS_UTC_OFFSET_S = 18
+
+TRAJECTORY_RATE_HZ = 10
+
+# ------------------------------------------------------------------------------
+
+def build_results_file(filename, duration):
+    """
+    Build a results bundle with a trajectory of the given duration (seconds)
+    that starts at START
+    """
+
+    sow_0 = (START - datetime.datetime(1980, 1, 6)).total_seconds() % 604800 + GPS_UTC_OFFSET_S
+
+    rows = ['{},{:.1f},{:.9f},{:.9f},{:.3f}\n'.format(
+            GPS_WEEK, sow_0 + i / float(TRAJECTORY_RATE_HZ), 41.0 + i * 1e-6, 2.0 + i * 1e-6, 100.0)
+            for i in range(int(duration * TRAJECTORY_RATE_HZ) + 1)]
+
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('trajectory.csv', '#week,sow,latitude(deg),longitude(deg),height(m)\n' + ''.join(rows))
+
+
+def build_images_folder(folder, n_images, interval):
+    """
+    Build a folder with copies of a test image, taken every `interval`
+    seconds from START
+    """
+
+    os.makedirs(folder)
+
+    tags = {}
+    for i in range(n_images):
+        name = 'IMG_{:05d}.JPG'.format(i)
+        shutil.copyfile(IMAGE_FILE, os.path.join(folder, name))
+
+        epoch = START + datetime.timedelta(seconds=i * interval)
+        tags[name] = {
+            geotag.DATETIME_TAG: epoch.strftime('%Y:%m:%d %H:%M:%S'),
+            geotag.SUBSEC_TAG: '{:03d}'.format(epoch.microsecond // 1000)
+        }
+
+    with open(os.path.join(folder, geotag.CAMERA_METADATA_FILENAME), 'w') as fh:
+        json.dump(tags, fh)
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--images', type=int, default=10000, help='Number of images')
+    argParser.add_argument('--interval', type=float, default=0.5, help='Time (seconds) between images')
+    argParser.add_argument('--exif', action='store_true', help='Write the GPS EXIF tags (requires piexif)')
+    argParser.add_argument('--workers', type=int, default=None, help='Number of processes writing EXIF tags')
+    args = argParser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        results_file = os.path.join(folder, 'results.zip')
+        images_folder = os.path.join(folder, 'images')
+
+        build_results_file(results_file, args.images * args.interval + 1)
+        build_images_folder(images_folder, args.images, args.interval)
+
+        tic = time.time()
+        output_filename = geotag.geotag(results_file, images_folder, write_exif=args.exif,
+                                        max_workers=args.workers)
+        elapsed = time.time() - tic
+
+        with open(output_filename, 'r') as fh:
+            n_tagged = sum(1 for line in fh if not line.endswith(',,,\n')) - 1
+
+        sys.stdout.write('Geotagged {} of {} images{}\n'.format(
+                         n_tagged, args.images, ' (CSV and EXIF tags)' if args.exif else ' (CSV)'))
+        sys.stdout.write('    elapsed time {:10.3f} s ({:.0f} images/s)\n'.format(
+                         elapsed, args.images / max(elapsed, 1e-9)))
+    finally:
+        shutil.rmtree(folder)
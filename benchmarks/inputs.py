@@ -0,0 +1,197 @@
+"""
+Benchmark of the reads of the input files of the submissions (see
+jason_gnss.inputs)
+
+A rover file is submitted (uncompressed) to the local stand-in server (see
+test.server), running in a separate process so that only the CPU of the
+client is measured, with:
+- read: the files are read through file objects, once to compute their
+  checksum and again (whole, by the multipart encoder of requests) to upload
+  them
+- mmap: the submission of the SDK, which streams the memory mapped files and
+  computes their checksum along, in a single pass
+
+and reports, per GB submitted, the bytes copied from the files into Python
+buffers (further copies, e.g. by the multipart encoder, are not counted),
+the CPU time of the client and the peak of the memory allocated by
+Python.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.inputs --upload_size 500
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from jason_gnss import inputs, jason
+
+from benchmarks.transport import build_file
+
+# ------------------------------------------------------------------------------
+
+class CountingFile(object):
+    """
+    File object that counts the bytes read from it
+    """
+
+    def __init__(self, filename):
+
+        self.fh = open(filename, 'rb')
+        self.bytes_copied = 0
+
+    def read(self, size=-1):
+
+        data = self.fh.read(size)
+        self.bytes_copied += len(data)
+
+        return data
+
+    def close(self):
+
+        self.fh.close()
+
+
+class CountingInputFile(inputs.InputFile):
+    """
+    Input file that keeps track of its instances
+    """
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        CountingInputFile.instances.append(self)
+
+# ------------------------------------------------------------------------------
+
+def submit_read(filename):
+    """
+    Submission reading the file through file objects (checksum and upload)
+
+    :return: Bytes copied from the file
+    """
+
+    if not os.path.isfile(filename):
+        raise IOError('Missing file')
+
+    checksum_fh = CountingFile(filename)
+    hasher = hashlib.sha256()
+    while True:
+        data = checksum_fh.read(inputs.CHUNK_SIZE)
+        if not data:
+            break
+        hasher.update(data)
+    checksum_fh.close()
+
+    api_key, secret_token = jason.__fetch_credentials__(None, None)
+    fh = CountingFile(filename)
+    files = {'type': (None, 'GNSS'), 'token': (None, secret_token), 'rover_file': (filename, fh)}
+    try:
+        r = jason.__request__('post', '{}/processes'.format(jason.API_URL), upload=True,
+                              headers=jason.__build_headers__(api_key), files=files)
+    finally:
+        fh.close()
+
+    assert r.status_code == 200
+
+    return checksum_fh.bytes_copied + fh.bytes_copied
+
+
+def submit_mmap(filename):
+    """
+    Submission of the SDK (memory mapped input files)
+
+    :return: Bytes copied from the file
+    """
+
+    CountingInputFile.instances = []
+
+    ret, status_code = jason.submit_process(filename, compression='none')
+    assert status_code == 200
+
+    return sum(fh.bytes_copied for fh in CountingInputFile.instances)
+
+
+def measure(function, filename):
+
+    tic = time.time()
+    cpu = time.process_time()
+    bytes_copied = function(filename)
+    cpu = time.process_time() - cpu
+    elapsed = time.time() - tic
+
+    tracemalloc.start()
+    try:
+        function(filename)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    gigabytes = os.path.getsize(filename) / 1e9
+
+    return bytes_copied / gigabytes / 1e9, cpu / gigabytes, os.path.getsize(filename) / 1e6 / elapsed, peak / 1e6
+
+
+def start_server():
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    server = subprocess.Popen([sys.executable, '-m', 'test.server', '--port', str(port), '--bundle_size', '0.1',
+                               '--processing_time', '0'], stdout=subprocess.DEVNULL)
+
+    api_url = 'http://127.0.0.1:{}/api'.format(port)
+    jason.API_URL = api_url
+
+    for _ in range(100):
+        try:
+            jason.api_status()
+            break
+        except Exception:
+            time.sleep(0.1)
+
+    return server
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--upload_size', type=float, default=200, help='Size (MB) of the submitted rover file')
+    args = argParser.parse_args()
+
+    os.environ.setdefault('JASON_API_KEY', 'stand-in')
+    os.environ.setdefault('JASON_SECRET_TOKEN', 'stand-in')
+
+    inputs.InputFile = CountingInputFile
+
+    folder = tempfile.mkdtemp()
+    server = start_server()
+    try:
+        filename = build_file(os.path.join(folder, 'rover.obs'), args.upload_size * 1e6)
+
+        # Connections are established (and the file cached) before measuring
+        submit_mmap(filename)
+
+        sys.stdout.write('Submission of {:.1f} MB (uncompressed)\n\n'.format(os.path.getsize(filename) / 1e6))
+        sys.stdout.write('{:<8} {:>16} {:>14} {:>12} {:>10}\n'.format(
+                         'reads', 'copied GB/GB', 'CPU s/GB', 'MB/s', 'peak MB'))
+
+        for name, function in (('read', submit_read), ('mmap', submit_mmap)):
+            copied, cpu, throughput, peak = measure(function, filename)
+            sys.stdout.write('{:<8} {:>16.2f} {:>14.2f} {:>12.1f} {:>10.1f}\n'.format(
+                             name, copied, cpu, throughput, peak))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(folder)
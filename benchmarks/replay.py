@@ -0,0 +1,97 @@
+"""
+Replay of the traffic recorded by the SDK (see jason_gnss.tracing)
+
+The replay has two parts:
+
+- ReplayServer: a stand-in of the API (see test.server) that answers
+  as recorded in the trace. Each process submitted to it follows the status
+  transitions of one of the recorded processes (in turns), the listings of
+  processes and the API status are the recorded ones, the response times are
+  sampled from the recorded ones and the results bundle has the size of the
+  recorded downloads. Time runs `speed` times faster than in the trace.
+  SDK-based services can be load tested offline against it.
+- replay: issues the requests of the trace through the SDK `speed` times
+  faster, with `concurrency` copies of the trace running at the same time
+  (each one with the concurrency of the recorded traffic). Uploads use
+  filler files of the recorded size. The response times by kind of request
+  are reported.
+
+Usage (from the root of the repository):
+
+    # Record the traffic of a service based on the SDK
+    JASON_TRACE=traffic.jsonl.gz python my_service.py
+
+    # Serve the recorded behavior 10 times faster, e.g. to run the service
+    # against it (JASON_API_URL=http://localhost:8080/api)
+    python -m benchmarks.replay traffic.jsonl.gz --serve --port 8080 --speed 10
+
+    # Replay the recorded traffic 100 times faster, 20 copies at a time
+    python -m benchmarks.replay traffic.jsonl.gz --speed 100 --concurrency 20
+"""
+import argparse
+import os
+import sys
+import time
+
+from jason_gnss import tracing
+
+from test.replay import ReplayServer, replay
+
+# ------------------------------------------------------------------------------
+
+def report(records, stats, elapsed, speed, concurrency):
+
+    recorded_time = max(r['t'] + r['duration'] for r in records) if records else 0.0
+
+    sys.stdout.write('Replayed {} requests x {} copies at {}x ({:.1f} s recorded, {:.1f} s replayed)\n\n'.format(
+                     len(records), concurrency, speed, recorded_time, elapsed))
+    sys.stdout.write('{:<12} {:>8} {:>8} {:>8} {:>10} {:>10} {:>10}\n'.format(
+                     'kind', 'count', 'errors', 'skipped', 'p50 ms', 'p95 ms', 'max ms'))
+
+    for kind in sorted(stats):
+        times = sorted(stats[kind]['times'])
+        percentiles = [times[min(len(times) - 1, int(q * len(times)))] * 1e3 if times else float('nan')
+                       for q in (0.5, 0.95, 1.0)]
+        sys.stdout.write('{:<12} {:>8} {:>8} {:>8} {:>10.1f} {:>10.1f} {:>10.1f}\n'.format(
+                         kind, len(times), stats[kind]['errors'], stats[kind]['skipped'], *percentiles))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('trace', help='Trace file (see jason_gnss.tracing)')
+    argParser.add_argument('--speed', type=float, default=1.0, help='Speedup of the recorded timings (1 to 100)')
+    argParser.add_argument('--concurrency', type=int, default=1, help='Number of copies of the trace replayed at a time')
+    argParser.add_argument('--serve', action='store_true', help='Only serve the recorded behavior')
+    argParser.add_argument('--port', type=int, default=8080, help='Port of the server (with --serve)')
+    argParser.add_argument('--api_url', default=None,
+                           help='Replay against this API instead of a local replay server')
+    args = argParser.parse_args()
+
+    if not 1 <= args.speed <= 100:
+        argParser.error('The speed must be between 1 and 100')
+
+    records = tracing.load(args.trace)
+
+    os.environ.setdefault('JASON_API_KEY', 'replay')
+    os.environ.setdefault('JASON_SECRET_TOKEN', 'replay')
+
+    if args.serve:
+        server = ReplayServer(records, speed=args.speed, port=args.port)
+        print('Replay server listening at {}'.format(server.api_url))
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+    elif args.api_url:
+        tic = time.time()
+        stats = replay(records, args.api_url, speed=args.speed, concurrency=args.concurrency)
+        report(records, stats, time.time() - tic, args.speed, args.concurrency)
+    else:
+        with ReplayServer(records, speed=args.speed) as server:
+            tic = time.time()
+            stats = replay(records, server.api_url, speed=args.speed, concurrency=args.concurrency)
+            report(records, stats, time.time() - tic, args.speed, args.concurrency)
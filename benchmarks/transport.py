@@ -0,0 +1,137 @@
+"""
+Benchmark of the HTTP transports of the SDK (see jason_gnss.transport)
+
+Each available transport is used against the local stand-in server (see
+test.server) to measure:
+- Polling: requests per second of the status of a process (without the status
+  cache) issued by several threads
+- Upload: throughput of the submission of a large rover file (uncompressed)
+- Memory: peak of the memory allocated by Python during the upload (the
+  transports that read the whole multipart body into memory need at least
+  the size of the file) and during the polling
+
+Note that the stand-in server is a Python server running in the same process,
+so the absolute figures are bounded by it; the relative ones are what matters.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.transport --threads 16 --requests 2000 --upload_size 200
+"""
+import argparse
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from jason_gnss import jason, transport
+
+from test.server import StandInServer
+
+ROVER_FILE = os.path.join('test', 'jason_gnss_test_file_rover.txt')
+
+# ------------------------------------------------------------------------------
+
+def build_file(filename, size):
+
+    with open(ROVER_FILE, 'rb') as fh:
+        content = fh.read()
+
+    with open(filename, 'wb') as fh:
+        for _ in range(max(1, int(size / len(content)))):
+            fh.write(content)
+
+    return filename
+
+
+def poll(process_id, threads, n_requests):
+
+    def worker(n):
+        for _ in range(n):
+            _, status_code = jason.get_status(process_id, use_cache=False)
+            assert status_code == 200
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        tic = time.time()
+        list(executor.map(worker, [n_requests // threads] * threads))
+        elapsed = time.time() - tic
+
+    return (n_requests // threads) * threads / elapsed
+
+
+def upload(filename):
+
+    tic = time.time()
+    ret, status_code = jason.submit_process(filename, compression='none')
+    elapsed = time.time() - tic
+
+    assert status_code == 200
+
+    return os.path.getsize(filename) / 1e6 / elapsed
+
+
+def measure_memory(function, *args):
+
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak / 1e6
+
+
+def run(name, filename, threads, n_requests):
+
+    transport.configure(name)
+
+    # Connections are established before the measurements
+    ret, _ = jason.submit_process(ROVER_FILE, compression='none')
+    process_id = ret['id']
+    poll(process_id, threads, threads)
+
+    qps = poll(process_id, threads, n_requests)
+    throughput = upload(filename)
+
+    polling_memory = measure_memory(poll, process_id, threads, min(n_requests, 20 * threads))
+    upload_memory = measure_memory(upload, filename)
+
+    sys.stdout.write('{:<10} {:>12.0f} {:>14.1f} {:>14.2f} {:>14.2f}\n'.format(
+                     name, qps, throughput, polling_memory, upload_memory))
+
+    transport.get().close()
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--threads', type=int, default=16, help='Number of polling threads')
+    argParser.add_argument('--requests', type=int, default=2000, help='Number of status requests')
+    argParser.add_argument('--upload_size', type=float, default=100, help='Size (MB) of the uploaded rover file')
+    argParser.add_argument('--transports', nargs='+', default=transport.get_available(),
+                           help='Transports to compare (by default, all the available ones)')
+    args = argParser.parse_args()
+
+    os.environ.setdefault('JASON_API_KEY', 'stand-in')
+    os.environ.setdefault('JASON_SECRET_TOKEN', 'stand-in')
+
+    folder = tempfile.mkdtemp()
+    try:
+        filename = build_file(os.path.join(folder, 'rover.obs'), args.upload_size * 1e6)
+
+        with StandInServer() as server:
+            jason.API_URL = server.api_url
+
+            sys.stdout.write('Polling with {} threads, upload of {:.1f} MB\n\n'.format(
+                             args.threads, os.path.getsize(filename) / 1e6))
+            sys.stdout.write('{:<10} {:>12} {:>14} {:>14} {:>14}\n'.format(
+                             'transport', 'polling QPS', 'upload MB/s', 'poll peak MB', 'upload peak MB'))
+
+            for name in args.transports:
+                run(name, filename, args.threads, args.requests)
+    finally:
+        shutil.rmtree(folder)
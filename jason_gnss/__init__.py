@@ -11,3 +11,13 @@ class InvalidResponse(Exception):
     def __init__(self, message):
 
         super().__init__(message)
+
+class ProcessError(Exception):
+    def __init__(self, message):
+
+        super().__init__(message)
+
+class DeadlineExceeded(Exception):
+    def __init__(self, message):
+
+        super().__init__(message)
@@ -0,0 +1,150 @@
+"""
+Cache of the status of the processes
+
+- Status are cached for a short time (TTL), defined by the JASON_STATUS_TTL
+  environment variable or the `configure` function
+- Concurrent lookups of the same process share a single request to the API
+  (single-flight)
+- Terminal status (FINISHED, ERROR) are cached for a longer time, defined by
+  the JASON_TERMINAL_STATUS_TTL environment variable or the `configure`
+  function, as the URLs of the results may be signed and expire. Entries can
+  also be dropped (`invalidate`), e.g. when the download of the results fails
+- Expired entries are revalidated with conditional requests (If-None-Match)
+  when the API provides an ETag
+"""
+import collections
+import concurrent.futures
+import copy
+import os
+import threading
+import time
+
+DEFAULT_TTL_S = 1.0
+
+DEFAULT_TERMINAL_TTL_S = 600.0
+
+# Maximum number of processes kept in the cache
+MAX_ENTRIES = 1024
+
+TERMINAL_STATUS = ('FINISHED', 'ERROR')
+
+CacheEntry = collections.namedtuple('CacheEntry', ['timestamp', 'status', 'etag', 'terminal'])
+
+# ------------------------------------------------------------------------------
+
+class StatusCache(object):
+
+    def __init__(self, ttl=DEFAULT_TTL_S, terminal_ttl=DEFAULT_TERMINAL_TTL_S, max_entries=MAX_ENTRIES):
+
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Get the status of a process
+
+        :param key: Key that identifies the process (and the credentials used
+                    to access it)
+        :param fetch: Callable that queries the API. It receives the ETag of
+                    the cached status (or None) and returns a tuple with the
+                    status (None if not modified), the HTTP status code and
+                    the ETag of the response
+        :return: Tuple with the status and the HTTP status code
+        """
+
+        with self.lock:
+            entry = self.entries.get(key, None)
+
+            ttl = self.terminal_ttl if entry and entry.terminal else self.ttl
+            if entry and time.time() - entry.timestamp < ttl:
+                self.entries.move_to_end(key)
+                return copy.deepcopy(entry.status), 200
+
+            future = self.in_flight.get(key, None)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self.in_flight[key] = future
+
+        if not leader:
+            status, status_code = future.result()
+            return copy.deepcopy(status), status_code
+
+        try:
+            result = self.__fetch__(key, entry, fetch)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+        return copy.deepcopy(result[0]), result[1]
+
+    def invalidate(self, key):
+        """
+        Drop the cached status of a process
+        """
+
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+
+        with self.lock:
+            self.entries.clear()
+
+    def __fetch__(self, key, entry, fetch):
+
+        status, status_code, etag = fetch(entry.etag if entry else None)
+
+        if status_code == 304 and entry:
+            status, status_code, etag = entry.status, 200, entry.etag
+
+        if status_code == 200:
+            terminal = status.get('process', {}).get('status', None) in TERMINAL_STATUS
+            with self.lock:
+                self.entries[key] = CacheEntry(time.time(), status, etag, terminal)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+        return status, status_code
+
+# ------------------------------------------------------------------------------
+
+def configure(ttl=DEFAULT_TTL_S, terminal_ttl=DEFAULT_TERMINAL_TTL_S):
+    """
+    Set the time (in seconds) that the status of a process is cached. Use 0
+    to always query the API for non terminal status (concurrent lookups are
+    still coalesced). Terminal status are cached for `terminal_ttl`
+    """
+
+    global __cache__
+
+    __cache__ = StatusCache(ttl=ttl, terminal_ttl=terminal_ttl)
+
+
+def get_status(key, fetch):
+    """
+    Get the status of a process from the cache (see StatusCache.get)
+    """
+
+    return __cache__.get(key, fetch)
+
+
+def invalidate(key):
+    """
+    Drop the cached status of a process (see StatusCache.invalidate)
+    """
+
+    __cache__.invalidate(key)
+
+
+__cache__ = StatusCache(ttl=float(os.getenv('JASON_STATUS_TTL', DEFAULT_TTL_S)),
+                        terminal_ttl=float(os.getenv('JASON_TERMINAL_STATUS_TTL', DEFAULT_TERMINAL_TTL_S)))
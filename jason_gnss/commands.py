@@ -1,22 +1,63 @@
+import collections
+import concurrent.futures
+import os
 import sys
-import time
+import uuid
+import zipfile
 import jason_gnss.exif as exif
 
+import requests
+
 from roktools import logger
 
-from . import jason
+from . import decimation, geotag as geotagging, inputs, jason, journal, rinex, scheduler, segmentation, tenants
+from . import DeadlineExceeded
+from .deadline import Deadline
+
+DEFAULT_TRIM_MARGIN_S = 300
+DEFAULT_SEGMENT_OVERLAP_S = 120
 
-def process(rover_file, process_type="GNSS", base_file=None, base_lonlathgt=None, images_folder=None, timeout=None, **kwargs):
+MAX_RESUME_WORKERS = 8
+MAX_SEGMENT_WORKERS = 8
+
+def process(rover_file, process_type="GNSS", base_file=None, base_lonlathgt=None, images_folder=None, timeout=None,
+            segment_length=None, segment_overlap=DEFAULT_SEGMENT_OVERLAP_S, **kwargs):
     """
     Submit a process to Jason and wait for it to end so that the results file
     is also download
+
+    :param segment_length: If provided, the rover file (RINEX) is split into
+                    segments of this length (in seconds) that are processed
+                    in parallel and whose results are merged afterwards
+    :param segment_overlap: Time (in seconds) that consecutive segments overlap
+    :param timeout: Maximum time (in seconds) to submit the process, wait for
+                    it to end and download its results
+    :param tenant: Name of the tenant (see the tenants module) on whose behalf
+                    the process is submitted, passed with the rest of keyword
+                    arguments
     """
 
     logger.info('Process file [ {} ]'.format(rover_file))
     logger.debug('Timeout  {}'.format(timeout))
 
-    process_id = submit(rover_file, process_type=process_type, 
-                 base_file=base_file, base_lonlathgt=base_lonlathgt, images_folder=images_folder, **kwargs)
+    # A single deadline for the upload, the polling and the download (of all
+    # the segments)
+    deadline = Deadline(float(timeout) if timeout else None)
+
+    if segment_length and process_type == "GNSS":
+        segment_files = segmentation.split(rover_file, float(segment_length), overlap=float(segment_overlap))
+        if segment_files:
+            return __process_segments__(segment_files, base_file=base_file, base_lonlathgt=base_lonlathgt,
+                                        images_folder=images_folder, deadline=deadline, **kwargs)
+        logger.warning('Rover file [ {} ] will be processed as a single segment'.format(rover_file))
+
+    try:
+        process_id = submit(rover_file, process_type=process_type, base_file=base_file,
+                            base_lonlathgt=base_lonlathgt, images_folder=images_folder, deadline=deadline,
+                            record=True, **kwargs)
+    except (DeadlineExceeded, requests.exceptions.Timeout) as e:
+        logger.critical('Time Out! Could not submit [ {} ]: {}'.format(rover_file, e))
+        return None
 
     if process_id is None:
         logger.critical('Could not submit [ {} ] for processing'.format(rover_file))
@@ -24,43 +65,18 @@ def process(rover_file, process_type="GNSS", base_file=None, base_lonlathgt=None
     
     logger.info('Submitted process with ID {}'.format(process_id))
 
-    start_time = time.time()
-    spinner = __spinning_cursor__()
-    while True:
-
-        process_status = status(process_id)
-        logger.debug('Processing status {}'.format(process_status))
-
-        if process_status == 'FINISHED':
-            logger.info('Completed process with ID {}'.format(process_id))
-            return download(process_id)
-        elif process_status == 'ERROR':
-            logger.critical('An unexpected error occurred in the task!')
-            return None
-
-        # Spinner
-        sys.stderr.write(next(spinner))
-        sys.stderr.flush()
-        time.sleep(1)
-        sys.stderr.write('\b')
-
-        if (timeout and time.time() - start_time > timeout):
-            logger.critical("Time Out! The process did not end in " +
-                            "[ {} ] seconds, ".format(timeout) +
-                            "but might be available for download at a later stage.")
-            return None
-
+    return __wait_and_download__(process_id, deadline=deadline, tenant=kwargs.get('tenant', None))
 
 # ------------------------------------------------------------------------------
 
-def status(process_id, **kwargs):
+def status(process_id, deadline=None, tenant=None, **kwargs):
     """
     Get the status of the given process_id
     """
 
     res = None
     
-    ret, return_code = jason.get_status(process_id)
+    ret, return_code = jason.get_status(process_id, deadline=deadline, tenant=tenant)
 
     logger.debug('Return code {}'.format(ret))
     if return_code == 200:
@@ -70,36 +86,96 @@ def status(process_id, **kwargs):
 
 # ------------------------------------------------------------------------------
 
-def submit(rover_file, process_type="GNSS", base_file=None, base_lonlathgt=None, images_folder=None, **kwargs):
+def submit(rover_file, **kwargs):
     """
     Submit a process to the server without waiting for it to end
+
+    :param camera_metadata_file: Already generated camera metadata file (used
+                    if no images_folder is provided)
+    :param trim_base: Upload only the part of the base file (RINEX) that
+                    covers the time span of the rover file (RINEX)
+    :param trim_margin: Margin (in seconds) added to both ends of the rover
+                    time span when trimming the base file
+    :param decimate: Rate (in Hz) to which the rover file (RINEX or UBX) is
+                    decimated before being uploaded
+    :param record: Record the submission in the journal. Only the processes
+                    that are waited for are recorded, so that `resume` does
+                    not download the ones that were only submitted
+    :return: The ID of the process, None if it was not submitted
+    """
+
+    return __submit__(rover_file, **kwargs)[0]
+
+
+def __submit__(rover_file, process_type="GNSS", base_file=None, base_lonlathgt=None, images_folder=None,
+               trim_base=False, trim_margin=DEFAULT_TRIM_MARGIN_S, decimate=None, camera_metadata_file=None,
+               record=False, **kwargs):
+    """
+    Submit a process (see submit)
+
+    :return: Tuple with the ID of the process (None if it was not submitted)
+             and the HTTP status code of the submission (None if it was not
+             issued, e.g. missing files)
     """
 
     res = None
-    camera_metadata_file = None
+    trimmed_base_file = None
+    decimated_rover_file = None
 
     if images_folder:
         camera_metadata_file = exif.get_exif_tags_file(images_folder=images_folder)
         if camera_metadata_file is None:
             logger.critical('It was not possible to generate the camera metadata file.')
 
-    ret, return_code = jason.submit_process(rover_file,
-                        process_type=process_type, base_file=base_file,
-                        base_lonlathgt=base_lonlathgt, camera_metadata_file=camera_metadata_file, **kwargs)
+    if base_file and trim_base:
+        trimmed_base_file = rinex.trim_to_span(base_file, rover_file, margin=float(trim_margin))
+        if trimmed_base_file is None:
+            logger.warning('Base file [ {} ] could not be trimmed, it will be uploaded whole'.format(base_file))
+
+    if decimate:
+        decimated_rover_file = decimation.decimate(rover_file, decimate)
+        if decimated_rover_file is None:
+            logger.warning('Rover file [ {} ] could not be decimated, it will be uploaded whole'.format(rover_file))
+
+    try:
+        ret, return_code = jason.submit_process(decimated_rover_file or rover_file,
+                            process_type=process_type, base_file=trimmed_base_file or base_file,
+                            base_lonlathgt=base_lonlathgt, camera_metadata_file=camera_metadata_file, **kwargs)
+    finally:
+        if trimmed_base_file:
+            rinex.remove(trimmed_base_file)
+        if decimated_rover_file:
+            rinex.remove(decimated_rover_file)
+
+    if return_code is not None and return_code != 200:
+        logger.critical('Submission of [ {} ] rejected (HTTP {}): {}'.format(rover_file, return_code, ret))
 
     if return_code == 200:
         res =  ret['id']
+        if record:
+            # Checksums of the files recorded, which are not computed again if
+            # uploaded unchanged (i.e. not decimated or trimmed)
+            checksums = {}
+            for name, filename in (('rover_checksum', rover_file), ('base_checksum', base_file)):
+                if filename and os.path.isfile(filename):
+                    checksums[name] = inputs.get_checksum(filename)
+            journal.record(res, journal.SUBMITTED, rover_file=rover_file, base_file=base_file,
+                           label=kwargs.get('label', None), tenant=tenants.get_name(kwargs.get('tenant', None)),
+                           **checksums)
         
-    return res
+    return res, return_code
 
 # ------------------------------------------------------------------------------
 
-def download(process_id, **_):
+def download(process_id, deadline=None, connections=None, tenant=None, **_):
     """
     Download the results for the given process_id
+
+    :param connections: Number of concurrent connections used to download the
+                    results in segments
     """
 
-    filename = jason.download_results(process_id)
+    filename = jason.download_results(process_id, deadline=deadline, connections=connections, tenant=tenant)
 
     logger.info('Results file [ {} ] for process id [ {} ] downloaded\n'.format(filename, process_id))
 
@@ -107,12 +183,12 @@ def download(process_id, **_):
 
 # ------------------------------------------------------------------------------
 
-def list_processes(user_only=True, **_):
+def list_processes(user_only=True, tenant=None, **_):
     """
     List the processes issued by the user
     """
 
-    processes = jason.list_processes(user_only=user_only)
+    processes = jason.list_processes(user_only=user_only, tenant=tenant)
 
     res = None
 
@@ -134,12 +210,229 @@ def list_processes(user_only=True, **_):
 
 # ------------------------------------------------------------------------------
 
+def resume(timeout=None, **_):
+    """
+    Resume the unfinished processes recorded in the journal: wait for them to
+    end and download (and merge, for segmented processes) their results
+    """
+
+    unfinished = journal.get_unfinished()
+    if not unfinished:
+        logger.info('No unfinished processes in the journal [ {} ]'.format(journal.JOURNAL_FILE))
+        return None
+
+    pending = [e['process_id'] for e in unfinished if e['state'] != journal.DOWNLOADED]
+    logger.info('Resuming processes {}'.format(pending))
+
+    process_tenants = {e['process_id']: e.get('tenant', None) for e in unfinished}
+
+    def resume_process(process_id):
+        return __wait_and_download__(process_id, timeout=timeout, spinner=False,
+                                     tenant=process_tenants[process_id])
+
+    results_files = []
+    if pending:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(pending), MAX_RESUME_WORKERS)) as executor:
+            results_files = list(executor.map(resume_process, pending))
+
+    groups = collections.OrderedDict.fromkeys(e['group'] for e in unfinished if 'group' in e)
+    segments = set(e['process_id'] for e in unfinished if 'group' in e)
+
+    results_files = [f for f, process_id in zip(results_files, pending) if f and process_id not in segments]
+
+    for group in groups:
+        merged_file = __merge_segments__(group)
+        if merged_file:
+            results_files.append(merged_file)
+
+    return '\n'.join(results_files) if results_files else None
+
+# ------------------------------------------------------------------------------
+
+def enqueue(rover_file, project=scheduler.DEFAULT_PROJECT, priority=scheduler.DEFAULT_PRIORITY, **kwargs):
+    """
+    Add a process to the queue of the scheduler, to be submitted by `run_queue`
+    """
+
+    return scheduler.enqueue(rover_file, project=project, priority=priority, **kwargs)
+
+
+def run_queue(max_in_flight=scheduler.DEFAULT_MAX_IN_FLIGHT, keep_running=False, **_):
+    """
+    Submit the processes of the queue, with at most `max_in_flight` processes
+    running in the server at a time
+    """
+
+    jobs = scheduler.run(max_in_flight=max_in_flight, keep_running=keep_running)
+
+    results_files = [job['results_file'] for job in jobs if job['state'] == scheduler.DOWNLOADED]
+
+    return '\n'.join(results_files) if results_files else None
+
+
+def queue(**_):
+    """
+    List the jobs of the queue of the scheduler
+    """
+
+    fields = ['job_id', 'project', 'priority', 'state', 'process_id', 'rover_file']
+
+    jobs = scheduler.load().values()
+    if not jobs:
+        return None
+
+    res = '# {}\n'.format(','.join(fields))
+    for job in jobs:
+        res += ','.join(str(job.get(k, '')) for k in fields) + '\n'
+
+    return res
+
+# ------------------------------------------------------------------------------
+
+def geotag(results_file, images_folder, write_exif=False, time_offset=geotagging.DEFAULT_TIME_OFFSET_S, **_):
+    """
+    Geotag the images of a folder with the trajectory of a results file
+    """
+
+    return geotagging.geotag(results_file, images_folder, write_exif=write_exif, time_offset=time_offset)
+
+# ------------------------------------------------------------------------------
+
 def api_status():
 
     return jason.api_status()
 
 # ------------------------------------------------------------------------------
 
+def __wait_and_download__(process_id, timeout=None, deadline=None, spinner=True, tenant=None, **journal_info):
+
+    journal.record(process_id, journal.POLLING, **journal_info)
+
+    if deadline is None:
+        deadline = Deadline(float(timeout) if timeout else None)
+
+    cursor = __spinning_cursor__()
+    while True:
+
+        try:
+            process_status = status(process_id, deadline=deadline, tenant=tenant)
+        except requests.exceptions.Timeout as e:
+            logger.warning('Status request of process [ {} ] timed out: {}'.format(process_id, e))
+            process_status = None
+        except DeadlineExceeded:
+            process_status = None
+
+        logger.debug('Processing status {}'.format(process_status))
+
+        if process_status == 'FINISHED':
+            logger.info('Completed process with ID {}'.format(process_id))
+            journal.record(process_id, journal.FINISHED)
+
+            try:
+                results_file = download(process_id, deadline=deadline, tenant=tenant)
+            except (DeadlineExceeded, requests.exceptions.Timeout) as e:
+                logger.critical('Time Out! Results of process [ {} ] not downloaded: {}'.format(process_id, e))
+                return None
+
+            if results_file:
+                journal.record(process_id, journal.DOWNLOADED, results_file=results_file)
+            return results_file
+        elif process_status == 'ERROR':
+            logger.critical('An unexpected error occurred in the task!')
+            journal.record(process_id, journal.ERROR)
+            return None
+
+        if spinner:
+            sys.stderr.write(next(cursor))
+            sys.stderr.flush()
+        in_time = deadline.sleep(1)
+        if spinner:
+            sys.stderr.write('\b')
+
+        if not in_time:
+            logger.critical("Time Out! The process did not end in " +
+                            "[ {} ] seconds, ".format(deadline.timeout) +
+                            "but might be available for download at a later stage.")
+            return None
+
+# ------------------------------------------------------------------------------
+
+def __process_segments__(segment_files, images_folder=None, deadline=None, **kwargs):
+
+    # Camera metadata is generated only once for all segments
+    if images_folder:
+        kwargs['camera_metadata_file'] = exif.get_exif_tags_file(images_folder=images_folder)
+
+    # Segments are tracked as a group in the journal so that they can be
+    # merged when resumed
+    group = uuid.uuid4().hex
+
+    def process_segment(index):
+        segment_file = segment_files[index]
+        try:
+            process_id = submit(segment_file, deadline=deadline, record=True, **kwargs)
+        except (DeadlineExceeded, requests.exceptions.Timeout) as e:
+            logger.critical('Time Out! Could not submit segment [ {} ]: {}'.format(segment_file, e))
+            return None
+
+        if process_id is None:
+            logger.critical('Could not submit segment [ {} ] for processing'.format(segment_file))
+            return None
+
+        logger.info('Submitted segment [ {} ] with ID {}'.format(segment_file, process_id))
+        return __wait_and_download__(process_id, deadline=deadline, spinner=False, tenant=kwargs.get('tenant', None),
+                                     group=group, segment=index, segments=len(segment_files))
+
+    max_workers = min(len(segment_files), MAX_SEGMENT_WORKERS)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(process_segment, range(len(segment_files))))
+    finally:
+        rinex.remove(segment_files[0])
+
+    return __merge_segments__(group)
+
+# ------------------------------------------------------------------------------
+
+def __merge_segments__(group):
+
+    segments = [e for e in journal.load().values() if e.get('group', None) == group]
+    segments.sort(key=lambda e: e['segment'])
+
+    if not segments:
+        return None
+
+    downloaded = [e for e in segments if e['state'] in (journal.DOWNLOADED, journal.MERGED)]
+    if len(downloaded) != segments[0]['segments']:
+        logger.critical('Some of the segments could not be processed: {}'.format(
+                        [(e['process_id'], e['state']) for e in segments]))
+
+        # The group is over if a segment failed or was not even submitted,
+        # otherwise the pending segments can still be resumed
+        if len(segments) != segments[0]['segments'] or any(e['state'] == journal.ERROR for e in segments):
+            __record_group__(segments, journal.ERROR)
+        return None
+
+    try:
+        merged_file = segmentation.merge_results([e['results_file'] for e in segments])
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.critical('Results of the segments could not be merged: {}'.format(e))
+        __record_group__(segments, journal.ERROR)
+        return None
+
+    __record_group__(segments, journal.MERGED, merged_file=merged_file)
+
+    return merged_file
+
+
+def __record_group__(segments, state, **info):
+
+    for entry in segments:
+        journal.record(entry['process_id'], state, **info)
+
+# ------------------------------------------------------------------------------
+
 def __spinning_cursor__(flavour='basic'):
 
     FLAVOUR = {
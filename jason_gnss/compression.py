@@ -0,0 +1,298 @@
+"""
+Streaming compression of the files uploaded to Jason
+
+GNSS measurement files (e.g. RINEX) compress very well. When enabled, the
+rover and base files are compressed on the fly while the multipart body of
+the submission is streamed to the server (chunked transfer encoding), so
+that neither the whole file nor its compressed version are held in memory.
+
+The same multipart stream is used for uncompressed uploads, whose length is
+then known in advance (sent without chunked transfer encoding) and whose
+filenames are sent as given, as requests does. Memory mapped input files (see
+the inputs module) are streamed as slices, without copies.
+
+Compressed parts are sent with their filename suffixed by the extension of
+the encoding (.gz, .zst) and a Content-Encoding header. Files that are
+already compressed (gzip, zip, zstd, bzip2 or Hatanaka/Unix compressed) are
+sent as they are.
+
+The encodings supported by the server are advertised in the `capabilities`
+of the API status (e.g. 'compression:gzip'). zstd requires the zstandard
+package.
+"""
+import gzip
+import io
+import os
+import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Compression is used if supported by the server
+AUTO = 'auto'
+NONE = 'none'
+
+EXTENSIONS = {GZIP: '.gz', ZSTD: '.zst'}
+
+DEFAULT_LEVELS = {GZIP: 6, ZSTD: 3}
+
+# Prefix of the API capabilities that advertise the supported encodings
+CAPABILITY_PREFIX = 'compression:'
+
+CHUNK_SIZE = 1024 * 1024
+
+# Magic numbers of already compressed files
+COMPRESSED_SIGNATURES = [
+    b'\x1f\x8b',            # gzip
+    b'PK\x03\x04',          # zip
+    b'\x28\xb5\x2f\xfd',    # zstd
+    b'BZh',                 # bzip2
+    b'\x1f\x9d',            # Unix compress (e.g. Hatanaka .Z files)
+    b'\xfd7zXZ\x00'         # xz
+]
+
+# ------------------------------------------------------------------------------
+
+def get_available():
+    """
+    Encodings available in this installation, by order of preference
+    """
+
+    return [ZSTD, GZIP] if zstandard is not None else [GZIP]
+
+
+def get_supported(api_status):
+    """
+    Encodings supported by the server, according to its API status
+    """
+
+    capabilities = (api_status or {}).get('capabilities', None) or []
+
+    return [c[len(CAPABILITY_PREFIX):] for c in capabilities
+            if isinstance(c, str) and c.startswith(CAPABILITY_PREFIX)]
+
+
+def choose(supported):
+    """
+    Choose the encoding for the uploads among the ones supported by the server
+
+    :return: The encoding or None if no common encoding is available
+    """
+
+    for encoding in get_available():
+        if encoding in supported:
+            return encoding
+
+    return None
+
+# ------------------------------------------------------------------------------
+
+def is_compressed(fh):
+    """
+    Check whether a file (binary file object) is already compressed. The
+    position of the file is kept
+    """
+
+    if hasattr(fh, 'get_header'):
+        header = fh.get_header(8).tobytes()
+    else:
+        position = fh.tell()
+        header = fh.read(8)
+        fh.seek(position)
+
+    return any(header.startswith(signature) for signature in COMPRESSED_SIGNATURES)
+
+
+def compress_stream(fh, encoding, level=None, chunk_size=CHUNK_SIZE):
+    """
+    Compress a file object chunk by chunk
+
+    :return: Generator of compressed chunks
+    """
+
+    level = DEFAULT_LEVELS[encoding] if level is None else level
+
+    if encoding == GZIP:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        flush = compressor.flush
+    elif encoding == ZSTD:
+        if zstandard is None:
+            raise ValueError('zstd compression requires the zstandard package')
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        flush = compressor.flush
+    else:
+        raise ValueError('Unsupported compression [ {} ]'.format(encoding))
+
+    for data in read_chunks(fh, chunk_size=chunk_size):
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+
+    yield flush()
+
+
+def read_chunks(fh, chunk_size=CHUNK_SIZE):
+    """
+    Read a file object chunk by chunk from its current position. Memory mapped
+    input files (see the inputs module) are sliced instead of read
+
+    :return: Generator of chunks (bytes or memoryviews)
+    """
+
+    if hasattr(fh, 'iter_chunks'):
+        yield from fh.iter_chunks(chunk_size)
+        return
+
+    while True:
+        data = fh.read(chunk_size)
+        if not data:
+            break
+        yield data.encode('utf-8') if isinstance(data, str) else data
+
+
+def decompress(data, encoding):
+    """
+    Decompress the contents of a compressed part (e.g. for testing)
+    """
+
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    elif encoding == ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    raise ValueError('Unsupported compression [ {} ]'.format(encoding))
+
+# ------------------------------------------------------------------------------
+
+class MultipartStream(object):
+    """
+    Multipart/form-data body streamed in chunks, with some of its file parts
+    compressed on the fly (if an encoding is given)
+
+    It can be iterated several times (e.g. when a request is retried): each
+    iteration rewinds the files and streams the body again.
+    """
+
+    def __init__(self, files, encoding=None, compressed_fields=('rover_file', 'base_file'), level=None,
+                 chunk_size=CHUNK_SIZE):
+        """
+        :param files: Fields of the form, as in the `files` argument of
+                    requests: dictionary of name to (filename, value) tuples,
+                    with value a file object, a string or None (field skipped)
+        :param encoding: Encoding of the compressed parts (GZIP or ZSTD), or
+                    None to send all the parts as they are
+        :param compressed_fields: Names of the fields to compress
+        """
+
+        self.files = files
+        self.encoding = encoding
+        self.compressed_fields = compressed_fields
+        self.level = level
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+
+    @property
+    def content_type(self):
+
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    @property
+    def len(self):
+        """
+        Length (in bytes) of the body, or None if it is not known until it is
+        streamed (compressed parts or text files). The name is the one
+        requests looks for to send the Content-Length of streamed bodies
+        """
+
+        length = len(self.__closing__())
+
+        for headers, value, compress in self.__parts__():
+            size = None if compress else __get_length__(value)
+            if size is None:
+                return None
+            length += len(headers) + size + 2
+
+        return length
+
+    def __iter__(self):
+
+        # Chunked bodies are sent as bytes, the chunked encoding of some HTTP
+        # clients (e.g. urllib3 1.x) does not accept memoryviews
+        chunked = self.len is None
+
+        for headers, value, compress in self.__parts__():
+            yield headers
+
+            if compress:
+                for chunk in compress_stream(value, self.encoding, level=self.level, chunk_size=self.chunk_size):
+                    yield chunk
+            elif hasattr(value, 'read'):
+                for chunk in read_chunks(value, chunk_size=self.chunk_size):
+                    yield bytes(chunk) if chunked and isinstance(chunk, memoryview) else chunk
+            else:
+                yield value.encode('utf-8') if isinstance(value, str) else value
+
+            yield b'\r\n'
+
+        yield self.__closing__()
+
+    def __parts__(self):
+        """
+        Headers (bytes), value and whether to compress it of each part. Files
+        are rewound
+        """
+
+        for name, (filename, value) in self.files.items():
+
+            if value is None:
+                continue
+
+            compress = False
+            if hasattr(value, 'read'):
+                value.seek(0)
+                compress = self.encoding is not None and name in self.compressed_fields and \
+                           not is_compressed(value)
+
+            disposition = 'form-data; name="{}"'.format(name)
+            if filename is not None:
+                if self.encoding is not None:
+                    filename = os.path.basename(filename) + (EXTENSIONS[self.encoding] if compress else '')
+                disposition += '; filename="{}"'.format(filename)
+
+            headers = '--{}\r\nContent-Disposition: {}\r\n'.format(self.boundary, disposition)
+            if compress:
+                headers += 'Content-Type: application/octet-stream\r\nContent-Encoding: {}\r\n'.format(
+                           self.encoding)
+
+            yield (headers + '\r\n').encode('utf-8'), value, compress
+
+    def __closing__(self):
+
+        return '--{}--\r\n'.format(self.boundary).encode('utf-8')
+
+# ------------------------------------------------------------------------------
+
+def __get_length__(value):
+    """
+    Length in bytes of the value of a part (None if unknown)
+    """
+
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    elif not hasattr(value, 'read'):
+        return len(value)
+    elif hasattr(value, 'iter_chunks'):
+        return value.size
+    elif isinstance(value, io.BufferedIOBase) or 'b' in getattr(value, 'mode', ''):
+        position = value.tell()
+        size = value.seek(0, io.SEEK_END)
+        value.seek(position)
+        return size - position
+
+    return None
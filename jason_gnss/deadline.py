@@ -0,0 +1,92 @@
+"""
+Deadlines of the operations with the API
+
+A Deadline is created once (e.g. from the --timeout option of the command
+line tools) and propagated through the submission of the process, the
+polling of its status and the download of its results, so that the whole
+operation ends on time. The connect and read timeouts of each request are
+clipped to the time remaining until the deadline.
+
+>>> deadline = Deadline(3600)
+>>> ret, status_code = jason.submit_process(rover_file, deadline=deadline)
+>>> status, status_code = jason.get_status(ret['id'], deadline=deadline)
+"""
+import time
+
+from . import DeadlineExceeded
+
+# ------------------------------------------------------------------------------
+
+class Deadline(object):
+
+    def __init__(self, timeout=None):
+        """
+        :param timeout: Time (in seconds) from now until the deadline. If None,
+                    the deadline never expires
+        """
+
+        self.timeout = timeout
+        self.expiration = time.time() + timeout if timeout is not None else None
+
+    def remaining(self):
+        """
+        Time (in seconds) remaining until the deadline (None if it never
+        expires)
+        """
+
+        if self.expiration is None:
+            return None
+
+        return max(0.0, self.expiration - time.time())
+
+    def expired(self):
+
+        return self.expiration is not None and time.time() >= self.expiration
+
+    def check(self, operation='Operation'):
+        """
+        Raise a DeadlineExceeded exception if the deadline has expired
+        """
+
+        if self.expired():
+            raise DeadlineExceeded('{} did not end within [ {} ] seconds'.format(operation, self.timeout))
+
+    def get_timeouts(self, connect_timeout, read_timeout, operation='Request'):
+        """
+        Get the (connect, read) timeouts of a request, clipped to the time
+        remaining until the deadline
+        """
+
+        self.check(operation)
+
+        remaining = self.remaining()
+        if remaining is None:
+            return connect_timeout, read_timeout
+
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+    def sleep(self, seconds):
+        """
+        Sleep the given time or until the deadline, whatever happens first
+
+        :return: True if the deadline has not expired after sleeping
+        """
+
+        remaining = self.remaining()
+        time.sleep(seconds if remaining is None else min(seconds, remaining))
+
+        return not self.expired()
+
+    def __repr__(self):
+
+        return '<Deadline timeout={} remaining={}>'.format(self.timeout, self.remaining())
+
+# ------------------------------------------------------------------------------
+
+def get_deadline(deadline=None, timeout=None):
+    """
+    Get the deadline of an operation: the one provided or a new one from the
+    timeout (seconds, None for no deadline)
+    """
+
+    return deadline if deadline is not None else Deadline(timeout)
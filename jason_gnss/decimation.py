@@ -0,0 +1,100 @@
+"""
+Client-side decimation of high-rate GNSS observation files (RINEX and UBX)
+
+Only the observation epochs are decimated, any other record (external
+events, in-file header records, navigation messages, ...) is kept.
+"""
+from roktools import logger
+
+from . import rinex, ubx
+
+# Maximum offset (in seconds) of an epoch with respect to the decimation
+# grid to consider that it belongs to it (receivers that do not steer their
+# clock tag epochs a few milliseconds off the nominal time)
+DEFAULT_TOLERANCE_S = 0.005
+
+# ------------------------------------------------------------------------------
+
+class EpochSelector(object):
+    """
+    Select the epochs that fall onto a regular grid (multiples of the
+    interval), so that decimated rover epochs match those of a base station.
+
+    If the epochs of the file do not align with the grid, an epoch is also
+    selected when a grid point has been missed, which guarantees a sampling
+    close to the requested interval in any case.
+    """
+
+    def __init__(self, interval, tolerance=DEFAULT_TOLERANCE_S):
+
+        self.interval = interval
+        self.tolerance = tolerance
+        self.last = None
+
+    def __call__(self, seconds):
+
+        remainder = seconds % self.interval
+        on_grid = min(remainder, self.interval - remainder) <= self.tolerance
+
+        missed = self.last is None or seconds - self.last > self.interval + self.tolerance
+
+        # Same epoch already selected (e.g. several RAW frames per epoch)
+        duplicated = self.last is not None and abs(seconds - self.last) <= self.tolerance
+
+        if duplicated or on_grid or missed:
+            self.last = seconds
+            return True
+
+        return False
+
+# ------------------------------------------------------------------------------
+
+def decimate(filename, rate, output_filename=None, tolerance=DEFAULT_TOLERANCE_S):
+    """
+    Decimate a RINEX or UBX observation file to a given rate
+
+    :param filename: Filename of the file to decimate
+    :param rate: Output observation rate (in Hz)
+    :param output_filename: Filename of the decimated file. If not provided,
+                    the file will be created in a temporary folder with the
+                    same basename as the input file
+    :param tolerance: Maximum offset (in seconds) of the epochs with respect
+                    to the decimation grid
+    :return: The filename of the decimated file or None if the format of the
+             file is not supported
+    """
+
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError('Decimation rate [ {} ] must be a positive number\n'.format(rate))
+
+    interval = 1.0 / rate
+    selector = EpochSelector(interval, tolerance=tolerance)
+
+    if rinex.get_version(filename) is not None:
+
+        def predicate(epoch):
+            if epoch.time is None or epoch.flag not in rinex.OBSERVATION_FLAGS:
+                return True
+            return selector(rinex.seconds_of_day(epoch.time))
+
+        output_filename = output_filename or rinex.temporary_filename(filename)
+        n = rinex.filter_epochs(filename, output_filename, predicate, interval=interval)
+
+    elif ubx.is_ubx(filename):
+
+        def predicate(msg_class, msg_id, frame):
+            seconds = ubx.get_receiver_time(msg_class, msg_id, frame)
+            return seconds is None or selector(seconds)
+
+        output_filename = output_filename or rinex.temporary_filename(filename)
+        n = ubx.filter_frames(filename, output_filename, predicate)
+
+    else:
+        logger.warning('Format of file [ {} ] not supported for decimation'.format(filename))
+        return None
+
+    logger.debug('Decimated [ {} ] to {} Hz: {} records written in [ {} ]'.format(
+                 filename, rate, n, output_filename))
+
+    return output_filename
@@ -0,0 +1,240 @@
+"""
+Download of the results bundles
+
+By default the results are streamed through a single connection. Large
+bundles can be downloaded through several connections (opt-in, with the
+JASON_DOWNLOAD_CONNECTIONS environment variable or the `connections`
+parameter), each one fetching a range of bytes (HTTP Range request) that is
+written in place in a preallocated file. The assembled file is verified
+(size and, for zip files, the CRC of its members) before being returned.
+
+Servers that do not support Range requests are detected with the first
+request, and the file is then downloaded through a single connection.
+"""
+import concurrent.futures
+import os
+import re
+import zipfile
+
+import requests
+
+from roktools import logger
+
+from . import jason, InvalidResponse
+
+CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_CONNECTIONS = int(os.getenv('JASON_DOWNLOAD_CONNECTIONS', 1))
+
+# Size of the byte ranges requested by each connection. Files smaller than
+# this are downloaded with a single request
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+
+# Number of times the request of a byte range is retried
+MAX_SEGMENT_RETRIES = 2
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+# ------------------------------------------------------------------------------
+
+def download(url, filename, connections=None, segment_size=DEFAULT_SEGMENT_SIZE, verify=True, deadline=None,
+             tenant=None):
+    """
+    Download a file
+
+    :param url: URL of the file
+    :param filename: Filename where the file is written
+    :param connections: Number of concurrent connections. If more than one,
+                    the file is downloaded in segments (byte ranges) if the
+                    server supports it
+    :param segment_size: Size (in bytes) of the segments
+    :param verify: Verify the file assembled from segments (CRC of the
+                    members of zip files)
+    :param deadline: Deadline of the download (see the deadline module)
+    :param tenant: Tenant whose connections and limits are used (see the
+                    tenants module)
+    :return: The filename. The file is removed if the download fails
+    """
+
+    connections = connections or DEFAULT_CONNECTIONS
+
+    try:
+        if connections > 1:
+            __download_segments__(url, filename, connections, segment_size, verify, deadline, tenant)
+        else:
+            __download_stream__(url, filename, deadline, tenant)
+    except BaseException:
+        if os.path.exists(filename):
+            os.remove(filename)
+        raise
+
+    return filename
+
+# ------------------------------------------------------------------------------
+
+def verify_file(filename, size):
+    """
+    Verify a downloaded file: its size and, for zip files, the CRC of all its
+    members
+
+    :raises InvalidResponse: If the file is not valid
+    """
+
+    if os.path.getsize(filename) != size:
+        raise InvalidResponse('Downloaded file [ {} ] has {} bytes, expected {}'.format(
+                              filename, os.path.getsize(filename), size))
+
+    if not filename.lower().endswith('.zip'):
+        return
+
+    try:
+        with zipfile.ZipFile(filename) as z:
+            corrupted = z.testzip()
+    except zipfile.BadZipFile as e:
+        raise InvalidResponse('Downloaded file [ {} ] is not a valid zip file: {}'.format(filename, e))
+
+    if corrupted is not None:
+        raise InvalidResponse('Member [ {} ] of downloaded file [ {} ] is corrupted'.format(corrupted, filename))
+
+# ------------------------------------------------------------------------------
+
+def __download_stream__(url, filename, deadline, tenant):
+
+    r = jason.__request__('get', url, deadline=deadline, tenant=tenant, stream=True)
+    try:
+        # e.g. expired (signed) URL of the results
+        if r.status_code != 200:
+            raise InvalidResponse('Could not download [ {} ] (HTTP {})'.format(url, r.status_code))
+
+        with open(filename, 'wb') as fh:
+            __write_stream__(r, fh, deadline)
+    finally:
+        r.close()
+
+
+def __download_segments__(url, filename, connections, segment_size, verify, deadline, tenant):
+
+    # The first segment is requested alone: its response tells whether the
+    # server supports Range requests and the size of the file. The rest of
+    # segments are requested while its contents are received
+    r = __request_range__(url, 0, segment_size - 1, None, deadline, tenant)
+    try:
+        content_range = __get_content_range__(r)
+
+        if r.status_code == 200 or (r.status_code == 206 and content_range is None):
+            logger.debug('Range requests not supported by [ {} ], downloading with a single connection'.format(url))
+            with open(filename, 'wb') as fh:
+                __write_stream__(r, fh, deadline)
+            return
+
+        if r.status_code != 206:
+            raise InvalidResponse('Could not download [ {} ] (HTTP {})'.format(url, r.status_code))
+
+        _, end, size = content_range
+
+        # The rest of ranges are only accepted if the file has not changed
+        validator = r.headers.get('ETag', None) or r.headers.get('Last-Modified', None)
+
+        with open(filename, 'wb') as fh:
+            __preallocate__(fh, size)
+
+        ranges = [(s, min(s + segment_size, size) - 1) for s in range(end + 1, size, segment_size)]
+
+        logger.debug('Downloading [ {} ] ({} bytes) in {} segments with {} connections'.format(
+                     url, size, len(ranges) + 1, connections))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=connections) as executor:
+            futures = [executor.submit(__write_range__, r, filename, 0, end, deadline)]
+            futures += [executor.submit(__download_range__, url, filename, s, e, validator, deadline, tenant)
+                        for s, e in ranges]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        r.close()
+
+    if verify:
+        verify_file(filename, size)
+
+
+def __download_range__(url, filename, start, end, validator, deadline, tenant):
+
+    for attempt in range(MAX_SEGMENT_RETRIES + 1):
+        try:
+            r = __request_range__(url, start, end, validator, deadline, tenant)
+            try:
+                return __write_range__(r, filename, start, end, deadline)
+            finally:
+                r.close()
+
+        except (InvalidResponse, requests.exceptions.RequestException) as e:
+            if attempt == MAX_SEGMENT_RETRIES:
+                raise
+            logger.warning('Download of range {}-{} of [ {} ] failed, retrying: {}'.format(start, end, url, e))
+
+
+def __request_range__(url, start, end, validator, deadline, tenant):
+
+    headers = {'Range': 'bytes={}-{}'.format(start, end)}
+    if validator:
+        headers.update({'If-Range': validator})
+
+    return jason.__request__('get', url, deadline=deadline, tenant=tenant, stream=True, headers=headers)
+
+
+def __write_range__(response, filename, start, end, deadline):
+
+    content_range = __get_content_range__(response)
+    if response.status_code != 206 or content_range is None or content_range[:2] != (start, end):
+        # A 200 response means that the file has changed
+        raise InvalidResponse('Unexpected response to range {}-{} of [ {} ] (HTTP {})'.format(
+                              start, end, response.url, response.status_code))
+
+    with open(filename, 'r+b') as fh:
+        fh.seek(start)
+        written = __write_stream__(response, fh, deadline, limit=end - start + 1)
+
+    if written != end - start + 1:
+        raise InvalidResponse('Incomplete range {}-{} of [ {} ]'.format(start, end, response.url))
+
+    return written
+
+
+def __write_stream__(response, fh, deadline, limit=None):
+
+    written = 0
+
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if deadline:
+            deadline.check('Download of [ {} ]'.format(response.url))
+
+        if limit is not None and written + len(chunk) > limit:
+            raise InvalidResponse('Server sent more data than requested for [ {} ]'.format(response.url))
+
+        fh.write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def __get_content_range__(response):
+
+    match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+
+    return tuple(int(v) for v in match.groups()) if match else None
+
+
+def __preallocate__(fh, size):
+
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fh.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+
+    fh.truncate(size)
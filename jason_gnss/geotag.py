@@ -0,0 +1,342 @@
+"""
+Geotagging of images from the trajectory computed by Jason
+
+The positions of all the images are interpolated at once (NumPy vectorized
+search and interpolation) from the trajectory of the results file, based on
+the EXIF timestamps of the images. Positions are written in a sidecar CSV
+file and, optionally, in the GPS EXIF tags of the images (requires piexif).
+"""
+import concurrent.futures
+import json
+import os
+import zipfile
+
+import numpy as np
+
+try:
+    import piexif
+except ImportError:
+    piexif = None
+
+from roktools import logger
+
+from . import exif, timeseries
+
+# Difference between GPS time and UTC (leap seconds since 2017), which is
+# the offset to apply to the timestamps of cameras set in UTC
+DEFAULT_TIME_OFFSET_S = 18
+
+# Images in gaps of the trajectory longer than this (in seconds) are not
+# geotagged
+DEFAULT_MAX_GAP_S = 5.0
+
+OUTPUT_FILENAME = 'geotags.csv'
+CAMERA_METADATA_FILENAME = 'camera_metadata_file.json'
+
+DATETIME_TAG = 'EXIF DateTimeOriginal'
+SUBSEC_TAG = 'EXIF SubSecTimeOriginal'
+
+LATITUDE_NAMES = ('lat', 'latitude')
+LONGITUDE_NAMES = ('lon', 'long', 'longitude')
+HEIGHT_NAMES = ('h', 'hgt', 'height', 'alt', 'altitude')
+
+GPS_EPOCH = np.datetime64('1980-01-06T00:00:00', 'ms')
+
+# ------------------------------------------------------------------------------
+
+def geotag(results_file, images_folder, write_exif=False, time_offset=DEFAULT_TIME_OFFSET_S,
+           max_gap=DEFAULT_MAX_GAP_S, columns=None, output_filename=None, max_workers=None):
+    """
+    Geotag the images of a folder with the trajectory of a results file
+
+    :param results_file: Results file (zip bundle) or trajectory file
+    :param images_folder: Folder with the images (JPG)
+    :param write_exif: Write the positions in the GPS EXIF tags of the images
+    :param time_offset: Offset (in seconds) added to the EXIF timestamps of the
+                    images to convert them to the time scale of the trajectory
+                    (by default, from UTC to GPS time)
+    :param max_gap: Images in gaps of the trajectory longer than this (in
+                    seconds) are not geotagged
+    :param columns: Indices of the latitude, longitude and height columns of
+                    the trajectory file. If not provided, they are guessed
+                    from its header
+    :param output_filename: Filename of the CSV file with the positions of
+                    the images, by default geotags.csv in the images folder
+    :param max_workers: Maximum number of processes that write EXIF tags
+    :return: The filename of the CSV file
+    """
+
+    t, lat, lon, hgt = load_trajectory(results_file, columns=columns)
+
+    names, image_times = get_image_times(images_folder)
+    if len(names) == 0:
+        logger.critical('No images with timestamp found in [ {} ]'.format(images_folder))
+        return None
+
+    image_times = image_times + time_offset
+
+    # Trajectories time tagged in seconds of week
+    if t[-1] < timeseries.SECONDS_PER_WEEK:
+        image_times = np.mod(image_times, timeseries.SECONDS_PER_WEEK)
+
+    positions = interpolate(t, np.column_stack((lat, lon, hgt)), image_times, max_gap=max_gap)
+
+    valid = ~np.isnan(positions[:, 0])
+    logger.info('Geotagged {} of {} images'.format(np.count_nonzero(valid), len(names)))
+
+    if output_filename is None:
+        output_filename = os.path.join(images_folder, OUTPUT_FILENAME)
+
+    write_csv(output_filename, names, image_times, positions)
+
+    if write_exif:
+        if piexif is None:
+            logger.critical('piexif package is required to write EXIF tags, positions written only to [ {} ]'.format(
+                            output_filename))
+        else:
+            paths = [os.path.join(images_folder, name) for name in names]
+            write_exif_tags([p for p, v in zip(paths, valid) if v], positions[valid], max_workers=max_workers)
+
+    return output_filename
+
+# ------------------------------------------------------------------------------
+
+def load_trajectory(filename, columns=None):
+    """
+    Load the trajectory of a results file (zip bundle) or a trajectory file
+
+    :param columns: Indices of the latitude, longitude and height columns. If
+                    not provided, they are guessed from the header
+    :return: Tuple of arrays with time (seconds), latitude, longitude and
+             height, sorted by time
+    """
+
+    if zipfile.is_zipfile(filename):
+        contents = []
+        with zipfile.ZipFile(filename) as z:
+            for name in z.namelist():
+                if name.lower().endswith(timeseries.EXTENSIONS):
+                    contents.append((name, z.read(name)))
+    else:
+        with open(filename, 'rb') as fh:
+            contents = [(filename, fh.read())]
+
+    for name, content in contents:
+        try:
+            header, rows = timeseries.parse(content.decode('utf-8'))
+        except UnicodeDecodeError:
+            continue
+
+        indices = columns or __guess_columns__(header, rows)
+        if not rows or indices is None:
+            continue
+
+        logger.debug('Loading trajectory from [ {} ], columns {}'.format(name, indices))
+
+        t = np.array([row[0] for row in rows])
+        fields = [timeseries.split_fields(row[1]) for row in rows]
+        values = np.array([[float(f[i]) for i in indices] for f in fields])
+
+        order = np.argsort(t, kind='stable')
+
+        return t[order], values[order, 0], values[order, 1], values[order, 2]
+
+    raise ValueError('No trajectory found in [ {} ]\n'.format(filename))
+
+# ------------------------------------------------------------------------------
+
+def get_image_times(images_folder, max_workers=None):
+    """
+    Get the timestamps of the images of a folder from their EXIF tags. The
+    camera metadata file generated when submitting the process is used if
+    available in the folder
+
+    :return: Tuple with the image names and an array with their timestamps
+             (seconds since the GPS epoch, in the time scale of the camera)
+    """
+
+    camera_metadata_file = os.path.join(images_folder, CAMERA_METADATA_FILENAME)
+
+    if os.path.isfile(camera_metadata_file):
+        with open(camera_metadata_file, 'r') as fh:
+            tags = json.load(fh)
+    else:
+        names = exif.get_images_in_path(images_folder)
+        paths = [os.path.join(images_folder, name) for name in names]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tags = dict(zip(names, executor.map(exif.get_image_exif, paths)))
+
+    names, seconds = [], []
+    for name in sorted(name for name in tags if DATETIME_TAG in tags[name]):
+        t = __parse_image_time__(tags[name])
+        if t is None:
+            logger.warning('Invalid timestamp [ {} ] of image [ {} ], skipped'.format(tags[name][DATETIME_TAG], name))
+            continue
+        names.append(name)
+        seconds.append(t)
+
+    return names, np.array(seconds, dtype=float)
+
+
+def __parse_image_time__(image_tags):
+    """
+    Seconds since the GPS epoch of the EXIF timestamp of an image (None if it
+    is not valid, e.g. the blank date '0000:00:00 00:00:00' of some cameras)
+    """
+
+    # EXIF format is 'YYYY:MM:DD HH:MM:SS'
+    value = image_tags[DATETIME_TAG].strip().replace(':', '-', 2).replace(' ', 'T')
+    subseconds = image_tags.get(SUBSEC_TAG, '0').strip()
+
+    try:
+        datetime = np.datetime64(value, 'ms')
+        subseconds = float('0.' + subseconds) if subseconds else 0.0
+    except ValueError:
+        return None
+
+    if np.isnat(datetime):
+        return None
+
+    return (datetime - GPS_EPOCH) / np.timedelta64(1, 's') + subseconds
+
+# ------------------------------------------------------------------------------
+
+def interpolate(t, values, query_times, max_gap=DEFAULT_MAX_GAP_S):
+    """
+    Linear interpolation of the trajectory at the given times
+
+    :param t: Array with the (sorted) times of the trajectory
+    :param values: Array (N x 3) with the latitude, longitude and height
+    :param query_times: Array with the times to interpolate
+    :param max_gap: Maximum time between the trajectory samples used for the
+                    interpolation
+    :return: Array (M x 3) with the interpolated values (NaN for times outside
+             the trajectory or in gaps)
+    """
+
+    # Longitudes are unwrapped so that the interpolation across the
+    # antimeridian is correct
+    lon = np.degrees(np.unwrap(np.radians(values[:, 1])))
+
+    out = np.column_stack([np.interp(query_times, t, column) for column in (values[:, 0], lon, values[:, 2])])
+    out[:, 1] = (out[:, 1] + 180.0) % 360.0 - 180.0
+
+    i1 = np.clip(np.searchsorted(t, query_times), 1, len(t) - 1)
+    i0 = i1 - 1
+    gap = t[i1] - t[i0] if len(t) > 1 else np.zeros(len(query_times))
+
+    exact = (t[i0] == query_times) | (t[i1] == query_times)
+    valid = (query_times >= t[0]) & (query_times <= t[-1]) & ((gap <= max_gap) | exact)
+    out[~valid] = np.nan
+
+    return out
+
+# ------------------------------------------------------------------------------
+
+def write_csv(filename, names, times, positions):
+    """
+    Write the positions of the images in a CSV file (positions that could not
+    be computed are left empty)
+    """
+
+    with open(filename, 'w') as fh:
+        fh.write('image,time,latitude,longitude,height\n')
+        for name, t, (lat, lon, hgt) in zip(names, times, positions):
+            if np.isnan(lat):
+                fh.write('{},{:.3f},,,\n'.format(name, t))
+            else:
+                fh.write('{},{:.3f},{:.9f},{:.9f},{:.4f}\n'.format(name, t, lat, lon, hgt))
+
+# ------------------------------------------------------------------------------
+
+def write_exif_tags(paths, positions, max_workers=None):
+    """
+    Write the positions in the GPS EXIF tags of the images (in parallel)
+
+    :return: Number of images tagged
+    """
+
+    # Degrees, minutes and seconds (as rationals, 1e-4 arcsec resolution)
+    absolute = np.abs(positions[:, :2])
+    degrees = np.floor(absolute)
+    minutes = np.floor((absolute - degrees) * 60)
+    seconds = np.round(((absolute - degrees) * 60 - minutes) * 60 * 10000)
+
+    tasks = []
+    for i, path in enumerate(paths):
+        lat, lon, hgt = positions[i]
+        tasks.append((
+            path,
+            b'N' if lat >= 0 else b'S',
+            ((int(degrees[i, 0]), 1), (int(minutes[i, 0]), 1), (int(seconds[i, 0]), 10000)),
+            b'E' if lon >= 0 else b'W',
+            ((int(degrees[i, 1]), 1), (int(minutes[i, 1]), 1), (int(seconds[i, 1]), 10000)),
+            0 if hgt >= 0 else 1,
+            (int(round(abs(hgt) * 1000)), 1000)
+        ))
+
+    chunksize = max(1, len(tasks) // (4 * (max_workers or os.cpu_count() or 1)))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        tagged = sum(executor.map(__write_gps_tags__, tasks, chunksize=chunksize))
+
+    if tagged < len(tasks):
+        logger.warning('{} images could not be tagged'.format(len(tasks) - tagged))
+
+    return tagged
+
+# ------------------------------------------------------------------------------
+
+def __write_gps_tags__(task):
+
+    path, lat_ref, lat, lon_ref, lon, hgt_ref, hgt = task
+
+    try:
+        exif_dict = piexif.load(path)
+        exif_dict['GPS'] = {
+            piexif.GPSIFD.GPSVersionID: (2, 3, 0, 0),
+            piexif.GPSIFD.GPSLatitudeRef: lat_ref,
+            piexif.GPSIFD.GPSLatitude: lat,
+            piexif.GPSIFD.GPSLongitudeRef: lon_ref,
+            piexif.GPSIFD.GPSLongitude: lon,
+            piexif.GPSIFD.GPSAltitudeRef: hgt_ref,
+            piexif.GPSIFD.GPSAltitude: hgt
+        }
+        # Thumbnails may not fit in the APP1 segment along with the new tags
+        exif_dict.pop('thumbnail', None)
+        exif_dict.pop('1st', None)
+        piexif.insert(piexif.dump(exif_dict), path)
+    except Exception as e:
+        logger.warning('Could not write GPS tags of [ {} ]: {}'.format(path, e))
+        return 0
+
+    return 1
+
+# ------------------------------------------------------------------------------
+
+def __guess_columns__(header, rows):
+
+    for line in reversed(header):
+        names = [name.lower().split('(')[0] for name in timeseries.split_fields(line)]
+
+        indices = [__find_column__(names, candidates) for candidates in (LATITUDE_NAMES, LONGITUDE_NAMES, HEIGHT_NAMES)]
+        if None not in indices:
+            # Header names of the time tag might not match the data fields
+            # (e.g. a single name for date and time columns)
+            offset = len(timeseries.split_fields(rows[0][1])) - len(names) if rows else 0
+            return [i + max(0, offset) for i in indices]
+
+    return None
+
+
+def __find_column__(names, candidates):
+
+    for i, name in enumerate(names):
+        if name in candidates:
+            return i
+
+    for i, name in enumerate(names):
+        if any(name.startswith(c) for c in candidates if len(c) > 1):
+            return i
+
+    return None
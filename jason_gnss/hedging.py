@@ -0,0 +1,219 @@
+"""
+Hedged requests to cut the tail latency of idempotent requests
+
+If the response to an idempotent request (e.g. the status of a process or
+the list of processes) takes longer than the 95th percentile of the recent
+latencies of the same kind of requests, a second identical request is
+issued and the first response received is used.
+
+The first request is issued as soon as it is called, on a thread of its own
+(it is not queued behind other requests), and only the hedged copies are
+issued on a pool of threads, whose size bounds the extra load. Latencies are
+measured from the call, so that the time waiting for a connection or for
+the rate limiter is also taken into account.
+
+Requests can be split in groups (e.g. by tenant, see the tenants module),
+each one with its own pool of threads and latencies, so that the backlog of
+a group (e.g. requests waiting for its rate limits) does not delay the
+hedged copies of the rest.
+
+Hedging is disabled by default. It is enabled with the JASON_HEDGE
+environment variable (e.g. JASON_HEDGE=1) or the `configure` function.
+"""
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+
+DEFAULT_QUANTILE = 0.95
+
+# Delay of the hedged request until enough latencies have been measured
+DEFAULT_DELAY_S = 1.0
+
+# Minimum delay of the hedged request, so that fast responses are not
+# duplicated
+MIN_DELAY_S = 0.05
+
+# Number of latencies (per kind of request) used to compute the delay
+MIN_SAMPLES = 20
+WINDOW = 200
+
+# Maximum number of concurrent hedged copies
+MAX_WORKERS = 16
+
+# ------------------------------------------------------------------------------
+
+class LatencyTracker(object):
+    """
+    Latencies of the last requests of a kind
+    """
+
+    def __init__(self, window=WINDOW):
+
+        self.latencies = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+
+        with self.lock:
+            self.latencies.append(latency)
+
+    def quantile(self, q):
+        """
+        :return: The q quantile of the latencies or None if not enough
+                 latencies have been measured
+        """
+
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        if len(latencies) < MIN_SAMPLES:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+# ------------------------------------------------------------------------------
+
+class Hedger(object):
+
+    def __init__(self, quantile=DEFAULT_QUANTILE, default_delay=DEFAULT_DELAY_S, min_delay=MIN_DELAY_S,
+                 max_workers=MAX_WORKERS):
+
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.trackers = collections.defaultdict(LatencyTracker)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.hedged = 0
+
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def get_group(self, group):
+        """
+        Hedger of a group of requests, with the same settings but its own pool
+        of threads and latencies (this hedger for requests without group)
+        """
+
+        if group is None:
+            return self
+
+        with self.lock:
+            if group not in self.groups:
+                self.groups[group] = Hedger(quantile=self.quantile, default_delay=self.default_delay,
+                                            min_delay=self.min_delay, max_workers=self.max_workers)
+
+            return self.groups[group]
+
+    def get_delay(self, kind):
+        """
+        Time (in seconds) after which a request of the given kind is hedged
+        """
+
+        delay = self.trackers[kind].quantile(self.quantile)
+
+        return self.default_delay if delay is None else max(self.min_delay, delay)
+
+    def call(self, kind, request, deadline=None):
+        """
+        Issue a request, hedged if it does not respond on time
+
+        :param kind: Kind of request (requests of the same kind share the
+                    latency statistics)
+        :param request: Callable that issues the request and returns the
+                    response. It must be idempotent
+        :param deadline: Deadline of the request. The request is not hedged
+                    if the deadline expires before the hedging delay
+        :return: The first response received. If both requests fail, the
+                 exception of the first one is raised
+        """
+
+        delay = self.get_delay(kind)
+
+        first = self.__start__(kind, request)
+        try:
+            return first.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        remaining = deadline.remaining() if deadline else None
+        if remaining is not None and remaining <= 0:
+            return first.result()
+
+        self.hedged += 1
+        second = self.executor.submit(self.__timed__, kind, request, time.time())
+
+        error = None
+        for future in concurrent.futures.as_completed([first, second]):
+            try:
+                return future.result()
+            except Exception as e:
+                error = error or e
+
+        raise error
+
+    def __start__(self, kind, request):
+        """
+        Issue the first request, on a thread of its own so that the caller can
+        wait for it and for the hedged copy at the same time
+        """
+
+        future = concurrent.futures.Future()
+        tic = time.time()
+
+        def run():
+            try:
+                future.set_result(self.__timed__(kind, request, tic))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+
+        return future
+
+    def __timed__(self, kind, request, tic):
+
+        response = request()
+        self.trackers[kind].add(time.time() - tic)
+
+        return response
+
+# ------------------------------------------------------------------------------
+
+def configure(enabled=True, quantile=DEFAULT_QUANTILE, default_delay=DEFAULT_DELAY_S, min_delay=MIN_DELAY_S,
+              max_workers=MAX_WORKERS):
+    """
+    Enable (or disable) the hedging of idempotent requests
+
+    :param quantile: Quantile of the latencies used as hedging delay
+    :param default_delay: Hedging delay (in seconds) until enough latencies
+                    have been measured
+    :param min_delay: Minimum hedging delay (in seconds)
+    :param max_workers: Maximum number of concurrent hedged copies
+    """
+
+    global __hedger__
+
+    __hedger__ = Hedger(quantile=quantile, default_delay=default_delay, min_delay=min_delay,
+                        max_workers=max_workers) if enabled else None
+
+
+def call(kind, request, deadline=None, group=None):
+    """
+    Issue an idempotent request, hedged if enabled (see Hedger.call)
+
+    :param group: Group of the request (e.g. name of the tenant), see
+                    Hedger.get_group
+    """
+
+    hedger = __hedger__
+
+    if hedger is None:
+        return request()
+
+    return hedger.get_group(group).call(kind, request, deadline=deadline)
+
+
+__hedger__ = Hedger() if os.getenv('JASON_HEDGE', '').lower() in ('1', 'true', 'yes', 'on') else None
@@ -0,0 +1,239 @@
+"""
+Input files of the submissions (rover, base and camera metadata files)
+
+The files are memory mapped and exposed as slices of a memoryview, so that
+the submission reads each of them from disk once and without intermediate
+copies in user space:
+- Validation: the file is opened (and its size taken) once, when the
+  InputFile is created, and its header is inspected in place (e.g. to detect
+  already compressed files)
+- Checksum: computed over the same slices that are uploaded (or compressed),
+  while the multipart body is streamed (see compression.MultipartStream)
+- Upload: the slices are handed to the socket (or to the compressor) as they
+  are
+
+The checksums of the files uploaded are kept (see `get_checksum`), e.g. to
+be recorded in the journal without reading the files again. The algorithm
+is defined by the JASON_CHECKSUM environment variable (any of hashlib, by
+default sha256, or 'none') or the `configure` function.
+
+>>> with inputs.InputFile('rover.obs') as rover:
+...     for chunk in rover.iter_chunks():
+...         sock.sendall(chunk)
+>>> rover.checksum
+"""
+import collections
+import hashlib
+import io
+import mmap
+import os
+import stat
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+NONE = 'none'
+
+DEFAULT_ALGORITHM = os.getenv('JASON_CHECKSUM', 'sha256')
+
+# Maximum number of checksums kept
+MAX_CHECKSUMS = 256
+
+# ------------------------------------------------------------------------------
+
+class InputFile(io.RawIOBase):
+    """
+    Read-only memory mapped file
+
+    It is also a binary file object (read, seek, tell, fileno), but `read`
+    copies the data: the contents are meant to be consumed through
+    `iter_chunks` or `view`.
+    """
+
+    def __init__(self, filename, algorithm=None):
+        """
+        :param algorithm: Algorithm of the checksum (by default, the
+                    configured one)
+        :raises OSError: If the file does not exist or is not a regular file
+        """
+
+        super().__init__()
+
+        self.name = filename
+        self.algorithm = __algorithm__ if algorithm is None else algorithm
+        self.checksum = None
+        self.bytes_copied = 0
+
+        # Released by close, which is also called if the file cannot be opened
+        self.fh, self.map, self.view = None, None, None
+
+        self.fh = open(filename, 'rb')
+        try:
+            info = os.fstat(self.fh.fileno())
+            if not stat.S_ISREG(info.st_mode):
+                raise IsADirectoryError('[ {} ] is not a regular file'.format(filename))
+
+            self.size = info.st_size
+            self.key = (os.path.abspath(filename), info.st_size, info.st_mtime_ns)
+
+            # Empty files cannot be mapped
+            self.map = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        except Exception:
+            self.fh.close()
+            raise
+
+        if self.map is not None and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+        self.view = memoryview(self.map) if self.map is not None else memoryview(b'')
+        self.position = 0
+
+    def __repr__(self):
+
+        return '<InputFile {} ({} bytes)>'.format(self.name, self.size)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """
+        Slices of the file (memoryviews, no copies) from the current position
+        to the end. The checksum is computed along, if the iteration starts
+        at the beginning of the file and goes through all of it
+
+        :return: Generator of memoryviews
+        """
+
+        hasher = self.__hasher__() if self.position == 0 else None
+
+        while self.position < self.size:
+            chunk = self.view[self.position:self.position + chunk_size]
+            self.position += len(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+
+        if hasher is not None:
+            self.checksum = hasher.hexdigest()
+            __store__(self.key, self.algorithm, self.checksum)
+
+    def get_header(self, size):
+        """
+        First bytes of the file (a memoryview)
+        """
+
+        return self.view[:size]
+
+    # --------------------------------------------------------------------------
+
+    def readable(self):
+
+        return True
+
+    def seekable(self):
+
+        return True
+
+    def fileno(self):
+
+        return self.fh.fileno()
+
+    def tell(self):
+
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+
+        origin = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, origin + offset)
+
+        return self.position
+
+    def readinto(self, buffer):
+
+        chunk = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        self.bytes_copied += len(chunk)
+
+        return len(chunk)
+
+    def close(self):
+
+        if self.closed:
+            return
+
+        if self.view is not None:
+            self.view.release()
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # Slices still referenced (e.g. by the transport), the map is
+                # released with them
+                pass
+        if self.fh is not None:
+            self.fh.close()
+
+        super().close()
+
+    def __hasher__(self):
+
+        if self.algorithm == NONE:
+            return None
+
+        return hashlib.new(self.algorithm)
+
+# ------------------------------------------------------------------------------
+
+def configure(algorithm=DEFAULT_ALGORITHM):
+    """
+    Set the algorithm of the checksums (any of hashlib or 'none')
+    """
+
+    global __algorithm__
+
+    if algorithm != NONE:
+        hashlib.new(algorithm)
+
+    __algorithm__ = algorithm
+
+
+def get_checksum(filename, algorithm=None):
+    """
+    Checksum of a file. The checksums of the files uploaded (and not modified
+    since) are not computed again
+
+    :return: Hexadecimal digest (None if the checksums are disabled)
+    """
+
+    algorithm = __algorithm__ if algorithm is None else algorithm
+    if algorithm == NONE:
+        return None
+
+    info = os.stat(filename)
+    key = (os.path.abspath(filename), info.st_size, info.st_mtime_ns)
+
+    with __lock__:
+        checksum = __checksums__.get((key, algorithm), None)
+
+    if checksum is None:
+        with InputFile(filename, algorithm=algorithm) as fh:
+            for _ in fh.iter_chunks():
+                pass
+            checksum = fh.checksum
+
+    return checksum
+
+# ------------------------------------------------------------------------------
+
+def __store__(key, algorithm, checksum):
+
+    with __lock__:
+        __checksums__[(key, algorithm)] = checksum
+        __checksums__.move_to_end((key, algorithm))
+        while len(__checksums__) > MAX_CHECKSUMS:
+            __checksums__.popitem(last=False)
+
+
+__lock__ = threading.Lock()
+__checksums__ = collections.OrderedDict()
+
+__algorithm__ = DEFAULT_ALGORITHM
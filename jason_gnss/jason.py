@@ -1,13 +1,37 @@
-import requests
 import os
 import os.path
 import tempfile
+import threading
+import time
 
 from roktools import logger
 
-from . import AuthenticationError, API_URL
+from . import AuthenticationError, InvalidResponse, API_URL, cache, hedging, inputs, ratelimit, tenants, tracing, \
+    transport
+from . import compression as compressing
+from .deadline import Deadline
 
-def status(platform, app_version, api_key=None, secret_token=None):
+# Number of times a request is retried when the API answers that the rate
+# of requests is too high (HTTP 429)
+MAX_THROTTLING_RETRIES = 5
+
+# Timeouts (in seconds) to establish the connection with the API and to
+# receive data from it (time between bytes, not the whole response). The
+# response to an upload is only sent once the files are stored, hence its
+# longer read timeout
+CONNECT_TIMEOUT_S = float(os.getenv('JASON_CONNECT_TIMEOUT', 10))
+READ_TIMEOUT_S = float(os.getenv('JASON_READ_TIMEOUT', 60))
+UPLOAD_READ_TIMEOUT_S = float(os.getenv('JASON_UPLOAD_READ_TIMEOUT', 300))
+
+# Compression of the uploaded rover and base files (see the compression
+# module): 'auto' (if supported by the server), 'gzip', 'zstd' or 'none'
+UPLOAD_COMPRESSION = os.getenv('JASON_UPLOAD_COMPRESSION', compressing.AUTO)
+
+# Time (in seconds) until the capabilities of the API are requested again
+# when they could not be obtained (e.g. API status not available)
+CAPABILITIES_RETRY_S = 60.0
+
+def status(platform, app_version, api_key=None, secret_token=None, deadline=None, tenant=None):
     """
     Check status before starting using the API
 
@@ -16,7 +40,8 @@ def status(platform, app_version, api_key=None, secret_token=None):
 
     url='{}/status'.format(API_URL)
 
-    api_key, secret_token = __fetch_credentials__(api_key, secret_token)
+    tenant = tenants.get(tenant)
+    api_key, secret_token = __fetch_credentials__(api_key, secret_token, tenant)
 
     headers = __build_headers__(api_key)
 
@@ -28,7 +53,7 @@ def status(platform, app_version, api_key=None, secret_token=None):
     if secret_token:
         params.update({'token': secret_token})
 
-    r = requests.get(url, headers=headers, params=params)
+    r = __request__('get', url, deadline=deadline, hedge='status', tenant=tenant, headers=headers, params=params)
 
     return r.json(), r.status_code
 
@@ -37,7 +62,8 @@ def status(platform, app_version, api_key=None, secret_token=None):
 def submit_process(rover_file, process_type="GNSS", 
                     base_file=None, base_lonlathgt=None, camera_metadata_file=None,
                     api_key=None, secret_token=None, rover_dynamics='dynamic',
-                    strategy='PPK/PPP', label="jason-gnss"):
+                    strategy='PPK/PPP', label="jason-gnss", as_handle=False, download=True, deadline=None,
+                    compression=None, tenant=None):
     """
     Submit a process to Jason PaaS
 
@@ -56,100 +82,244 @@ def submit_process(rover_file, process_type="GNSS",
                     user.
     :param rover_dynamics: Dynamics of the rover receiver ('static' or 'dynamic')
     :param label: specify a label for the process to submit
+    :param as_handle: Return a JobHandle (a concurrent.futures.Future, see the
+                    jobs module) instead of the response of the API
+    :param download: If a JobHandle is returned, download the results once the
+                    process is finished (the result of the handle is then the
+                    results filename, otherwise the status of the process)
+    :param deadline: Deadline (see the deadline module) of the submission. It
+                    is also the deadline of the JobHandle, if returned
+    :param compression: Compression of the rover and base files while they
+                    are uploaded: 'auto' (if supported by the server), 'gzip',
+                    'zstd', 'none' or True (best available encoding). By
+                    default, UPLOAD_COMPRESSION
+    :param tenant: Tenant (see the tenants module) whose credentials,
+                    connections and limits are used
     """
 
-    if not os.path.isfile(rover_file):
+    tenant = tenants.get(tenant)
+
+    # Input files are opened (and validated) once and memory mapped, their
+    # contents are read from disk while uploaded (see the inputs module)
+    try:
+        rover_file_fh = inputs.InputFile(rover_file)
+    except OSError:
         logger.critical("Rover file [ {} ] does not exist!".format(rover_file))
-        return None, None
-    elif base_file and not os.path.isfile(base_file):
+        return __submission_result__(None, None, as_handle, download, api_key, secret_token, deadline, tenant)
+
+    try:
+        base_file_fh = inputs.InputFile(base_file) if base_file else None
+    except OSError:
+        rover_file_fh.close()
         logger.critical("Base file [ {} ] specified but does not exist!".format(base_file))
-        return None, None
+        return __submission_result__(None, None, as_handle, download, api_key, secret_token, deadline, tenant)
 
-    rover_file_fh = open(rover_file, 'rb')
-    base_file_fh = open(base_file, 'rb') if base_file else None
-    camera_metadata_file_fh = open(camera_metadata_file, 'rb') if camera_metadata_file else None
+    # Once the input files are open, anything that fails (e.g. credentials or
+    # compression not available) closes them and removes the config file
+    camera_metadata_file_fh = None
+    config_file, config_file_fh = None, None
 
-    api_key, secret_token = __fetch_credentials__(api_key, secret_token)
+    try:
+        camera_metadata_file_fh = inputs.InputFile(camera_metadata_file) if camera_metadata_file else None
 
-    logger.debug('Submitting job to end-point {}'.format(API_URL))
+        api_key, secret_token = __fetch_credentials__(api_key, secret_token, tenant)
 
-    url='{}/processes'.format(API_URL)
+        logger.debug('Submitting job to end-point {}'.format(API_URL))
+
+        url='{}/processes'.format(API_URL)
     
-    headers = __build_headers__(api_key)
+        headers = __build_headers__(api_key)
+
+        files = {
+            'type' : (None, process_type),
+            'token' : (None, secret_token),
+            'rover_file': (rover_file, rover_file_fh),
+            'rover_dynamics': (None, rover_dynamics),
+            'label': (None, label),
+            'camera_metadata_file': (camera_metadata_file, camera_metadata_file_fh)
+        }
+
+        if base_file:
+            files.update({'base_file' : (base_file, base_file_fh)})
+
+        config_file, config_file_fh = __create_config_file__(base_lonlathgt)
+        if config_file:
+            files.update({'config_file' : ('config_file', config_file_fh)})
+
+        if camera_metadata_file:
+            files.update({'camera_metadata_file' : (camera_metadata_file, camera_metadata_file_fh)})
+
+        if base_lonlathgt:
+            lon = base_lonlathgt[0]
+            lat = base_lonlathgt[1]
+            hgt = base_lonlathgt[2]
+            pos_str = '{},{},{}'.format(lat, lon, hgt)
+            files.update({'external_base_station_position' : (None, pos_str)})
+
+        if strategy:
+            files.update({'user_strategy' : (None, strategy)})
+
+        logger.debug('Query parameters {}'.format(files))
+
+        encoding = __get_upload_compression__(compression, api_key, tenant)
+        if encoding:
+            logger.debug('Uploading files compressed with {}'.format(encoding))
+
+        # The body is streamed from the mapped files, with their checksums
+        # computed along
+        body = compressing.MultipartStream(files, encoding)
+        headers.update({'Content-Type': body.content_type})
+
+        r = __request__('post', url, upload=True, deadline=deadline, tenant=tenant, headers=headers, data=body)
+        for fh in (rover_file_fh, base_file_fh):
+            if fh is not None and fh.checksum:
+                logger.debug('Uploaded [ {} ] ({} bytes, {} {})'.format(fh.name, fh.size, fh.algorithm, fh.checksum))
+    finally:
+        rover_file_fh.close()
+        if base_file_fh:
+            base_file_fh.close()
+        if config_file_fh:
+            config_file_fh.close()
+            os.remove(config_file)
+        if camera_metadata_file_fh:
+            camera_metadata_file_fh.close()
+
+    return __submission_result__(r.json(), r.status_code, as_handle, download, api_key, secret_token, deadline,
+                                 tenant)
+
+
+def __get_upload_compression__(compression, api_key, tenant=None):
+
+    compression = UPLOAD_COMPRESSION if compression is None else compression
+
+    if compression is True:
+        return compressing.get_available()[0]
+
+    if not compression or compression == compressing.NONE:
+        return None
 
-    files = {
-        'type' : (None, process_type),
-        'token' : (None, secret_token),
-        'rover_file': (rover_file, rover_file_fh),
-        'rover_dynamics': (None, rover_dynamics),
-        'label': (None, label),
-        'camera_metadata_file': (camera_metadata_file, camera_metadata_file_fh)
-    }
+    if compression == compressing.AUTO:
+        return compressing.choose(__get_capabilities__(api_key, tenant))
 
-    if base_file:
-        files.update({'base_file' : (base_file, base_file_fh)})
+    if compression not in compressing.get_available():
+        raise ValueError('Compression [ {} ] not available, use one of {}\n'.format(
+                         compression, compressing.get_available()))
 
-    config_file, config_file_fh = __create_config_file__(base_lonlathgt)
-    if config_file:
-        files.update({'config_file' : ('config_file', config_file_fh)})
+    return compression
 
-    if camera_metadata_file:
-        files.update({'camera_metadata_file' : (camera_metadata_file, camera_metadata_file_fh)})
 
-    if base_lonlathgt:
-        lon = base_lonlathgt[0]
-        lat = base_lonlathgt[1]
-        hgt = base_lonlathgt[2]
-        pos_str = '{},{},{}'.format(lat, lon, hgt)
-        files.update({'external_base_station_position' : (None, pos_str)})
+__capabilities__ = {}
+__capabilities_lock__ = threading.Lock()
+
 
-    if strategy:
-        files.update({'user_strategy' : (None, strategy)})
+def __get_capabilities__(api_key, tenant=None):
+    """
+    Upload encodings supported by the server, cached for each API and key.
+    Failed lookups are cached for CAPABILITIES_RETRY_S, so that the
+    submissions do not wait for the API status each time
+    """
 
-    logger.debug('Query parameters {}'.format(files))
+    key = (API_URL, api_key)
 
-    r = requests.post(url, headers=headers, files=files)
+    with __capabilities_lock__:
+        supported, expiration = __capabilities__.get(key, (None, None))
+        if supported is not None and (expiration is None or time.time() < expiration):
+            return supported
 
-    rover_file_fh.close()
-    if base_file_fh:
-        base_file_fh.close()
-    if config_file_fh:
-        config_file_fh.close()
-        os.remove(config_file)
-    if camera_metadata_file_fh:
-        camera_metadata_file_fh.close()
+    try:
+        status = api_status(api_key=api_key, tenant=tenant)
+    except Exception as e:
+        logger.debug('Could not get the capabilities of the API: {}'.format(e))
+        status = None
 
-    return r.json(), r.status_code
+    if status is None:
+        supported, expiration = [], time.time() + CAPABILITIES_RETRY_S
+    else:
+        supported, expiration = compressing.get_supported(status), None
+
+    with __capabilities_lock__:
+        __capabilities__[key] = (supported, expiration)
+
+    return supported
+
+
+def __submission_result__(ret, status_code, as_handle, download, api_key, secret_token, deadline, tenant):
+
+    if not as_handle:
+        return ret, status_code
+
+    from . import jobs
+
+    if status_code != 200:
+        return jobs.failed(InvalidResponse('Process could not be submitted (HTTP {}): {}'.format(status_code, ret)))
+
+    return jobs.track(ret['id'], download=download, deadline=deadline, api_key=api_key, secret_token=secret_token,
+                      tenant=tenant)
 
 # ------------------------------------------------------------------------------
 
-def get_status(process_id, api_key=None, secret_token=None):
+def get_status(process_id, api_key=None, secret_token=None, use_cache=True, deadline=None, tenant=None):
     """
     Check the status of a specific process_id
+
+    :param use_cache: Use the status cache (see the cache module), so that
+                    recent or terminal status are not requested again and
+                    concurrent requests for the same process are coalesced
+    :param deadline: Deadline of the request (see the deadline module)
+    :param tenant: Tenant (see the tenants module)
     """
 
     __check_process_id__(process_id)
     
-    api_key, secret_token = __fetch_credentials__(api_key, secret_token)
+    tenant = tenants.get(tenant)
+    api_key, secret_token = __fetch_credentials__(api_key, secret_token, tenant)
 
     url='{}/processes/{}'.format(API_URL, process_id)
 
-    headers = __build_headers__(api_key)
     params = { 'token' : secret_token }
 
-    r = requests.get(url, headers=headers, params=params)
+    def fetch(etag):
+        headers = __build_headers__(api_key)
+        if etag:
+            headers.update({'If-None-Match': etag})
 
-    return r.json(), r.status_code
+        r = __request__('get', url, deadline=deadline, hedge='status', tenant=tenant, headers=headers,
+                        params=params)
+
+        if r.status_code == 304:
+            return None, r.status_code, etag
+
+        return r.json(), r.status_code, r.headers.get('ETag', None)
+
+    if not use_cache:
+        status, status_code, _ = fetch(None)
+        return status, status_code
+
+    return cache.get_status(__get_cache_key__(process_id, api_key, secret_token), fetch)
+
+
+def __get_cache_key__(process_id, api_key, secret_token):
+
+    return (API_URL, api_key, secret_token, str(process_id))
 
 # ------------------------------------------------------------------------------
 
-def download_results(process_id, api_key=None, secret_token=None):
+def download_results(process_id, api_key=None, secret_token=None, deadline=None, connections=None, tenant=None):
     """
     Get the file bundle (compressed file) with the processing results
+
+    :param deadline: Deadline of the download (see the deadline module). The
+                    partially downloaded file is removed if it expires
+    :param connections: Number of concurrent connections used to download the
+                    file in segments (see the download module)
+    :param tenant: Tenant (see the tenants module)
     """
 
+    tenant = tenants.get(tenant)
+    api_key, secret_token = __fetch_credentials__(api_key, secret_token, tenant)
+
     status, status_code = get_status(process_id,
-                                     api_key=api_key, secret_token=secret_token)
+                                     api_key=api_key, secret_token=secret_token, deadline=deadline, tenant=tenant)
 
     if (status_code != 200):
         return None
@@ -160,32 +330,36 @@ def download_results(process_id, api_key=None, secret_token=None):
     zip_result = list(filter(lambda x: (x['type'] == 'zip'), status['results']))[0]
 
     url = zip_result["value"]
-    r = requests.get(url)
 
     basename = zip_result["name"]
     results_file_name = os.path.join(os.getcwd(), basename)
-    f = open(results_file_name, 'wb')
-    f.write(r.content)
-    f.close()
-    
-    return results_file_name
+
+    from . import download
+
+    try:
+        return download.download(url, results_file_name, connections=connections, deadline=deadline, tenant=tenant)
+    except Exception:
+        # The URL of the results may have expired, it is fetched again next time
+        cache.invalidate(__get_cache_key__(process_id, api_key, secret_token))
+        raise
 
 # ------------------------------------------------------------------------------
 
-def list_processes(api_key=None, secret_token=None, user_only=True):
+def list_processes(api_key=None, secret_token=None, user_only=True, deadline=None, tenant=None):
     """
     List the processess issued by the user (or all processes if the user has admin
     privileges)
     """
 
-    api_key, secret_token = __fetch_credentials__(api_key, secret_token)
+    tenant = tenants.get(tenant)
+    api_key, secret_token = __fetch_credentials__(api_key, secret_token, tenant)
 
     if user_only:
         url, headers, params, fields = __get_args_for_own_processes(api_key, secret_token)
     else:
         url, headers, params, fields = __get_args_for_all_processes(api_key, secret_token)
 
-    r = requests.get(url, headers=headers, params=params)
+    r = __request__('get', url, deadline=deadline, hedge='processes', tenant=tenant, headers=headers, params=params)
 
     processes = []
     if r.status_code == 200:
@@ -222,19 +396,20 @@ def __get_args_for_all_processes(api_key, secret_token, status='FINISHED'):
 
 # ------------------------------------------------------------------------------
 
-def api_status(api_key=None):
+def api_status(api_key=None, deadline=None, tenant=None):
     """
     Get the API status, containing the version of the software running the versions
     """
 
-    api_key, _ = __fetch_credentials__(api_key, None)
+    tenant = tenants.get(tenant)
+    api_key, _ = __fetch_credentials__(api_key, None, tenant)
 
     url='{}/status'.format(API_URL)
 
     headers = __build_headers__(api_key)
     params = {}
 
-    r = requests.get(url, headers=headers, params=params)
+    r = __request__('get', url, deadline=deadline, hedge='status', tenant=tenant, headers=headers, params=params)
 
     if r.status_code == 200:
         out = r.json()
@@ -246,6 +421,76 @@ def api_status(api_key=None):
 
 # ------------------------------------------------------------------------------
 
+def __request__(method, url, upload=False, deadline=None, hedge=None, tenant=None, **kwargs):
+    """
+    Issue a request to the API through the configured transport (see the
+    transport module), subject to the client-side rate limits (see the
+    ratelimit module), or through the transport and limits of the tenant if
+    provided (see the tenants module). Requests are recorded if tracing is
+    enabled (see the tracing module). Throttled requests (HTTP 429) are retried after
+    the delay requested by the server (Retry-After header) or an exponential
+    backoff
+
+    :param deadline: Deadline of the request (see the deadline module). The
+                    connect and read timeouts are clipped to it, and a
+                    DeadlineExceeded exception is raised if it expires before
+                    the request can be (re)issued
+    :param hedge: Kind of request, if it can be hedged (see the hedging
+                    module). Only GET requests are hedged, separately for
+                    each tenant
+    """
+
+    if hedge and method.lower() == 'get':
+        request = lambda: __send__(method, url, upload=upload, deadline=deadline, tenant=tenant, **kwargs)
+        # The hedged copies of each tenant are not delayed by the rest
+        return hedging.call(hedge, request, deadline=deadline, group=tenants.get_name(tenant))
+
+    return __send__(method, url, upload=upload, deadline=deadline, tenant=tenant, **kwargs)
+
+
+def __send__(method, url, upload=False, deadline=None, tenant=None, **kwargs):
+
+    deadline = deadline or Deadline()
+    read_timeout = UPLOAD_READ_TIMEOUT_S if upload else READ_TIMEOUT_S
+
+    limiter = tenant.limiter if tenant else ratelimit
+    client = tenant.transport if tenant else transport.get()
+
+    for attempt in range(MAX_THROTTLING_RETRIES + 1):
+
+        with limiter.request(upload=upload):
+            timeout = deadline.get_timeouts(CONNECT_TIMEOUT_S, read_timeout, 'Request to [ {} ]'.format(url))
+            tic = time.time()
+            try:
+                r = client.request(method, url, timeout=timeout, **kwargs)
+            except Exception as e:
+                tracing.record(method, url, API_URL, kwargs, error=e, start=tic)
+                raise
+            tracing.record(method, url, API_URL, kwargs, response=r, start=tic)
+
+        if r.status_code != 429 or attempt == MAX_THROTTLING_RETRIES:
+            return r
+
+        if kwargs.get('stream', False):
+            r.close()
+
+        delay = __get_retry_delay__(r, attempt)
+        logger.warning('Request to [ {} ] throttled, retrying in {} seconds'.format(url, delay))
+        if not deadline.sleep(delay):
+            deadline.check('Request to [ {} ]'.format(url))
+
+    return r
+
+
+def __get_retry_delay__(response, attempt):
+
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return 2 ** attempt
+
+# ------------------------------------------------------------------------------
+
 def __filter_process_info__(process_info, fields):
 
     out = { k:process_info[k] for k in fields}
@@ -273,7 +518,11 @@ def __build_headers__(api_key):
 
 # ------------------------------------------------------------------------------
 
-def __fetch_credentials__(api_key, secret_token):
+def __fetch_credentials__(api_key, secret_token, tenant=None):
+
+    if tenant is not None:
+        api_key = tenant.api_key if api_key is None else api_key
+        secret_token = tenant.secret_token if secret_token is None else secret_token
 
     if api_key is None:
         api_key = os.getenv('JASON_API_KEY', api_key)
@@ -306,7 +555,7 @@ def __create_config_file__(base_lonlathgt=None):
 
     fh.close()
 
-    fh = open(name, 'r')
+    fh = inputs.InputFile(name, algorithm=inputs.NONE)
 
     return name, fh
 
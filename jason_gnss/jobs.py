@@ -0,0 +1,249 @@
+"""
+Future based handles of the processes submitted to Jason
+
+A JobHandle is a concurrent.futures.Future, so it can be used with
+`concurrent.futures.wait` and `concurrent.futures.as_completed`. All the
+handles are tracked by a single background poller thread, and the results
+are downloaded by a shared pool of threads.
+
+>>> handles = [jason.submit_process(f, as_handle=True) for f in rover_files]
+>>> for handle in concurrent.futures.as_completed(handles):
+...     print(handle.process_id, handle.result())
+"""
+import concurrent.futures
+import threading
+import time
+
+from roktools import logger
+
+from . import jason, InvalidResponse, ProcessError
+from .deadline import get_deadline
+
+DEFAULT_POLLING_INTERVAL_S = 2.0
+
+# Maximum number of concurrent status requests and downloads
+DEFAULT_MAX_STATUS_REQUESTS = 4
+DEFAULT_MAX_DOWNLOADS = 4
+
+# Raised when completing an already completed future (Python >= 3.8)
+InvalidStateError = getattr(concurrent.futures, 'InvalidStateError', RuntimeError)
+
+# ------------------------------------------------------------------------------
+
+class JobHandle(concurrent.futures.Future):
+    """
+    Handle of a process submitted to Jason. Its result is the filename of
+    the results file (or the status of the process if the results are not
+    downloaded). If the process ends with an error, the exception is a
+    ProcessError
+    """
+
+    def __init__(self, process_id, download=True, timeout=None, deadline=None, api_key=None, secret_token=None,
+                 tenant=None):
+
+        super().__init__()
+
+        self.process_id = process_id
+        self.download = download
+        self.deadline = get_deadline(deadline, timeout)
+        self.api_key = api_key
+        self.secret_token = secret_token
+        self.tenant = tenant
+        self.downloading = False
+
+    def __repr__(self):
+
+        return '<JobHandle process_id={} {}>'.format(self.process_id, super().__repr__())
+
+# ------------------------------------------------------------------------------
+
+class JobPoller(object):
+    """
+    Track the status of a set of jobs with a single background thread, which
+    only runs while there are pending jobs
+    """
+
+    def __init__(self, interval=DEFAULT_POLLING_INTERVAL_S, max_status_requests=DEFAULT_MAX_STATUS_REQUESTS,
+                 max_downloads=DEFAULT_MAX_DOWNLOADS):
+
+        self.interval = interval
+        self.jobs = []
+        self.thread = None
+        self.lock = threading.Lock()
+
+        self.status_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_status_requests)
+        self.download_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_downloads)
+
+    def add(self, handle):
+
+        with self.lock:
+            self.jobs.append(handle)
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.__run__, name='jason-job-poller')
+                self.thread.daemon = True
+                self.thread.start()
+
+        return handle
+
+    def __run__(self):
+
+        try:
+            while True:
+                with self.lock:
+                    self.jobs = [job for job in self.jobs if not job.done()]
+                    jobs = [job for job in self.jobs if not job.downloading]
+
+                    if not self.jobs:
+                        return
+
+                list(self.status_executor.map(self.__poll__, jobs))
+
+                time.sleep(self.interval)
+        except Exception as e:
+            logger.critical('Job poller stopped: {}'.format(e))
+        finally:
+            # A new poller is started for the next job added, even if this
+            # one stopped because of an error
+            with self.lock:
+                self.thread = None
+
+    def __poll__(self, job):
+
+        if job.deadline.expired():
+            __set_exception__(job, ProcessError('Process [ {} ] did not end on time'.format(job.process_id)))
+            return
+
+        try:
+            status, status_code = jason.get_status(job.process_id, api_key=job.api_key,
+                                                   secret_token=job.secret_token, deadline=job.deadline,
+                                                   tenant=job.tenant)
+        except Exception as e:
+            logger.warning('Could not get the status of process [ {} ]: {}'.format(job.process_id, e))
+            return
+
+        if status_code != 200:
+            if 400 <= status_code < 500:
+                __set_exception__(job, InvalidResponse('Status of process [ {} ] not available (HTTP {}): {}'.format(
+                                  job.process_id, status_code, status)))
+            return
+
+        try:
+            process_status = status['process']['status']
+        except (KeyError, TypeError):
+            __set_exception__(job, InvalidResponse('Invalid status of process [ {} ]: {}'.format(
+                              job.process_id, status)))
+            return
+
+        logger.debug('Process [ {} ] status {}'.format(job.process_id, process_status))
+
+        if process_status == 'ERROR':
+            __set_exception__(job, ProcessError('Process [ {} ] ended with an error'.format(job.process_id)))
+        elif process_status == 'FINISHED':
+            if job.download:
+                job.downloading = True
+                self.download_executor.submit(self.__download__, job)
+            else:
+                __set_result__(job, status)
+
+    def __download__(self, job):
+
+        try:
+            results_file = jason.download_results(job.process_id, api_key=job.api_key,
+                                                  secret_token=job.secret_token, deadline=job.deadline,
+                                                  tenant=job.tenant)
+        except Exception as e:
+            __set_exception__(job, e)
+            return
+
+        if results_file is None:
+            __set_exception__(job, ProcessError('Results of process [ {} ] could not be downloaded'.format(
+                              job.process_id)))
+        else:
+            __set_result__(job, results_file)
+
+# ------------------------------------------------------------------------------
+
+def configure(interval=DEFAULT_POLLING_INTERVAL_S, max_status_requests=DEFAULT_MAX_STATUS_REQUESTS,
+              max_downloads=DEFAULT_MAX_DOWNLOADS):
+    """
+    Set the parameters of the poller used by the new job handles
+
+    :param interval: Time (in seconds) between status requests of a job
+    :param max_status_requests: Maximum number of concurrent status requests
+    :param max_downloads: Maximum number of concurrent downloads
+    """
+
+    global __poller__
+
+    __poller__ = JobPoller(interval=interval, max_status_requests=max_status_requests,
+                           max_downloads=max_downloads)
+
+
+def track(process_id, download=True, timeout=None, deadline=None, api_key=None, secret_token=None, tenant=None):
+    """
+    Get a handle for an already submitted process
+
+    :param process_id: ID of the process
+    :param download: Download the results once the process is finished (the
+                    result of the handle is then the results filename, otherwise
+                    it is the status of the process)
+    :param timeout: Maximum time (in seconds) to wait for the process to end
+                    and download its results
+    :param deadline: Deadline (see the deadline module) shared with other
+                    operations, instead of a timeout
+    :param tenant: Tenant of the process (see the tenants module)
+    :return: A JobHandle
+    """
+
+    handle = JobHandle(process_id, download=download, timeout=timeout, deadline=deadline,
+                       api_key=api_key, secret_token=secret_token, tenant=tenant)
+
+    return __get_poller__().add(handle)
+
+
+def failed(exception):
+    """
+    Get a handle already completed with an exception (e.g. process that could
+    not be submitted)
+    """
+
+    handle = JobHandle(None)
+    handle.set_exception(exception)
+
+    return handle
+
+# ------------------------------------------------------------------------------
+
+__poller__ = None
+__poller_lock__ = threading.Lock()
+
+
+def __get_poller__():
+
+    global __poller__
+
+    with __poller_lock__:
+        if __poller__ is None:
+            __poller__ = JobPoller()
+
+    return __poller__
+
+
+def __set_result__(job, result):
+
+    # The job might have been cancelled by the user meanwhile
+    if not job.done():
+        try:
+            job.set_result(result)
+        except InvalidStateError:
+            pass
+
+
+def __set_exception__(job, exception):
+
+    if not job.done():
+        try:
+            job.set_exception(exception)
+        except InvalidStateError:
+            pass
@@ -0,0 +1,134 @@
+"""
+Persistent (append-only) journal of the processes submitted to Jason
+
+Each state transition of a process (submitted, polling, finished,
+downloaded, ...) is appended as a JSON line to the journal file and synced
+to disk, so that unfinished processes can be resumed after a crash without
+submitting them again.
+
+The journal file is defined by the JASON_JOURNAL environment variable. Set
+it to an empty string to disable the journal.
+"""
+import collections
+import datetime
+import json
+import os
+import threading
+
+from roktools import logger
+
+JOURNAL_FILE = os.getenv('JASON_JOURNAL', os.path.join(os.path.expanduser('~'), '.jason', 'journal.jsonl'))
+
+SUBMITTED = 'submitted'
+POLLING = 'polling'
+FINISHED = 'finished'
+DOWNLOADED = 'downloaded'
+MERGED = 'merged'
+ERROR = 'error'
+
+__lock__ = threading.Lock()
+
+# ------------------------------------------------------------------------------
+
+def record(process_id, state, journal_file=None, **info):
+    """
+    Append a state transition of a process to the journal
+
+    :param process_id: ID of the process
+    :param state: New state of the process (see the module constants)
+    :param journal_file: Journal file, JOURNAL_FILE if not provided
+    :param info: Additional information of the process to store (e.g. the
+                 rover file or the results file). It is merged with the
+                 information of previous records of the same process
+    """
+
+    journal_file = JOURNAL_FILE if journal_file is None else journal_file
+    if not journal_file:
+        return
+
+    try:
+        append(journal_file, dict(info, process_id=str(process_id), state=state))
+    except OSError as e:
+        logger.warning('Could not write to the journal [ {} ]: {}'.format(journal_file, e))
+        return
+
+    logger.debug('Journal: process [ {} ] is {}'.format(process_id, state))
+
+
+def append(filename, entry):
+    """
+    Append an entry (JSON line) to an append-only file, e.g. the journal or
+    the queue of the scheduler, and sync it to disk. The time of the entry is
+    added to it
+
+    :return: The entry written
+    :raises OSError: If the file cannot be written
+    """
+
+    entry = dict(entry, time=datetime.datetime.utcnow().isoformat())
+
+    line = json.dumps(entry, sort_keys=True) + '\n'
+
+    folder = os.path.dirname(filename)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder, exist_ok=True)
+
+    # A single write in append mode, so that records from several processes
+    # are not interleaved
+    with __lock__, open(filename, 'a') as fh:
+        fh.write(line)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    return entry
+
+# ------------------------------------------------------------------------------
+
+def load(journal_file=None):
+    """
+    Load the journal
+
+    :return: Dictionary with the latest information of each process (indexed
+             by process id, as string), in order of submission
+    """
+
+    journal_file = JOURNAL_FILE if journal_file is None else journal_file
+
+    processes = collections.OrderedDict()
+
+    if not journal_file or not os.path.isfile(journal_file):
+        return processes
+
+    with open(journal_file, 'r') as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Truncated record (e.g. crash while writing)
+                logger.warning('Skipping invalid journal record [ {} ]'.format(line.strip()))
+                continue
+
+            processes.setdefault(entry['process_id'], {}).update(entry)
+
+    return processes
+
+# ------------------------------------------------------------------------------
+
+def get_unfinished(journal_file=None):
+    """
+    Get the processes of the journal that have not reached a final state:
+    results downloaded (and merged, for segments of a process) or error
+
+    :return: List of process information dictionaries
+    """
+
+    unfinished = []
+
+    for entry in load(journal_file=journal_file).values():
+
+        final_states = (MERGED, ERROR) if 'group' in entry else (DOWNLOADED, ERROR)
+
+        if entry['state'] not in final_states:
+            unfinished.append(entry)
+
+    return unfinished
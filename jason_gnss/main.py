@@ -16,14 +16,32 @@ Usage:
                                  [-l <label>] [--dynamics <dynamic_type>] 
                                  [-s <strategy>] [-t <seconds>] [-d <level>]
                                  [-i <images_folder>]
+                                 [--trim_base] [--trim_margin <seconds>]
+                                 [--decimate <rate>] [--compression <encoding>]
+                                 [--segment <seconds>] [--segment_overlap <seconds>]
+                                 [--tenant <name>]
     jason submit    <rover_file> [ <base_file> ] [ -p <lat> <lon> <height> ] 
                                  [-l <label>] [--dynamics <dynamic_type>] 
                                  [-s <strategy>] [-d <level>]
                                  [-i <images_folder>]
-    jason download  <process_id> [-d <level>]
-    jason status    <process_id> [-d <level>]
+                                 [--trim_base] [--trim_margin <seconds>]
+                                 [--decimate <rate>] [--compression <encoding>]
+                                 [--tenant <name>]
+    jason download  <process_id> [--connections <n>] [--tenant <name>] [-d <level>]
+    jason status    <process_id> [--tenant <name>] [-d <level>]
     jason convert   <gnss_file> [-d <level>]
-    jason list_processes [--all]
+    jason list_processes [--all] [--tenant <name>]
+    jason resume    [-t <seconds>] [-d <level>]
+    jason geotag    <results_file> <images_folder> [--exif] [--time_offset <seconds>] [-d <level>]
+    jason enqueue   <rover_file> [ <base_file> ] [ -p <lat> <lon> <height> ] 
+                                 [-l <label>] [--dynamics <dynamic_type>] 
+                                 [-s <strategy>] [-d <level>]
+                                 [-i <images_folder>]
+                                 [--trim_base] [--trim_margin <seconds>]
+                                 [--decimate <rate>] [--compression <encoding>]
+                                 [--project <name>] [--priority <n>] [--tenant <name>]
+    jason run_queue [--max_in_flight <n>] [--keep_running] [-d <level>]
+    jason queue     [-d <level>]
 
 Options:
     -h --help           shows the help
@@ -44,14 +62,48 @@ Options:
                         (SPP) [default: auto]
     -p --base_position <lat> <lon> <height>  
                         Optional base station position (in WGS84 format)
-    -t --timeout <seconds>  Maximum time to wait until the process is finished.
-                        If not specified, it will wait until process is done.
+    -t --timeout <seconds>  Maximum time to upload the files, wait until the process
+                        is finished and download the results. If not specified,
+                        it will wait until process is done.
     -i --images_folder <images_folder>
                         Specify the path of the folder containing the images for the photogrametic data. 
                         Obtains the metadata (EXIF) from the images in folder to match them with their
                         corresponding events.
+    --trim_base         Upload only the part of the base station file that
+                        covers the observation time span of the rover file
+                        (both files need to be in RINEX format)
+    --trim_margin <seconds>  Margin added before and after the rover time span
+                        when trimming the base station file [default: 300]
+    --decimate <rate>   Decimate the rover file (RINEX or UBX) to the given
+                        rate (in Hz) before uploading it (e.g. for static
+                        processing of high rate data). Event records are kept
+    --compression (auto | gzip | zstd | none)
+                        Compress the rover and base files while uploading them.
+                        With auto, they are compressed if the server supports
+                        it (default, or JASON_UPLOAD_COMPRESSION environment
+                        variable). zstd requires the zstandard package
+    --segment <seconds> Split the rover file (RINEX) into segments of this
+                        length, process them in parallel and merge the results
+    --segment_overlap <seconds>  Time that consecutive segments overlap [default: 120]
+    --connections <n>   Download the results in segments through this number
+                        of concurrent connections (if supported by the server)
     --all               List all processes instead of those for the user only
                         (requires an admin token)
+    --exif              Write the positions in the GPS EXIF tags of the images
+                        (requires the piexif package)
+    --time_offset <seconds>  Offset added to the timestamps of the images to
+                        convert them to GPS time [default: 18]
+    --project <name>    Project of the queued process. Processes of the same
+                        priority are submitted fairly among projects [default: default]
+    --priority <n>      Priority of the queued process, processes with higher
+                        priority are submitted first [default: 0]
+    --max_in_flight <n> Maximum number of processes running in the server at
+                        the same time [default: 4]
+    --tenant <name>     Use the credentials, connections and limits of this
+                        tenant, defined in the tenants file (JASON_TENANTS
+                        environment variable, by default ~/.jason/tenants.json)
+    --keep_running      Keep the scheduler running, waiting for new processes
+                        in the queue, once it is empty
 
 Commands:
     process        Submit a file to process and wait for the results (returns the process id)
@@ -63,6 +115,21 @@ Commands:
                    file comes from an Argonaut/MEDEA GNSS receiver, also provide
                    with the IMU measurements
     list_processes Get the list of processes issued by the user
+    resume         Wait for and download the results of the unfinished processes
+                   recorded in the journal (e.g. after a crash). The journal
+                   file is defined by the JASON_JOURNAL environment variable
+                   [default: ~/.jason/journal.jsonl]
+    geotag         Interpolate the position of the images of a folder from the
+                   trajectory of a results file (based on their EXIF timestamps).
+                   Positions are written to a geotags.csv file in the folder
+                   and, optionally, to the EXIF tags of the images
+    enqueue        Add a file to the queue of processes to be submitted by the
+                   scheduler. The queue file is defined by the JASON_QUEUE
+                   environment variable [default: ~/.jason/queue.jsonl]
+    run_queue      Run the scheduler: submit the processes of the queue by
+                   priority, keeping at most a number of them running in the
+                   server, and download their results
+    queue          List the processes of the queue and their state
 """
 import docopt
 import pkg_resources
@@ -109,6 +176,12 @@ def __get_command__(args):
 
         if '--timeout' in args and args['--timeout']:
             command_args.update({'timeout' : float(args['--timeout'])})
+
+        if args.get('--segment', None):
+            command_args.update({
+                'segment_length' : float(args['--segment']),
+                'segment_overlap' : float(args['--segment_overlap'])
+            })
     
     elif args['submit']:
         command = commands.submit
@@ -118,10 +191,19 @@ def __get_command__(args):
         command = commands.download
         command_args = { 'process_id': args.get('<process_id>', None)}
 
+        if args.get('--connections', None):
+            command_args.update({'connections' : int(args['--connections'])})
+
+        if args.get('--tenant', None):
+            command_args.update({'tenant' : args['--tenant']})
+
     elif args['status']:
         command = commands.status
         command_args = { 'process_id': args.get('<process_id>', None)}
 
+        if args.get('--tenant', None):
+            command_args.update({'tenant' : args['--tenant']})
+
     elif args['convert']:
         command = commands.process
         command_args = {
@@ -129,12 +211,47 @@ def __get_command__(args):
             'process_type' : "CONVERSION"
         }
     
+    elif args['resume']:
+        command = commands.resume
+        if args.get('--timeout', None):
+            command_args = { 'timeout' : float(args['--timeout']) }
+
+    elif args['geotag']:
+        command = commands.geotag
+        command_args = {
+            'results_file' : args['<results_file>'],
+            'images_folder' : args['<images_folder>'],
+            'write_exif' : args.get('--exif', False),
+            'time_offset' : float(args['--time_offset'])
+        }
+
+    elif args['enqueue']:
+        command = commands.enqueue
+        command_args = __get_submit_args__(args)
+        command_args.update({
+            'project' : args['--project'],
+            'priority' : int(args['--priority'])
+        })
+
+    elif args['run_queue']:
+        command = commands.run_queue
+        command_args = {
+            'max_in_flight' : int(args['--max_in_flight']),
+            'keep_running' : args.get('--keep_running', False)
+        }
+
+    elif args['queue']:
+        command = commands.queue
+
     elif args['list_processes']:
         command = commands.list_processes
         command_args = {
             'user_only': not args.get('--all', False),
         }
 
+        if args.get('--tenant', None):
+            command_args.update({'tenant' : args['--tenant']})
+
     return command, command_args
 
 
@@ -166,6 +283,21 @@ def __get_submit_args__(args):
     if '--images_folder' in args:
         command_args.update({'images_folder' : args['--images_folder']})
 
+    if args.get('--trim_base', False):
+        command_args.update({
+            'trim_base' : True,
+            'trim_margin' : float(args['--trim_margin'])
+        })
+
+    if args.get('--decimate', None):
+        command_args.update({'decimate' : float(args['--decimate'])})
+
+    if args.get('--compression', None):
+        command_args.update({'compression' : args['--compression']})
+
+    if args.get('--tenant', None):
+        command_args.update({'tenant' : args['--tenant']})
+
     return command_args
 
 
@@ -0,0 +1,280 @@
+"""
+Client-side rate limiting of the calls to the Jason API
+
+Three limits can be set:
+- The rate of requests (requests per second, with a burst capacity), enforced
+  with a token bucket
+- The maximum number of concurrent uploads
+- The maximum number of concurrent requests (until their response is
+  received), i.e. the concurrency budget of the client
+
+The limits are shared by all the threads of the process and, if a shared
+folder is configured, by all the processes of the host that use the same
+folder (based on file locks, only available in POSIX systems).
+
+The limits can be set with the following environment variables or with the
+`configure` function:
+- JASON_RATE_LIMIT: Maximum number of requests per second
+- JASON_RATE_BURST: Maximum number of requests issued in a burst
+- JASON_MAX_UPLOADS: Maximum number of concurrent uploads
+- JASON_MAX_REQUESTS: Maximum number of concurrent requests
+- JASON_RATE_LIMIT_FOLDER: Folder used to share the limits between processes
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from roktools import logger
+
+# Polling interval (in seconds) when waiting for a shared upload slot
+SLOT_POLLING_INTERVAL_S = 0.05
+
+# ------------------------------------------------------------------------------
+
+class TokenBucket(object):
+    """
+    Token bucket shared by the threads of the process
+    """
+
+    def __init__(self, rate, capacity=None):
+
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.timestamp = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token from the bucket, waiting for it if necessary
+        """
+
+        while True:
+            with self.lock:
+                self.tokens, self.timestamp, wait = __take__(
+                    self.tokens, self.timestamp, self.rate, self.capacity)
+
+            if wait <= 0:
+                return
+
+            time.sleep(wait)
+
+
+class SharedTokenBucket(object):
+    """
+    Token bucket shared by the processes of the host, the state of the bucket
+    is stored in a file that is locked while updated
+    """
+
+    def __init__(self, filename, rate, capacity=None):
+
+        self.filename = filename
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+
+    def acquire(self):
+        """
+        Take a token from the bucket, waiting for it if necessary
+        """
+
+        while True:
+            with open(self.filename, 'a+') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    fh.seek(0)
+                    try:
+                        state = json.loads(fh.read())
+                        tokens, timestamp = state['tokens'], state['timestamp']
+                    except (ValueError, KeyError):
+                        tokens, timestamp = self.capacity, time.time()
+
+                    tokens, timestamp, wait = __take__(tokens, timestamp, self.rate, self.capacity)
+
+                    fh.seek(0)
+                    fh.truncate()
+                    fh.write(json.dumps({'tokens': tokens, 'timestamp': timestamp}))
+                    fh.flush()
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+            if wait <= 0:
+                return
+
+            time.sleep(wait)
+
+
+class SharedSemaphore(object):
+    """
+    Semaphore shared by the processes (and threads) of the host, based on a
+    set of lock files (one per slot)
+    """
+
+    def __init__(self, prefix, value):
+
+        self.filenames = ['{}.{}.lock'.format(prefix, i) for i in range(value)]
+
+    def acquire(self):
+        """
+        Acquire a slot, waiting for it if necessary
+
+        :return: The file handler that holds the slot, to be passed to release
+        """
+
+        while True:
+            for filename in self.filenames:
+                fh = open(filename, 'a')
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fh
+                except OSError:
+                    fh.close()
+
+            time.sleep(SLOT_POLLING_INTERVAL_S)
+
+    def release(self, fh):
+
+        fcntl.flock(fh, fcntl.LOCK_UN)
+        fh.close()
+
+# ------------------------------------------------------------------------------
+
+class RateLimiter(object):
+    """
+    Rate, concurrent uploads and concurrent requests limiter
+    """
+
+    def __init__(self, rate=None, burst=None, max_uploads=None, max_requests=None, shared_folder=None):
+
+        if shared_folder and fcntl is None:
+            logger.warning('Limits cannot be shared between processes in this platform')
+            shared_folder = None
+
+        if shared_folder:
+            os.makedirs(shared_folder, exist_ok=True)
+
+        self.bucket = None
+        if rate:
+            if shared_folder:
+                self.bucket = SharedTokenBucket(os.path.join(shared_folder, 'jason_rate.json'), rate, burst)
+            else:
+                self.bucket = TokenBucket(rate, burst)
+
+        self.uploads = None
+        self.shared_uploads = None
+        if max_uploads:
+            if shared_folder:
+                self.shared_uploads = SharedSemaphore(os.path.join(shared_folder, 'jason_upload'), int(max_uploads))
+            else:
+                self.uploads = threading.BoundedSemaphore(int(max_uploads))
+
+        self.requests = None
+        self.shared_requests = None
+        if max_requests:
+            if shared_folder:
+                self.shared_requests = SharedSemaphore(os.path.join(shared_folder, 'jason_request'),
+                                                       int(max_requests))
+            else:
+                self.requests = threading.BoundedSemaphore(int(max_requests))
+
+    @contextlib.contextmanager
+    def request(self, upload=False):
+        """
+        Context manager to be wrapped around each call to the API. It blocks
+        until the call is allowed by the limits
+        """
+
+        # Upload slots are taken first, so that uploads waiting for one do
+        # not hold a request slot
+        with self.__slot__(self.uploads if upload else None, self.shared_uploads if upload else None), \
+             self.__slot__(self.requests, self.shared_requests):
+            if self.bucket:
+                self.bucket.acquire()
+            yield
+
+    @contextlib.contextmanager
+    def __slot__(self, semaphore, shared_semaphore):
+
+        if semaphore:
+            with semaphore:
+                yield
+        elif shared_semaphore:
+            slot = shared_semaphore.acquire()
+            try:
+                yield
+            finally:
+                shared_semaphore.release(slot)
+        else:
+            yield
+
+# ------------------------------------------------------------------------------
+
+def configure(rate=None, burst=None, max_uploads=None, max_requests=None, shared_folder=None):
+    """
+    Set the limits applied to the calls to the Jason API
+
+    :param rate: Maximum number of requests per second (None for no limit)
+    :param burst: Maximum number of requests issued in a burst (by default,
+                  the rate, with a minimum of 1)
+    :param max_uploads: Maximum number of concurrent uploads (None for no limit)
+    :param max_requests: Maximum number of concurrent requests (None for no
+                  limit)
+    :param shared_folder: Folder used to share the limits with other processes
+                  of the host. If None, the limits are shared only by the
+                  threads of this process
+    """
+
+    global __limiter__
+
+    __limiter__ = RateLimiter(rate=rate, burst=burst, max_uploads=max_uploads, max_requests=max_requests,
+                              shared_folder=shared_folder)
+
+
+def request(upload=False):
+    """
+    Context manager that blocks until a call to the API is allowed by the
+    configured limits
+
+    :param upload: Whether the call uploads files (and is therefore subject
+                   to the maximum number of concurrent uploads)
+    """
+
+    return __limiter__.request(upload=upload)
+
+# ------------------------------------------------------------------------------
+
+def __take__(tokens, timestamp, rate, capacity):
+    """
+    Refill the bucket and take a token from it
+
+    :return: Tuple with the new number of tokens, the new timestamp and the
+             time to wait (in seconds) before retrying if no token was available
+    """
+
+    now = time.time()
+    tokens = min(capacity, tokens + max(0.0, now - timestamp) * rate)
+
+    if tokens >= 1.0:
+        return tokens - 1.0, now, 0.0
+
+    return tokens, now, (1.0 - tokens) / rate
+
+
+def __env_float__(name):
+
+    value = os.getenv(name, None)
+
+    return float(value) if value else None
+
+
+__limiter__ = RateLimiter(rate=__env_float__('JASON_RATE_LIMIT'),
+                          burst=__env_float__('JASON_RATE_BURST'),
+                          max_uploads=__env_float__('JASON_MAX_UPLOADS'),
+                          max_requests=__env_float__('JASON_MAX_REQUESTS'),
+                          shared_folder=os.getenv('JASON_RATE_LIMIT_FOLDER', None))
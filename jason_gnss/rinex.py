@@ -0,0 +1,450 @@
+"""
+Streaming helpers for RINEX observation files (versions 2.x and 3.x)
+
+Files are processed epoch by epoch so that large (e.g. 24h) base station
+files can be handled without loading them into memory.
+"""
+import collections
+import contextlib
+import datetime
+import itertools
+import math
+import os
+import shutil
+import tempfile
+
+from roktools import logger
+
+# Single byte encoding so that any content (e.g. non ASCII comments) is
+# preserved and character offsets match byte offsets
+ENCODING = 'latin-1'
+
+HEADER_LABEL_SLICE = slice(60, 80)
+
+END_OF_HEADER = 'END OF HEADER'
+TIME_OF_FIRST_OBS = 'TIME OF FIRST OBS'
+TIME_OF_LAST_OBS = 'TIME OF LAST OBS'
+INTERVAL = 'INTERVAL'
+
+TEMPORARY_FOLDER_PREFIX = 'jason_gnss_'
+
+# Epoch flags for which the epoch record is followed by satellite observations
+# (as opposed to special records: events, header information, ...)
+OBSERVATION_FLAGS = (0, 1, 6)
+
+Epoch = collections.namedtuple('Epoch', ['time', 'flag', 'lines'])
+
+# ------------------------------------------------------------------------------
+
+def get_version(filename):
+    """
+    Get the RINEX version of an observation file
+
+    :param filename: Filename of the file to inspect
+    :return: The RINEX version (as float) or None if the file is not a RINEX
+             observation file
+    """
+
+    try:
+        with open(filename, 'r', encoding=ENCODING, newline='') as fh:
+            line = fh.readline()
+    except OSError:
+        return None
+
+    if line[HEADER_LABEL_SLICE].strip() != 'RINEX VERSION / TYPE':
+        return None
+
+    if line[20:21] != 'O':
+        return None
+
+    try:
+        return float(line[0:9])
+    except ValueError:
+        return None
+
+# ------------------------------------------------------------------------------
+
+def read_header(fh):
+    """
+    Read the header lines (including the END OF HEADER line) of an opened
+    RINEX file. Line terminators are preserved.
+    """
+
+    header = []
+
+    for line in fh:
+        header.append(line)
+        if line[HEADER_LABEL_SLICE].strip() == END_OF_HEADER:
+            break
+
+    return header
+
+# ------------------------------------------------------------------------------
+
+def iter_epochs(fh, header):
+    """
+    Iterate over the epoch blocks of an opened RINEX observation file whose
+    header has already been read with `read_header`
+
+    :param fh: File handler positioned right after the header
+    :param header: List of header lines
+    :return: Generator of Epoch tuples (time, flag, lines). The time is a
+             datetime instance or None for special records without epoch
+             (e.g. header information records)
+    """
+
+    version = float(header[0][0:9])
+
+    if version >= 3:
+        return __iter_epochs_v3__(fh)
+
+    return __iter_epochs_v2__(fh, __get_number_of_obs_types_v2__(header))
+
+# ------------------------------------------------------------------------------
+
+def get_time_span(filename):
+    """
+    Compute the time span covered by the observations of a RINEX file
+
+    :param filename: Filename of the RINEX observation file
+    :return: Tuple with the first and last epoch (datetime instances) or None
+             if the file is not a RINEX observation file or has no epochs
+    """
+
+    if get_version(filename) is None:
+        return None
+
+    first = None
+    last = None
+
+    with open(filename, 'r', encoding=ENCODING, newline='') as fh:
+        header = read_header(fh)
+        for epoch in iter_epochs(fh, header):
+            if epoch.time is None:
+                continue
+            if first is None:
+                first = epoch.time
+            last = epoch.time
+
+    if first is None:
+        return None
+
+    return first, last
+
+# ------------------------------------------------------------------------------
+
+def filter_epochs(filename, output_filename, predicate, interval=None):
+    """
+    Stream a RINEX observation file into another one keeping only the epochs
+    for which predicate(epoch) is True. The header is copied verbatim except
+    for the TIME OF FIRST/LAST OBS (and INTERVAL, if provided) records, which
+    are updated to match the epochs written.
+
+    :param predicate: Callable that receives an Epoch. Note that the time of
+                    the epoch is None for special records without time tag
+                    (e.g. in-file header records)
+    :param interval: New observation interval (in seconds) to set in the header
+    :return: Number of epochs written
+    """
+
+    n_epochs = 0
+    first = None
+    last = None
+
+    with open(filename, 'r', encoding=ENCODING, newline='') as fh, \
+         open(output_filename, 'w', encoding=ENCODING, newline='') as out_fh:
+
+        header = read_header(fh)
+
+        # Reserve the room for the header, it is written at the end, once
+        # the time of first and last observations are known
+        header_size = sum(len(line) for line in header)
+        out_fh.write(' ' * header_size)
+
+        for epoch in iter_epochs(fh, header):
+
+            if not predicate(epoch):
+                continue
+
+            out_fh.writelines(epoch.lines)
+            n_epochs += 1
+
+            if epoch.time is not None and epoch.flag in OBSERVATION_FLAGS:
+                first = epoch.time if first is None else first
+                last = epoch.time
+
+        out_fh.seek(0)
+        out_fh.writelines(__update_header__(header, first, last, interval))
+
+    return n_epochs
+
+# ------------------------------------------------------------------------------
+
+def trim(filename, start, end, output_filename=None):
+    """
+    Trim a RINEX observation file to the epochs within a time window. Special
+    records without time tag (e.g. in-file header records) are kept.
+
+    :param filename: Filename of the RINEX file to trim
+    :param start: Start of the time window (datetime)
+    :param end: End of the time window (datetime)
+    :param output_filename: Filename of the trimmed file. If not provided,
+                    the file will be created in a temporary folder with the
+                    same basename as the input file
+    :return: The filename of the trimmed file
+    """
+
+    if output_filename is None:
+        output_filename = temporary_filename(filename)
+
+    n_epochs = filter_epochs(filename, output_filename,
+                             lambda epoch: epoch.time is None or start <= epoch.time <= end)
+
+    logger.debug('Trimmed [ {} ] to [ {} , {} ]: {} epochs written in [ {} ]'.format(
+                 filename, start, end, n_epochs, output_filename))
+
+    return output_filename
+
+# ------------------------------------------------------------------------------
+
+def split(filename, windows, output_filenames):
+    """
+    Split a RINEX observation file into several (possibly overlapping) time
+    windows in a single pass. Special records without time tag (e.g. in-file
+    header records) are written to all the output files.
+
+    :param filename: Filename of the RINEX file to split
+    :param windows: List of (start, end) tuples (datetime instances)
+    :param output_filenames: List with the filename for each window
+    :return: List with the number of epochs written in each file
+    """
+
+    n_windows = len(windows)
+    n_epochs = [0] * n_windows
+    firsts = [None] * n_windows
+    lasts = [None] * n_windows
+
+    with open(filename, 'r', encoding=ENCODING, newline='') as fh, \
+         contextlib.ExitStack() as stack:
+
+        out_fhs = [stack.enter_context(open(f, 'w', encoding=ENCODING, newline=''))
+                   for f in output_filenames]
+
+        header = read_header(fh)
+
+        header_size = sum(len(line) for line in header)
+        for out_fh in out_fhs:
+            out_fh.write(' ' * header_size)
+
+        for epoch in iter_epochs(fh, header):
+
+            if epoch.time is None:
+                indices = range(n_windows)
+            else:
+                indices = [i for i, (start, end) in enumerate(windows) if start <= epoch.time <= end]
+
+            for i in indices:
+                out_fhs[i].writelines(epoch.lines)
+                n_epochs[i] += 1
+
+                if epoch.time is not None and epoch.flag in OBSERVATION_FLAGS:
+                    firsts[i] = epoch.time if firsts[i] is None else firsts[i]
+                    lasts[i] = epoch.time
+
+        for i, out_fh in enumerate(out_fhs):
+            out_fh.seek(0)
+            out_fh.writelines(__update_header__(header, firsts[i], lasts[i]))
+
+    return n_epochs
+
+# ------------------------------------------------------------------------------
+
+def trim_to_span(filename, reference_filename, margin=0):
+    """
+    Trim a RINEX observation file (e.g. a base station file) to the time
+    span of another RINEX file (e.g. a rover file) plus a margin
+
+    :param filename: Filename of the RINEX file to trim
+    :param reference_filename: Filename of the RINEX file whose time span
+                    defines the window
+    :param margin: Margin (in seconds) added before and after the time span
+    :return: The filename of the trimmed file (in a temporary folder) or None
+             if any of the files is not a RINEX observation file
+    """
+
+    if get_version(filename) is None:
+        logger.warning('File [ {} ] is not a RINEX observation file, cannot be trimmed'.format(filename))
+        return None
+
+    span = get_time_span(reference_filename)
+    if span is None:
+        logger.warning('Unable to determine the time span of [ {} ]'.format(reference_filename))
+        return None
+
+    margin = datetime.timedelta(seconds=margin)
+
+    return trim(filename, span[0] - margin, span[1] + margin)
+
+# ------------------------------------------------------------------------------
+
+def seconds_of_day(epoch):
+    """
+    Seconds elapsed since the start of the day of a datetime
+    """
+
+    midnight = epoch.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return (epoch - midnight).total_seconds()
+
+# ------------------------------------------------------------------------------
+
+def temporary_filename(filename):
+    """
+    Build a filename in a new temporary folder with the same basename as the
+    given file (so that the original name is kept when uploaded)
+    """
+
+    return os.path.join(tempfile.mkdtemp(prefix=TEMPORARY_FOLDER_PREFIX),
+                        os.path.basename(filename))
+
+# ------------------------------------------------------------------------------
+
+def remove(filename):
+    """
+    Remove a file created with `temporary_filename` (along with its temporary
+    folder)
+    """
+
+    folder = os.path.dirname(filename)
+
+    if os.path.basename(folder).startswith(TEMPORARY_FOLDER_PREFIX):
+        shutil.rmtree(folder, ignore_errors=True)
+    elif os.path.isfile(filename):
+        os.remove(filename)
+
+# ------------------------------------------------------------------------------
+
+def __iter_epochs_v2__(fh, n_obs_types):
+
+    lines_per_sat = max(1, int(math.ceil(n_obs_types / 5.0)))
+
+    for line in fh:
+
+        if not line.strip():
+            continue
+
+        flag, n = __parse_int__(line[28:29]), __parse_int__(line[29:32])
+        lines = [line]
+
+        if flag in OBSERVATION_FLAGS:
+            # Satellite list continuation lines (12 satellites per line)
+            n_lines = max(0, int(math.ceil(n / 12.0)) - 1) + n * lines_per_sat
+        else:
+            n_lines = n
+
+        lines.extend(itertools.islice(fh, n_lines))
+
+        yield Epoch(__parse_epoch_v2__(line), flag, lines)
+
+
+def __iter_epochs_v3__(fh):
+
+    for line in fh:
+
+        if not line.startswith('>'):
+            continue
+
+        flag, n = __parse_int__(line[31:32]), __parse_int__(line[32:35])
+        lines = [line]
+
+        lines.extend(itertools.islice(fh, n))
+
+        yield Epoch(__parse_epoch_v3__(line), flag, lines)
+
+# ------------------------------------------------------------------------------
+
+def __parse_epoch_v2__(line):
+
+    try:
+        year, month, day, hour, minute = [int(line[i:i+3]) for i in range(0, 15, 3)]
+        seconds = float(line[15:26])
+    except ValueError:
+        return None
+
+    year += 2000 if year < 80 else 1900
+
+    return __build_datetime__(year, month, day, hour, minute, seconds)
+
+
+def __parse_epoch_v3__(line):
+
+    try:
+        year = int(line[2:6])
+        month, day, hour, minute = [int(line[i:i+3]) for i in range(6, 18, 3)]
+        seconds = float(line[18:29])
+    except ValueError:
+        return None
+
+    return __build_datetime__(year, month, day, hour, minute, seconds)
+
+
+def __build_datetime__(year, month, day, hour, minute, seconds):
+
+    return datetime.datetime(year, month, day, hour, minute) + \
+           datetime.timedelta(seconds=seconds)
+
+# ------------------------------------------------------------------------------
+
+def __get_number_of_obs_types_v2__(header):
+
+    for line in header:
+        if line[HEADER_LABEL_SLICE].strip() == '# / TYPES OF OBSERV':
+            return __parse_int__(line[0:6])
+
+    return 0
+
+# ------------------------------------------------------------------------------
+
+def __update_header__(header, first, last, interval=None):
+
+    out = []
+
+    for line in header:
+        label = line[HEADER_LABEL_SLICE].strip()
+
+        if label == TIME_OF_FIRST_OBS and first is not None:
+            line = __format_time_record__(first) + line[43:]
+        elif label == TIME_OF_LAST_OBS and last is not None:
+            line = __format_time_record__(last) + line[43:]
+        elif label == INTERVAL and interval is not None:
+            # Epochs are only removed, the interval cannot get shorter
+            original = __parse_float__(line[0:10])
+            line = '{:10.3f}'.format(max(interval, original or 0.0)) + line[10:]
+
+        out.append(line)
+
+    return out
+
+
+def __format_time_record__(epoch):
+
+    seconds = epoch.second + epoch.microsecond / 1.0e6
+
+    return '{:6d}{:6d}{:6d}{:6d}{:6d}{:13.7f}'.format(
+           epoch.year, epoch.month, epoch.day, epoch.hour, epoch.minute, seconds)
+
+# ------------------------------------------------------------------------------
+
+def __parse_int__(field):
+
+    field = field.strip()
+
+    return int(field) if field else 0
+
+
+def __parse_float__(field):
+
+    try:
+        return float(field)
+    except ValueError:
+        return None
@@ -0,0 +1,371 @@
+"""
+Persistent priority scheduler of the submissions to Jason
+
+Jobs (rover file plus submission options) are added to a local queue file
+and submitted by a scheduler that keeps at most a given number of jobs in
+flight on the server: the next job is only submitted once a running one
+finishes. Each job can be submitted on behalf of a different tenant (see the
+tenants module), with its own credentials, connections and limits.
+
+The next job to submit is selected as follows:
+- Jobs with higher priority are always submitted first
+- Among jobs of the same priority, the project with fewer jobs in flight
+  (and then, the one served least recently) goes first, so that a bulk
+  project cannot starve the rest
+- Jobs of the same project are submitted in order of arrival
+
+As in the journal, each state transition of a job is appended as a JSON
+line to the queue file (JASON_QUEUE environment variable, by default
+~/.jason/queue.jsonl), so that jobs can be added from other processes while
+the scheduler runs and the scheduler can be restarted without losing jobs.
+
+>>> scheduler.enqueue('rover.obs', project='urgent_customer', priority=10)
+>>> scheduler.enqueue('bulk_001.obs', project='reprocessing')
+>>> scheduler.run(max_in_flight=4)
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from roktools import logger
+
+from . import jason, journal, tenants, AuthenticationError
+
+QUEUE_FILE = os.getenv('JASON_QUEUE', os.path.join(os.path.expanduser('~'), '.jason', 'queue.jsonl'))
+
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv('JASON_MAX_IN_FLIGHT', 4))
+DEFAULT_POLLING_INTERVAL_S = 5.0
+DEFAULT_PROJECT = 'default'
+DEFAULT_PRIORITY = 0
+
+# Maximum number of concurrent submissions (uploads) and downloads
+MAX_WORKERS = 4
+
+QUEUED = 'queued'
+SUBMITTED = 'submitted'
+FINISHED = 'finished'
+DOWNLOADED = 'downloaded'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+# Rejections of a submission after which it is retried later (the rest of
+# 4xx are final)
+TRANSIENT_STATUS_CODES = (408, 429)
+
+# ------------------------------------------------------------------------------
+
+def enqueue(rover_file, project=DEFAULT_PROJECT, priority=DEFAULT_PRIORITY, download=True, queue_file=None,
+            tenant=None, **submit_args):
+    """
+    Add a job to the queue
+
+    :param rover_file: Filename of the rover file
+    :param project: Project of the job (jobs of the same priority are shared
+                    fairly between projects)
+    :param priority: Priority of the job (higher values are submitted first)
+    :param download: Download the results once the process is finished.
+                    Only these jobs are recorded in the journal (see the
+                    journal module), so that `resume` does not download the
+                    results of the rest
+    :param queue_file: Queue file, QUEUE_FILE if not provided
+    :param tenant: Name of the tenant of the job (see the tenants module)
+    :param submit_args: Arguments of the submission (see commands.submit),
+                    which must be serializable to JSON
+    :return: The ID of the job
+    """
+
+    # Paths are stored as absolute so that the scheduler can run from any
+    # working directory
+    for key in ('base_file', 'images_folder', 'camera_metadata_file'):
+        if submit_args.get(key, None):
+            submit_args[key] = os.path.abspath(submit_args[key])
+
+    job_id = uuid.uuid4().hex[:12]
+
+    __record__(queue_file, job_id, QUEUED, rover_file=os.path.abspath(rover_file), project=str(project),
+               priority=int(priority), download=download, tenant=tenants.get_name(tenant),
+               args=submit_args)
+
+    logger.info('Job [ {} ] queued (project {}, priority {})'.format(job_id, project, priority))
+
+    return job_id
+
+
+def cancel(job_id, queue_file=None):
+    """
+    Cancel a job that has not been submitted yet
+
+    :return: True if the job was cancelled
+    """
+
+    job = load(queue_file=queue_file).get(job_id, None)
+
+    if job is None or job['state'] != QUEUED:
+        return False
+
+    __record__(queue_file, job_id, CANCELLED)
+
+    return True
+
+# ------------------------------------------------------------------------------
+
+def load(queue_file=None):
+    """
+    Load the queue
+
+    :return: Dictionary with the latest information of each job (indexed by
+             job id), in order of arrival
+    """
+
+    queue_file = QUEUE_FILE if queue_file is None else queue_file
+
+    jobs = collections.OrderedDict()
+
+    if not os.path.isfile(queue_file):
+        return jobs
+
+    with open(queue_file, 'r') as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning('Skipping invalid queue record [ {} ]'.format(line.strip()))
+                continue
+
+            jobs.setdefault(entry['job_id'], {}).update(entry)
+
+    return jobs
+
+# ------------------------------------------------------------------------------
+
+def select(jobs, slots):
+    """
+    Select the next jobs to submit
+
+    :param jobs: List of jobs (see `load`)
+    :param slots: Number of jobs to select
+    :return: List of jobs, in order of submission
+    """
+
+    pending = [job for job in jobs if job['state'] == QUEUED]
+
+    in_flight = collections.Counter(job['project'] for job in jobs if job['state'] == SUBMITTED)
+    last_served = {}
+    for job in jobs:
+        if 'submitted_at' in job:
+            last_served[job['project']] = max(last_served.get(job['project'], 0), job['submitted_at'])
+
+    # Order in which the projects are selected now, which is after any
+    # previous submission
+    selections = {}
+
+    selected = []
+    while pending and len(selected) < slots:
+
+        top = max(job['priority'] for job in pending)
+
+        # Oldest job of each project with the highest priority
+        candidates = collections.OrderedDict()
+        for job in pending:
+            if job['priority'] == top:
+                candidates.setdefault(job['project'], job)
+
+        project = min(candidates, key=lambda p: (in_flight[p], selections.get(p, 0), last_served.get(p, 0)))
+        job = candidates[project]
+
+        selected.append(job)
+        pending.remove(job)
+        in_flight[project] += 1
+        selections[project] = len(selected)
+
+    return selected
+
+# ------------------------------------------------------------------------------
+
+class Scheduler(object):
+    """
+    Submit the jobs of the queue keeping at most `max_in_flight` of them
+    running in the server. Only one scheduler can run for a queue file
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, queue_file=None, interval=DEFAULT_POLLING_INTERVAL_S,
+                 max_workers=MAX_WORKERS):
+
+        self.max_in_flight = max_in_flight
+        self.queue_file = QUEUE_FILE if queue_file is None else queue_file
+        self.interval = interval
+
+        self.submit_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.download_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.downloading = {}
+
+    def run(self, keep_running=False):
+        """
+        Run the scheduler until the queue is empty (or forever, waiting for
+        new jobs, if `keep_running`)
+        """
+
+        with self.__exclusive__():
+            while True:
+                pending = self.step()
+
+                if not pending and not keep_running:
+                    break
+
+                time.sleep(self.interval)
+
+    def step(self):
+        """
+        Update the status of the jobs in flight and submit new jobs to the
+        free slots
+
+        :return: Number of jobs not finished yet (queued, in flight or being
+                 downloaded)
+        """
+
+        jobs = list(load(queue_file=self.queue_file).values())
+
+        for job in jobs:
+            if job['state'] == SUBMITTED:
+                job.update(self.__poll__(job))
+
+        self.downloading = {k: f for k, f in self.downloading.items() if not f.done()}
+        for job in jobs:
+            if job['state'] == FINISHED and job['download'] and job['job_id'] not in self.downloading:
+                self.downloading[job['job_id']] = self.download_executor.submit(self.__download__, job)
+
+        in_flight = sum(1 for job in jobs if job['state'] == SUBMITTED)
+        selected = select(jobs, self.max_in_flight - in_flight)
+
+        for job, update in zip(selected, self.submit_executor.map(self.__submit__, selected)):
+            job.update(update)
+
+        return sum(1 for job in jobs if job['state'] in (QUEUED, SUBMITTED)) + len(self.downloading)
+
+    # --------------------------------------------------------------------------
+
+    def __submit__(self, job):
+
+        from . import commands
+
+        logger.info('Submitting job [ {} ] (project {}, priority {})'.format(
+                    job['job_id'], job['project'], job['priority']))
+
+        try:
+            process_id, return_code = commands.__submit__(job['rover_file'], tenant=job.get('tenant', None),
+                                                          record=job['download'], **job['args'])
+        except AuthenticationError as e:
+            return __record__(self.queue_file, job['job_id'], ERROR, error=str(e).strip())
+        except Exception as e:
+            # Transient errors (e.g. network): the job is submitted later
+            logger.warning('Job [ {} ] could not be submitted, will be retried: {}'.format(job['job_id'], e))
+            return {}
+
+        if process_id is None and return_code is not None and \
+           (return_code >= 500 or return_code in TRANSIENT_STATUS_CODES):
+            # e.g. rate limited or server unavailable: the job is submitted later
+            logger.warning('Job [ {} ] rejected (HTTP {}), will be retried'.format(job['job_id'], return_code))
+            return {}
+
+        if process_id is None:
+            error = 'Submission rejected' + (' (HTTP {})'.format(return_code) if return_code else '')
+            return __record__(self.queue_file, job['job_id'], ERROR, error=error)
+
+        return __record__(self.queue_file, job['job_id'], SUBMITTED, process_id=process_id,
+                          submitted_at=time.time())
+
+    def __poll__(self, job):
+
+        try:
+            status, status_code = jason.get_status(job['process_id'], tenant=job.get('tenant', None))
+        except Exception as e:
+            logger.warning('Could not get the status of job [ {} ]: {}'.format(job['job_id'], e))
+            return {}
+
+        if status_code != 200:
+            return {}
+
+        try:
+            process_status = status['process']['status']
+        except (KeyError, TypeError):
+            logger.warning('Invalid status of job [ {} ]: {}'.format(job['job_id'], status))
+            return {}
+
+        if process_status == 'FINISHED':
+            if job['download']:
+                journal.record(job['process_id'], journal.FINISHED)
+            return __record__(self.queue_file, job['job_id'], FINISHED)
+        elif process_status == 'ERROR':
+            if job['download']:
+                journal.record(job['process_id'], journal.ERROR)
+            return __record__(self.queue_file, job['job_id'], ERROR, error='Process ended with an error')
+
+        return {}
+
+    def __download__(self, job):
+
+        try:
+            results_file = jason.download_results(job['process_id'], tenant=job.get('tenant', None))
+        except Exception as e:
+            logger.warning('Results of job [ {} ] could not be downloaded, will be retried: {}'.format(
+                           job['job_id'], e))
+            return
+
+        if results_file:
+            journal.record(job['process_id'], journal.DOWNLOADED, results_file=results_file)
+            __record__(self.queue_file, job['job_id'], DOWNLOADED, results_file=results_file)
+        else:
+            __record__(self.queue_file, job['job_id'], ERROR, error='Results could not be downloaded')
+
+    def __exclusive__(self):
+
+        lock_file = self.queue_file + '.lock'
+        folder = os.path.dirname(lock_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        fh = open(lock_file, 'a')
+
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                raise RuntimeError('Another scheduler is running for the queue [ {} ]'.format(self.queue_file))
+
+        # Closing the file releases the lock
+        return fh
+
+# ------------------------------------------------------------------------------
+
+def run(max_in_flight=DEFAULT_MAX_IN_FLIGHT, queue_file=None, interval=DEFAULT_POLLING_INTERVAL_S,
+        keep_running=False):
+    """
+    Run a scheduler for the queue (see Scheduler)
+
+    :return: List of the jobs of the queue
+    """
+
+    Scheduler(max_in_flight=max_in_flight, queue_file=queue_file, interval=interval).run(keep_running=keep_running)
+
+    return list(load(queue_file=queue_file).values())
+
+# ------------------------------------------------------------------------------
+
+def __record__(queue_file, job_id, state, **info):
+
+    queue_file = QUEUE_FILE if queue_file is None else queue_file
+
+    entry = journal.append(queue_file, dict(info, job_id=job_id, state=state))
+
+    logger.debug('Queue: job [ {} ] is {}'.format(job_id, state))
+
+    return entry
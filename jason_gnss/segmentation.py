@@ -0,0 +1,166 @@
+"""
+Split long rover sessions into overlapping time segments and stitch the
+results of the segments back into a single solution
+"""
+import datetime
+import math
+import os
+import tempfile
+import zipfile
+
+from roktools import logger
+
+from . import rinex, timeseries
+
+# ------------------------------------------------------------------------------
+
+def get_windows(start, end, segment_length, overlap=0):
+    """
+    Compute the time windows of the segments covering a time span
+
+    :param start: Start of the time span (datetime)
+    :param end: End of the time span (datetime)
+    :param segment_length: Length of each segment (in seconds), not counting
+                    the overlap
+    :param overlap: Time (in seconds) that consecutive segments overlap
+    :return: List of (start, end) tuples
+    """
+
+    duration = (end - start).total_seconds()
+    n_segments = max(1, int(math.ceil(duration / float(segment_length))))
+
+    windows = []
+    for i in range(n_segments):
+        window_start = start + datetime.timedelta(seconds=i * segment_length - overlap / 2.0)
+        window_end = start + datetime.timedelta(seconds=(i + 1) * segment_length + overlap / 2.0)
+        windows.append((max(start, window_start), min(end, window_end)))
+
+    return windows
+
+# ------------------------------------------------------------------------------
+
+def split(rover_file, segment_length, overlap=0):
+    """
+    Split a rover file (RINEX) into overlapping time segments
+
+    :param rover_file: Filename of the rover file
+    :param segment_length: Length of each segment (in seconds)
+    :param overlap: Time (in seconds) that consecutive segments overlap
+    :return: List with the filenames of the segments (in a temporary folder)
+             or None if the file cannot be split (not a RINEX file or shorter
+             than a segment)
+    """
+
+    span = rinex.get_time_span(rover_file)
+    if span is None:
+        logger.warning('Rover file [ {} ] is not a RINEX observation file, cannot be split'.format(rover_file))
+        return None
+
+    windows = get_windows(span[0], span[1], segment_length, overlap=overlap)
+    if len(windows) < 2:
+        return None
+
+    folder = tempfile.mkdtemp(prefix=rinex.TEMPORARY_FOLDER_PREFIX)
+    root, ext = os.path.splitext(os.path.basename(rover_file))
+    filenames = [os.path.join(folder, '{}_segment_{:02d}{}'.format(root, i, ext))
+                 for i in range(len(windows))]
+
+    n_epochs = rinex.split(rover_file, windows, filenames)
+
+    logger.debug('Split [ {} ] into {} segments with {} epochs'.format(rover_file, len(windows), n_epochs))
+
+    return filenames
+
+# ------------------------------------------------------------------------------
+
+def merge_results(results_files, output_filename=None):
+    """
+    Merge the results bundles (zip files) of consecutive segments
+
+    Time series files (see timeseries.EXTENSIONS) present in all bundles, with
+    a time tag in all the lines after the header, are stitched: each segment
+    contributes the rows up to the midpoint of its overlap with the next
+    segment (rows exactly at the midpoint are taken from the later segment).
+    The rest of files are stored unchanged in a folder per segment.
+
+    :param results_files: List of results files, sorted by segment time
+    :param output_filename: Filename of the merged bundle. If not provided, it
+                    is derived from the name of the first results file
+    :return: The filename of the merged bundle
+    """
+
+    if output_filename is None:
+        root, _ = os.path.splitext(results_files[0])
+        output_filename = '{}_merged.zip'.format(root)
+
+    archives = [zipfile.ZipFile(f, 'r') for f in results_files]
+
+    try:
+        with zipfile.ZipFile(output_filename, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+
+            merged = set()
+            for name in archives[0].namelist():
+
+                if not name.lower().endswith(timeseries.EXTENSIONS):
+                    continue
+
+                if not all(name in archive.namelist() for archive in archives):
+                    continue
+
+                contents = merge_time_series([archive.read(name) for archive in archives])
+                if contents is not None:
+                    out_zip.writestr(name, contents)
+                    merged.add(name)
+
+            for i, archive in enumerate(archives):
+                for name in archive.namelist():
+                    if name not in merged:
+                        out_zip.writestr('segment_{:02d}/{}'.format(i, name), archive.read(name))
+
+    finally:
+        for archive in archives:
+            archive.close()
+
+    logger.debug('Merged {} results files into [ {} ]'.format(len(results_files), output_filename))
+
+    return output_filename
+
+# ------------------------------------------------------------------------------
+
+def merge_time_series(contents):
+    """
+    Stitch the contents of time series text files of consecutive segments
+
+    :param contents: List with the contents (bytes) of each segment file
+    :return: The stitched contents (bytes) or None if the contents cannot be
+             interpreted as time series (e.g. there are lines without time
+             tag after the first row)
+    """
+
+    segments = []
+
+    for content in contents:
+        try:
+            header, rows = timeseries.parse(content.decode('utf-8'), strict=True)
+        except (UnicodeDecodeError, ValueError):
+            return None
+
+        if not rows:
+            return None
+
+        segments.append((header, rows))
+
+    # Boundaries between segments, at the midpoint of the overlaps
+    boundaries = [-float('inf')]
+    for (_, previous), (_, current) in zip(segments[:-1], segments[1:]):
+        previous_end = max(t for t, _ in previous)
+        current_start = min(t for t, _ in current)
+        boundaries.append((previous_end + current_start) / 2.0)
+    boundaries.append(float('inf'))
+
+    lines = list(segments[0][0])
+    for i, (_, rows) in enumerate(segments):
+        lines.extend(line for t, line in rows if boundaries[i] <= t < boundaries[i + 1])
+
+    return ''.join(lines).encode('utf-8')
+
@@ -0,0 +1,201 @@
+"""
+Registry of the credentials of several tenants (e.g. customers) of a single
+client process
+
+Each tenant has its own API key and secret token and, so that the backlog of
+one tenant does not degrade the latency of the rest, its own:
+- Pool of connections (a transport, see the transport module)
+- Rate limits (requests per second and concurrent uploads, see the ratelimit
+  module)
+- Concurrency budget (maximum number of concurrent requests)
+
+The tenant is selected with the `tenant` argument (name or Tenant) of the
+functions of the jason module (and of the commands, jobs and scheduler).
+Explicit `api_key` and `secret_token` arguments take precedence over the
+ones of the tenant. Calls without tenant use the credentials of the
+environment variables (JASON_API_KEY and JASON_SECRET_TOKEN) and the global
+transport and limits.
+
+Tenants are added with `register` or loaded from a JSON file (JASON_TENANTS
+environment variable, by default ~/.jason/tenants.json, loaded on first use
+without replacing the tenants already registered) that maps the name of each
+tenant to its credentials and limits:
+
+    {
+        "customer_a": {"api_key": "...", "secret_token": "...", "rate": 5, "max_requests": 8},
+        "customer_b": {"api_key": "...", "secret_token": "...", "max_uploads": 2}
+    }
+
+>>> tenants.register('customer_a', api_key, secret_token, rate=5, max_requests=8)
+>>> jason.submit_process('rover.obs', tenant='customer_a')
+"""
+import json
+import os
+import threading
+
+from roktools import logger
+
+from . import AuthenticationError, ratelimit
+from . import transport as transports
+
+TENANTS_FILE = os.getenv('JASON_TENANTS', os.path.join(os.path.expanduser('~'), '.jason', 'tenants.json'))
+
+# ------------------------------------------------------------------------------
+
+class Tenant(object):
+    """
+    Credentials, connection pool and limits of a tenant
+    """
+
+    def __init__(self, name, api_key, secret_token, rate=None, burst=None, max_uploads=None, max_requests=None,
+                 transport=None, pool_size=transports.DEFAULT_POOL_SIZE):
+        """
+        :param rate: Maximum number of requests per second (None for no limit)
+        :param burst: Maximum number of requests issued in a burst
+        :param max_uploads: Maximum number of concurrent uploads
+        :param max_requests: Maximum number of concurrent requests
+        :param transport: Name of the transport (by default, the one of
+                    JASON_TRANSPORT) or transport object
+        :param pool_size: Maximum number of connections kept open to each host
+        """
+
+        self.name = name
+        self.api_key = api_key
+        self.secret_token = secret_token
+
+        self.limiter = ratelimit.RateLimiter(rate=rate, burst=burst, max_uploads=max_uploads,
+                                             max_requests=max_requests)
+
+        if transport is None or isinstance(transport, str):
+            transport = transports.create(transport or transports.DEFAULT_TRANSPORT, pool_size=pool_size)
+        self.transport = transport
+
+    def __repr__(self):
+
+        # Credentials are not shown
+        return '<Tenant {}>'.format(self.name)
+
+    def close(self):
+
+        self.transport.close()
+
+# ------------------------------------------------------------------------------
+
+def register(name, api_key, secret_token, **options):
+    """
+    Add (or replace) a tenant
+
+    :param options: Limits and transport of the tenant (see Tenant)
+    :return: The Tenant
+    """
+
+    tenant = Tenant(name, api_key, secret_token, **options)
+
+    with __lock__:
+        previous = __tenants__.get(name, None)
+        __tenants__[name] = tenant
+
+    if previous is not None:
+        previous.close()
+
+    return tenant
+
+
+def remove(name):
+    """
+    Remove a tenant (and close its connections)
+    """
+
+    with __lock__:
+        tenant = __tenants__.pop(name, None)
+
+    if tenant is not None:
+        tenant.close()
+
+
+def load(filename=None, replace=True):
+    """
+    Register the tenants of a JSON file (see the module documentation)
+
+    :param replace: Replace the tenants already registered with the same name
+    :return: Names of the tenants loaded
+    """
+
+    filename = TENANTS_FILE if filename is None else filename
+
+    with open(filename, 'r') as fh:
+        config = json.load(fh)
+
+    with __lock__:
+        registered = set(__tenants__)
+
+    names = [name for name in config if replace or name not in registered]
+
+    for name in names:
+        options = dict(config[name])
+        register(name, options.pop('api_key'), options.pop('secret_token'), **options)
+
+    logger.debug('Loaded tenants {} from [ {} ]'.format(sorted(names), filename))
+
+    return names
+
+
+def get_names():
+    """
+    Names of the registered tenants
+    """
+
+    __load_default__()
+
+    with __lock__:
+        return sorted(__tenants__)
+
+
+def get(tenant):
+    """
+    Get a tenant
+
+    :param tenant: Name of the tenant, Tenant or None
+    :return: The Tenant (None if `tenant` is None)
+    """
+
+    if tenant is None or isinstance(tenant, Tenant):
+        return tenant
+
+    __load_default__()
+
+    with __lock__:
+        if tenant not in __tenants__:
+            raise AuthenticationError('Unknown tenant [ {} ]\n'.format(tenant))
+
+        return __tenants__[tenant]
+
+
+def get_name(tenant):
+    """
+    Name of a tenant (name or Tenant), e.g. to be stored in a journal
+    """
+
+    return tenant.name if isinstance(tenant, Tenant) else tenant
+
+# ------------------------------------------------------------------------------
+
+def __load_default__():
+
+    global __loaded__
+
+    with __load_lock__:
+        if __loaded__:
+            return
+        __loaded__ = True
+
+        # Tenants registered programmatically take precedence
+        if os.path.isfile(TENANTS_FILE):
+            load(TENANTS_FILE, replace=False)
+
+
+__lock__ = threading.Lock()
+__load_lock__ = threading.Lock()
+
+__tenants__ = {}
+__loaded__ = False
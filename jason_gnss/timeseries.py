@@ -0,0 +1,112 @@
+"""
+Parsing of time series text files (e.g. the trajectories of the results
+bundle), where each row starts with a time tag
+"""
+import datetime
+import re
+
+# Extension of the files of the results bundle that are considered to be
+# time series (e.g. trajectories)
+EXTENSIONS = ('.csv', '.pos', '.txt')
+
+GPS_EPOCH = datetime.datetime(1980, 1, 6)
+SECONDS_PER_WEEK = 604800
+
+DATETIME_FORMATS = [
+    '%Y/%m/%d %H:%M:%S.%f', '%Y/%m/%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'
+]
+
+FIELD_SEPARATOR = re.compile(r'[,;\s]+')
+
+COMMENT_CHARS = ('#', '%')
+
+# ------------------------------------------------------------------------------
+
+def parse(text, strict=False):
+    """
+    Parse the contents of a time series file
+
+    :param strict: Raise a ValueError if there are lines without time tag
+                   (other than blank lines) after the first row, instead of
+                   skipping them
+    :return: Tuple with the header (list of lines before the first row with
+             time tag) and the rows (list of (time, line) tuples)
+    """
+
+    header = []
+    rows = []
+
+    for line in text.splitlines(True):
+
+        t = parse_time(line)
+
+        if t is not None:
+            rows.append((t, line))
+        elif not rows:
+            header.append(line)
+        elif strict and line.strip():
+            raise ValueError('Line without time tag after the first row: {}'.format(line.strip()))
+
+    return header, rows
+
+# ------------------------------------------------------------------------------
+
+def split_fields(line):
+    """
+    Split a line into fields (separated by commas, semicolons or blanks)
+    """
+
+    return FIELD_SEPARATOR.split(line.strip().lstrip(''.join(COMMENT_CHARS)).strip())
+
+# ------------------------------------------------------------------------------
+
+def parse_time(line):
+    """
+    Get the time tag (in seconds) of a row of a time series. The following
+    time tags (first columns of the row) are supported:
+    - GPS week and seconds of week (returned as seconds since the GPS epoch)
+    - Seconds (e.g. seconds of week, Unix timestamp)
+    - Date and time (e.g. '2017/02/22 10:26:00.000', returned as seconds since
+      the GPS epoch)
+
+    :return: The time tag or None if the line is not a row of the time series
+    """
+
+    fields = FIELD_SEPARATOR.split(line.strip())
+
+    if not fields or not fields[0] or fields[0].startswith(COMMENT_CHARS):
+        return None
+
+    try:
+        t = float(fields[0])
+    except ValueError:
+        return __parse_datetime__(fields)
+
+    try:
+        sow = float(fields[1]) if len(fields) > 1 else None
+    except ValueError:
+        sow = None
+
+    if t.is_integer() and 0 <= t < 10000 and sow is not None and 0 <= sow < SECONDS_PER_WEEK:
+        return t * SECONDS_PER_WEEK + sow
+
+    return t
+
+# ------------------------------------------------------------------------------
+
+def __parse_datetime__(fields):
+
+    candidates = [' '.join(fields[:2]), fields[0]]
+
+    for candidate in candidates:
+        for datetime_format in DATETIME_FORMATS:
+            try:
+                epoch = datetime.datetime.strptime(candidate, datetime_format)
+            except ValueError:
+                continue
+
+            return (epoch - GPS_EPOCH).total_seconds()
+
+    return None
@@ -0,0 +1,370 @@
+"""
+Recording of the requests to Jason in a trace file
+
+When enabled (JASON_TRACE environment variable with the name of the trace
+file, or the `start` function), every request issued by the SDK (API calls,
+uploads and downloads of results) is recorded, with its timing and
+metadata, as a JSON line of a gzip compressed file:
+
+- t, duration: Time (in seconds) since the start of the trace at which the
+  request was issued and time until its response was received
+- thread: Index of the thread that issued the request (for concurrency)
+- method, kind ('api_status', 'submit', 'status', 'processes', 'results' or
+  'other'), path (relative to the API URL, or the name of the results file)
+  and params
+- upload: Size (and extension) of each uploaded file, and value of the rest
+  of fields of the submission
+- status_code, headers: Status and relevant headers of the response
+- json: Body of the response if it is JSON, otherwise its size (size)
+- error: Name of the exception, if the request failed
+
+Credentials are never written: the API key and the secret token are replaced
+by placeholders wherever they appear (paths, params, fields and bodies), and
+the query of the URLs in the responses (e.g. signatures of the results URLs)
+is removed. The contents of uploaded and downloaded files are replaced by
+their size, so that they can be replayed with filler of the same size (see
+benchmarks.replay).
+
+>>> tracing.start('traffic.jsonl.gz')
+>>> ...
+>>> tracing.stop()
+"""
+import atexit
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+from roktools import logger
+
+VERSION = 1
+
+API_STATUS = 'api_status'
+SUBMIT = 'submit'
+STATUS = 'status'
+PROCESSES = 'processes'
+RESULTS = 'results'
+OTHER = 'other'
+
+API_KEY_PLACEHOLDER = '<api_key>'
+TOKEN_PLACEHOLDER = '<token>'
+
+# Request and response headers kept in the trace
+REQUEST_HEADERS = ['Range', 'If-Range', 'If-None-Match', 'Content-Type']
+RESPONSE_HEADERS = ['Content-Length', 'Content-Range', 'Content-Type', 'ETag', 'Retry-After']
+
+KINDS = [
+    ('GET', re.compile(r'/status$'), API_STATUS),
+    ('POST', re.compile(r'/processes$'), SUBMIT),
+    ('GET', re.compile(r'/processes/(\d+)$'), STATUS),
+    ('GET', re.compile(r'/processes$'), PROCESSES),
+    ('GET', re.compile(r'/users/[^/]+/processes$'), PROCESSES)
+]
+
+USER_PATH = re.compile(r'/users/[^/]+/')
+
+# ------------------------------------------------------------------------------
+
+class Recorder(object):
+    """
+    Writer of a trace file, shared by the threads of the process
+    """
+
+    def __init__(self, filename):
+
+        self.filename = filename
+        self.start = time.time()
+        self.threads = {}
+        self.lock = threading.Lock()
+
+        folder = os.path.dirname(filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.fh = gzip.open(filename, 'wt', encoding='utf-8')
+        self.__write__({'version': VERSION, 'start': datetime.datetime.utcnow().isoformat()})
+
+    def record(self, method, url, api_url, request_args, response=None, error=None, start=None):
+        """
+        Record a request
+
+        :param api_url: URL of the API, the paths of the API requests are
+                    recorded relative to it
+        :param request_args: Arguments of the request (headers, params,
+                    files, data, stream)
+        :param response: Response of the request (None if it failed)
+        :param error: Exception raised by the request, if it failed
+        :param start: Time at which the request was issued
+        """
+
+        now = time.time()
+        start = now if start is None else start
+
+        secrets = __get_secrets__(request_args)
+        path, kind = __get_path__(method, url, api_url)
+
+        entry = {
+            't': round(start - self.start, 4),
+            'duration': round(now - start, 4),
+            'method': method.upper(),
+            'kind': kind,
+            'path': __redact__(path, secrets)
+        }
+
+        if kind == STATUS:
+            entry['process_id'] = int(path.split('/')[-1])
+
+        params = request_args.get('params', None)
+        if params:
+            entry['params'] = __redact__(dict(params), secrets)
+
+        headers = __select_headers__(request_args.get('headers', None), REQUEST_HEADERS)
+        if headers:
+            entry['request_headers'] = headers
+
+        upload = __get_upload__(request_args, secrets)
+        if upload:
+            entry['upload'] = upload
+
+        if response is not None:
+            entry['status_code'] = response.status_code
+            entry['headers'] = __select_headers__(response.headers, RESPONSE_HEADERS)
+            entry.update(__get_body__(response, request_args.get('stream', False), secrets))
+
+        if error is not None:
+            entry['error'] = type(error).__name__
+
+        with self.lock:
+            entry['thread'] = self.threads.setdefault(threading.get_ident(), len(self.threads))
+            self.__write__(entry)
+
+    def close(self):
+
+        with self.lock:
+            self.fh.close()
+
+    def __write__(self, entry):
+
+        self.fh.write(json.dumps(entry, separators=(',', ':'), sort_keys=True) + '\n')
+
+# ------------------------------------------------------------------------------
+
+def start(filename):
+    """
+    Start recording the requests to a trace file (the file is overwritten)
+    """
+
+    global __recorder__
+
+    stop()
+
+    __recorder__ = Recorder(filename)
+
+
+def stop():
+    """
+    Stop recording the requests and close the trace file
+    """
+
+    global __recorder__
+
+    recorder, __recorder__ = __recorder__, None
+
+    if recorder is not None:
+        recorder.close()
+
+
+def is_enabled():
+
+    return __recorder__ is not None
+
+
+def record(method, url, api_url, request_args, response=None, error=None, start=None):
+    """
+    Record a request if the recording is enabled (see Recorder.record). The
+    request is not affected if it cannot be recorded (e.g. the recording is
+    stopped meanwhile)
+    """
+
+    recorder = __recorder__
+
+    if recorder is None:
+        return
+
+    try:
+        recorder.record(method, url, api_url, request_args, response=response, error=error, start=start)
+    except Exception as e:
+        logger.warning('Request could not be recorded in the trace: {!r}'.format(e))
+
+
+def load(filename):
+    """
+    Load the requests of a trace file
+
+    :return: List of recorded requests, in order of issue
+    """
+
+    records = []
+
+    with gzip.open(filename, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            entry = json.loads(line)
+            if 'version' not in entry:
+                records.append(entry)
+
+    return sorted(records, key=lambda r: r['t'])
+
+
+def get_kind(method, path):
+    """
+    Kind of request (see the module constants) of an API path
+    """
+
+    for kind_method, pattern, kind in KINDS:
+        if method.upper() == kind_method and pattern.match(path):
+            return kind
+
+    return OTHER
+
+# ------------------------------------------------------------------------------
+
+def __get_path__(method, url, api_url):
+
+    url = url.split('?')[0]
+
+    if url.startswith(api_url):
+        # The listing of processes has the secret token in its path
+        path = USER_PATH.sub('/users/{}/'.format(TOKEN_PLACEHOLDER), url[len(api_url):])
+        return path, get_kind(method, path)
+
+    # Only the name of other files (e.g. results), their URL could contain
+    # credentials
+    return os.path.basename(urllib.parse.urlparse(url).path), RESULTS
+
+
+def __get_secrets__(request_args):
+
+    secrets = []
+
+    headers = request_args.get('headers', None) or {}
+    if headers.get('ApiKey', None):
+        secrets.append((headers['ApiKey'], API_KEY_PLACEHOLDER))
+
+    params = request_args.get('params', None) or {}
+    if params.get('token', None):
+        secrets.append((params['token'], TOKEN_PLACEHOLDER))
+
+    files = __get_fields__(request_args)
+    if files.get('token', (None, None))[1]:
+        secrets.append((files['token'][1], TOKEN_PLACEHOLDER))
+
+    return [(str(value), placeholder) for value, placeholder in secrets]
+
+
+def __redact__(value, secrets):
+    """
+    Replace the secrets in a JSON value and remove the query of the URLs
+    """
+
+    if isinstance(value, dict):
+        return {__redact__(k, secrets): __redact__(v, secrets) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [__redact__(v, secrets) for v in value]
+    elif not isinstance(value, str):
+        return value
+
+    for secret, placeholder in secrets:
+        value = value.replace(secret, placeholder)
+
+    if value.startswith(('http://', 'https://')):
+        value = value.split('?')[0]
+
+    return value
+
+
+def __select_headers__(headers, names):
+
+    if not headers:
+        return {}
+
+    # Headers of the responses are case insensitive, the ones of the
+    # requests are plain dictionaries
+    lower = {k.lower(): v for k, v in headers.items()}
+
+    return {name: lower[name.lower()] for name in names if name.lower() in lower}
+
+
+def __get_fields__(request_args):
+
+    files = request_args.get('files', None)
+    if files is None:
+        # Multipart bodies streamed (see compression.MultipartStream)
+        files = getattr(request_args.get('data', None), 'files', None)
+
+    return files or {}
+
+
+def __get_upload__(request_args, secrets):
+
+    upload = {}
+
+    for name, (filename, value) in __get_fields__(request_args).items():
+        if value is None:
+            continue
+
+        if hasattr(value, 'read'):
+            upload[name] = {'size': __get_size__(value), 'extension': os.path.splitext(filename or '')[1]}
+        else:
+            upload[name] = __redact__(value, secrets)
+
+    encoding = getattr(request_args.get('data', None), 'encoding', None)
+    if upload and encoding:
+        upload['encoding'] = encoding
+
+    return upload
+
+
+def __get_size__(fh):
+
+    try:
+        return os.fstat(fh.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+
+    position = fh.tell()
+    fh.seek(0, io.SEEK_END)
+    size = fh.tell()
+    fh.seek(position)
+
+    return size
+
+
+def __get_body__(response, stream, secrets):
+
+    if stream:
+        # The body is read by the caller, its size is taken from the headers
+        size = __select_headers__(response.headers, ['Content-Length']).get('Content-Length', None)
+        return {'size': int(size)} if size is not None else {}
+
+    content = getattr(response, 'content', None)
+    if content is None:
+        return {}
+
+    try:
+        text = content.decode('utf-8') if isinstance(content, bytes) else content
+        return {'json': __redact__(json.loads(text), secrets)}
+    except ValueError:
+        return {'size': len(content)}
+
+
+__recorder__ = None
+
+atexit.register(stop)
+
+if os.getenv('JASON_TRACE', None):
+    start(os.getenv('JASON_TRACE'))
@@ -0,0 +1,396 @@
+"""
+HTTP transports of the requests to Jason
+
+Every request of the SDK (API calls, uploads and downloads of the results)
+is issued through a transport, so that the HTTP client that performs best in
+each deployment can be chosen without changes in the SDK. Built-in transports:
+- 'requests': requests session with a pool of persistent (keep-alive)
+  connections per host. The default transport
+- 'urllib3': urllib3 pool manager, without the overhead of requests
+- 'httpx': httpx client, with HTTP/2 (several requests multiplexed over a
+  single connection, e.g. for heavy polling) if the h2 package is installed.
+  Requires the httpx package
+
+A transport is an object with a `request(method, url, headers=None,
+params=None, data=None, files=None, stream=False, timeout=None)` method (same
+arguments as in requests, `timeout` being a (connect, read) tuple) that
+returns a response with the subset of the interface of the responses of
+requests used by the SDK: `status_code`, `headers` (case insensitive), `url`,
+`json()`, `iter_content(chunk_size)` and `close()`. Network errors are raised
+as the exceptions of requests (e.g. requests.exceptions.Timeout).
+
+The transport is selected with the JASON_TRANSPORT environment variable or
+with the `configure` function, and custom transports can be added with
+`register`:
+
+>>> transport.configure('urllib3', pool_size=64)
+"""
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import threading
+import urllib.parse
+
+import requests
+import requests.adapters
+import urllib3
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+REQUESTS = 'requests'
+URLLIB3 = 'urllib3'
+HTTPX = 'httpx'
+
+DEFAULT_TRANSPORT = os.getenv('JASON_TRANSPORT', REQUESTS)
+
+# Maximum number of connections kept open to each host (e.g. concurrent
+# polling threads, hedged requests or segments of a download)
+DEFAULT_POOL_SIZE = int(os.getenv('JASON_POOL_SIZE', 32))
+
+MAX_REDIRECTS = 10
+
+# ------------------------------------------------------------------------------
+
+class RequestsTransport(object):
+    """
+    Transport based on a requests session, whose adapters keep a pool of
+    connections to each host
+    """
+
+    name = REQUESTS
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+
+        self.session = requests.Session()
+
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+
+        self.session.close()
+
+# ------------------------------------------------------------------------------
+
+class Urllib3Transport(object):
+    """
+    Transport based on a urllib3 pool manager
+    """
+
+    name = URLLIB3
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+
+        self.pool = urllib3.PoolManager(maxsize=pool_size)
+
+        # Errors are not retried by the transport (throttled requests and
+        # segments of downloads are retried by the SDK), only redirects are
+        # followed
+        self.retries = urllib3.Retry(total=None, connect=0, read=0, status=0, other=0,
+                                     redirect=MAX_REDIRECTS, raise_on_redirect=False, raise_on_status=False)
+
+    def request(self, method, url, headers=None, params=None, data=None, files=None, stream=False, timeout=None):
+
+        headers = dict(headers or {})
+
+        if params:
+            url = __add_params__(url, params)
+
+        body = data
+        if files is not None:
+            fields = {name: (filename, __read_value__(value)) if filename else __read_value__(value)
+                      for name, (filename, value) in files.items() if value is not None}
+            body, headers['Content-Type'] = urllib3.encode_multipart_formdata(fields)
+
+        # Iterables (e.g. a compressed multipart body) are streamed, with
+        # chunked transfer encoding unless their length is known
+        chunked = body is not None and not isinstance(body, (bytes, str))
+        length = getattr(body, 'len', None)
+        if chunked and length is not None:
+            headers.setdefault('Content-Length', str(length))
+            chunked = False
+
+        with __urllib3_errors__():
+            r = self.pool.request(method.upper(), url, body=body, headers=headers, timeout=__urllib3_timeout__(timeout),
+                                  retries=self.retries, preload_content=not stream, chunked=chunked)
+
+        return Urllib3Response(r, url)
+
+    def close(self):
+
+        self.pool.clear()
+
+
+class Urllib3Response(object):
+    """
+    Response of the urllib3 transport
+    """
+
+    def __init__(self, response, url):
+
+        self.response = response
+        self.status_code = response.status
+        self.headers = response.headers
+        self.url = response.geturl() or url
+
+    @property
+    def content(self):
+
+        with __urllib3_errors__():
+            return self.response.data
+
+    def json(self):
+
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+
+        with __urllib3_errors__():
+            for chunk in self.response.stream(chunk_size):
+                yield chunk
+
+    def close(self):
+
+        if not self.response.isclosed():
+            # The response was not completely read, its connection cannot be
+            # reused
+            self.response.close()
+
+        self.response.release_conn()
+
+# ------------------------------------------------------------------------------
+
+class HttpxTransport(object):
+    """
+    Transport based on an httpx client, using HTTP/2 if available
+    """
+
+    name = HTTPX
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, http2=True):
+
+        if httpx is None:
+            raise ImportError('The httpx transport requires the httpx package')
+
+        self.http2 = http2 and importlib.util.find_spec('h2') is not None
+
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.Client(http2=self.http2, limits=limits, follow_redirects=True,
+                                   max_redirects=MAX_REDIRECTS)
+
+    def request(self, method, url, headers=None, params=None, data=None, files=None, stream=False, timeout=None):
+
+        fields = None
+        if files is not None:
+            fields = {name: value for name, (filename, value) in files.items() if not filename and value is not None}
+            files = {name: (filename, __read_value__(value))
+                     for name, (filename, value) in files.items() if filename and value is not None}
+
+        # Streamed bodies of known length are not chunked
+        length = getattr(data, 'len', None)
+        if length is not None:
+            headers = dict(headers or {}, **{'Content-Length': str(length)})
+
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        with __httpx_errors__():
+            request = self.client.build_request(method.upper(), url, headers=headers, params=params, data=fields,
+                                                files=files, content=data, timeout=timeout)
+            r = self.client.send(request, stream=stream)
+
+        return HttpxResponse(r)
+
+    def close(self):
+
+        self.client.close()
+
+
+class HttpxResponse(object):
+    """
+    Response of the httpx transport
+    """
+
+    def __init__(self, response):
+
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+
+        with __httpx_errors__():
+            return self.response.read()
+
+    def json(self):
+
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+
+        with __httpx_errors__():
+            for chunk in self.response.iter_bytes(chunk_size):
+                yield chunk
+
+    def close(self):
+
+        self.response.close()
+
+# ------------------------------------------------------------------------------
+
+TRANSPORTS = {
+    REQUESTS: RequestsTransport,
+    URLLIB3: Urllib3Transport,
+    HTTPX: HttpxTransport
+}
+
+
+def register(name, factory):
+    """
+    Add a transport, that can then be selected by its name
+
+    :param factory: Class (or function) that creates the transport, called
+                    with the options passed to `configure`
+    """
+
+    TRANSPORTS[name] = factory
+
+
+def get_available():
+    """
+    Names of the transports available in this installation
+    """
+
+    return [name for name in TRANSPORTS if name != HTTPX or httpx is not None]
+
+
+def create(name, **options):
+    """
+    Create a transport by its name (see `register`)
+    """
+
+    if name not in TRANSPORTS:
+        raise ValueError('Unknown transport [ {} ], use one of {}'.format(name, sorted(TRANSPORTS)))
+
+    return TRANSPORTS[name](**options)
+
+
+def configure(transport=DEFAULT_TRANSPORT, **options):
+    """
+    Set the transport of the requests to Jason
+
+    :param transport: Name of a registered transport (created with the given
+                    options, e.g. `pool_size`) or a transport object
+    """
+
+    global __transport__
+
+    if isinstance(transport, str):
+        transport = create(transport, **options)
+
+    with __lock__:
+        __transport__ = transport
+
+
+def get():
+    """
+    Transport of the requests to Jason (created on first use)
+    """
+
+    global __transport__
+
+    with __lock__:
+        if __transport__ is None:
+            __transport__ = create(DEFAULT_TRANSPORT)
+
+        return __transport__
+
+# ------------------------------------------------------------------------------
+
+def __add_params__(url, params):
+
+    query = urllib.parse.urlencode([(k, v) for k, v in params.items() if v is not None])
+
+    return url + ('&' if '?' in url else '?') + query if query else url
+
+
+def __read_value__(value):
+    """
+    Contents of a field of a multipart form (as bytes or string)
+    """
+
+    if not hasattr(value, 'read'):
+        return value
+
+    value.seek(0)
+    data = value.read()
+
+    return data.encode('utf-8') if isinstance(value, io.TextIOBase) else data
+
+
+def __urllib3_timeout__(timeout):
+
+    if timeout is None:
+        return urllib3.Timeout(connect=None, read=None)
+    elif isinstance(timeout, tuple):
+        return urllib3.Timeout(connect=timeout[0], read=timeout[1])
+
+    return urllib3.Timeout(connect=timeout, read=timeout)
+
+
+@contextlib.contextmanager
+def __urllib3_errors__():
+    """
+    Raise the errors of urllib3 as the ones of requests
+    """
+
+    try:
+        yield
+    except urllib3.exceptions.HTTPError as e:
+        reason = e.reason if isinstance(e, urllib3.exceptions.MaxRetryError) and e.reason else e
+
+        if isinstance(reason, urllib3.exceptions.NewConnectionError):
+            raise requests.exceptions.ConnectionError(str(reason)) from e
+        elif isinstance(reason, urllib3.exceptions.ConnectTimeoutError):
+            raise requests.exceptions.ConnectTimeout(str(reason)) from e
+        elif isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(str(reason)) from e
+        elif isinstance(reason, (urllib3.exceptions.ProtocolError, urllib3.exceptions.SSLError)):
+            raise requests.exceptions.ConnectionError(str(reason)) from e
+
+        raise requests.exceptions.RequestException(str(reason)) from e
+
+
+@contextlib.contextmanager
+def __httpx_errors__():
+    """
+    Raise the errors of httpx as the ones of requests
+    """
+
+    try:
+        yield
+    except httpx.ConnectTimeout as e:
+        raise requests.exceptions.ConnectTimeout(str(e)) from e
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.ReadTimeout(str(e)) from e
+    except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.exceptions.RequestException(str(e)) from e
+
+
+__lock__ = threading.Lock()
+
+__transport__ = None
@@ -0,0 +1,131 @@
+"""
+Streaming helpers for u-blox UBX binary files
+"""
+import itertools
+import struct
+
+SYNC = b'\xb5\x62'
+
+# Length of the frame header (sync chars, class, id and payload length) and
+# the checksum
+HEADER_LENGTH = 6
+CHECKSUM_LENGTH = 2
+
+MAX_FRAME_LENGTH = HEADER_LENGTH + 0xFFFF + CHECKSUM_LENGTH
+
+CHUNK_SIZE = 1024 * 1024
+
+RXM_RAW = (0x02, 0x10)
+RXM_RAWX = (0x02, 0x15)
+
+# ------------------------------------------------------------------------------
+
+def is_ubx(filename):
+    """
+    Check whether a file starts with a valid UBX frame
+    """
+
+    try:
+        with open(filename, 'rb') as fh:
+            for msg_class, _, _ in iter_frames(fh):
+                return msg_class is not None
+    except OSError:
+        pass
+
+    return False
+
+# ------------------------------------------------------------------------------
+
+def iter_frames(fh, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the frames of an opened (binary mode) UBX file
+
+    :return: Generator of (msg_class, msg_id, frame) tuples, where frame is
+             the whole frame (including sync chars and checksum). Chunks of
+             data that are not valid UBX frames (e.g. NMEA sentences) are
+             yielded with msg_class and msg_id set to None
+    """
+
+    chunk_size = max(chunk_size, MAX_FRAME_LENGTH)
+
+    buffer = b''
+    offset = 0
+    eof = False
+
+    while True:
+
+        # Make sure that a whole frame is always available in the buffer
+        if not eof and len(buffer) - offset < MAX_FRAME_LENGTH:
+            data = fh.read(chunk_size)
+            eof = not data
+            buffer = buffer[offset:] + data
+            offset = 0
+
+        if offset >= len(buffer):
+            return
+
+        if buffer.startswith(SYNC, offset) and len(buffer) - offset >= HEADER_LENGTH:
+            length = struct.unpack_from('<H', buffer, offset + 4)[0]
+            end = offset + HEADER_LENGTH + length + CHECKSUM_LENGTH
+
+            if end <= len(buffer) and buffer[end - 2:end] == __checksum__(buffer[offset + 2:end - 2]):
+                yield buffer[offset + 2], buffer[offset + 3], buffer[offset:end]
+                offset = end
+                continue
+
+        # Skip up to the next potential sync char
+        index = buffer.find(SYNC[:1], offset + 1)
+        end = index if index > 0 else len(buffer)
+        yield None, None, buffer[offset:end]
+        offset = end
+
+# ------------------------------------------------------------------------------
+
+def get_receiver_time(msg_class, msg_id, frame):
+    """
+    Get the receiver time of week (in seconds) of a raw measurement frame
+    (RXM-RAWX or RXM-RAW) or None for any other frame
+    """
+
+    payload = frame[HEADER_LENGTH:]
+
+    if (msg_class, msg_id) == RXM_RAWX:
+        return struct.unpack('<d', payload[0:8])[0]
+    elif (msg_class, msg_id) == RXM_RAW:
+        return struct.unpack('<i', payload[0:4])[0] / 1000.0
+
+    return None
+
+# ------------------------------------------------------------------------------
+
+def filter_frames(filename, output_filename, predicate):
+    """
+    Stream a UBX file into another one keeping only the frames for which
+    predicate(msg_class, msg_id, frame) is True
+
+    :return: Number of frames written
+    """
+
+    n_frames = 0
+
+    with open(filename, 'rb') as fh, open(output_filename, 'wb') as out_fh:
+
+        for msg_class, msg_id, frame in iter_frames(fh):
+
+            if not predicate(msg_class, msg_id, frame):
+                continue
+
+            out_fh.write(frame)
+            n_frames += 1
+
+    return n_frames
+
+# ------------------------------------------------------------------------------
+
+def __checksum__(data):
+
+    # 8-bit Fletcher algorithm: CK_B is the sum of the partial sums of CK_A
+    ck_a = sum(data) & 0xFF
+    ck_b = sum(itertools.accumulate(data)) & 0xFF
+
+    return bytes((ck_a, ck_b))
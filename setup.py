@@ -28,8 +28,14 @@ setup(
         "pytest",
         "pytest-mocha",
         "roktools",
-        "exifread"
+        "exifread",
+        "numpy"
     ],
+    extras_require={
+        "exif": ["piexif"],
+        "zstd": ["zstandard"],
+        "httpx": ["httpx[http2]"]
+    },
     entry_points={
         'console_scripts': [
             'jason = jason_gnss.main:main'
@@ -0,0 +1,54 @@
+"""
+Builders of the test files shared by the tests and the benchmarks
+"""
+import struct
+
+from jason_gnss import rinex, ubx
+
+# ------------------------------------------------------------------------------
+
+def build_high_rate_rinex(filename, output_filename, rate, repeat=1):
+    """
+    Build a RINEX file at the given rate replicating the epochs of a 1 Hz
+    RINEX 2 file (the whole file can be repeated to make it longer)
+    """
+
+    with open(filename, 'r', encoding=rinex.ENCODING, newline='') as fh:
+        header = rinex.read_header(fh)
+        epochs = list(rinex.iter_epochs(fh, header))
+
+    with open(output_filename, 'w', encoding=rinex.ENCODING, newline='') as out_fh:
+        out_fh.writelines(header)
+        for hour in range(repeat):
+            for epoch in epochs:
+                for i in range(rate):
+                    seconds = epoch.time.second + i / float(rate)
+                    line = '{}{:3d}{}{:11.7f}{}'.format(
+                           epoch.lines[0][0:9], epoch.time.hour + hour,
+                           epoch.lines[0][12:15], seconds, epoch.lines[0][26:])
+                    out_fh.write(line)
+                    out_fh.writelines(epoch.lines[1:])
+
+
+def build_high_rate_ubx(filename, output_filename, rate, repeat=1):
+    """
+    Build a UBX file at the given rate replicating the RXM-RAWX frames of a
+    1 Hz file (the rest of frames are copied once)
+    """
+
+    with open(filename, 'rb') as fh, open(output_filename, 'wb') as out_fh:
+        frames = list(ubx.iter_frames(fh))
+
+        for hour in range(repeat):
+            for msg_class, msg_id, frame in frames:
+
+                if (msg_class, msg_id) != ubx.RXM_RAWX:
+                    out_fh.write(frame)
+                    continue
+
+                tow = ubx.get_receiver_time(msg_class, msg_id, frame)
+                for i in range(rate):
+                    payload = struct.pack('<d', tow + hour * 3600 + i / float(rate)) + \
+                              frame[ubx.HEADER_LENGTH + 8:-ubx.CHECKSUM_LENGTH]
+                    body = frame[2:ubx.HEADER_LENGTH] + payload
+                    out_fh.write(ubx.SYNC + body + ubx.__checksum__(body))
@@ -0,0 +1,345 @@
+"""
+Replay of the traffic recorded by the SDK (see jason_gnss.tracing), used by
+the tests and by benchmarks.replay
+
+- ReplayServer: a stand-in of the API (see test.server) that answers as
+  recorded in the trace. Each process submitted to it follows the status
+  transitions of one of the recorded processes (in turns), the listings of
+  processes and the API status are the recorded ones, the response times are
+  sampled from the recorded ones and the results bundle has the size of the
+  recorded downloads. Time runs `speed` times faster than in the trace.
+- replay: issues the requests of the trace through the SDK `speed` times
+  faster, with `concurrency` copies of the trace running at the same time
+  (each one with the concurrency of the recorded traffic). Uploads use
+  filler files of the recorded size
+"""
+import collections
+import concurrent.futures
+import copy
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from jason_gnss import jason, tracing
+
+from .server import StandInServer
+
+DEFAULT_BUNDLE_SIZE = 1024 * 1024
+
+# Content of the filler of the uploaded files (RINEX, so that compression
+# behaves as with real files)
+FILLER_FILE = os.path.join('test', 'jason_gnss_test_file_rover.txt')
+
+CONTENT_RANGE = re.compile(r'bytes \d+-\d+/(\d+)')
+
+# Fields of a recorded submission and argument of submit_process
+SUBMIT_FIELDS = {'type': 'process_type', 'rover_dynamics': 'rover_dynamics', 'label': 'label',
+                 'user_strategy': 'strategy'}
+
+# ------------------------------------------------------------------------------
+
+class ReplayServer(StandInServer):
+    """
+    Stand-in of the API that answers as recorded in a trace
+
+    :param records: Recorded requests (see tracing.load)
+    :param speed: Speedup of the recorded timings (status transitions and
+                    response times)
+    :param kwargs: Arguments of the StandInServer
+    """
+
+    def __init__(self, records, speed=1.0, **kwargs):
+
+        if speed <= 0:
+            raise ValueError('Speed must be positive')
+
+        self.speed = float(speed)
+        self.timelines = get_timelines(records)
+
+        # Response times of the API requests by kind. The ones of the
+        # submissions are not used, since they include the upload
+        self.durations = collections.defaultdict(list)
+        for record in records:
+            if 'status_code' in record and record['kind'] not in (tracing.SUBMIT, tracing.RESULTS):
+                self.durations[record['kind']].append(record['duration'])
+
+        listings = [r for r in records if r['kind'] == tracing.PROCESSES and isinstance(r.get('json', None), list)]
+        self.listings = [(r['t'] - listings[0]['t'], r['json']) for r in listings]
+
+        self.api_statuses = [r['json'] for r in records
+                             if r['kind'] == tracing.API_STATUS and isinstance(r.get('json', None), dict)]
+
+        sizes = [s for s in (get_results_size(r) for r in records if r['kind'] == tracing.RESULTS) if s]
+        kwargs.setdefault('bundle_size', max(sizes) if sizes else DEFAULT_BUNDLE_SIZE)
+
+        super().__init__(**kwargs)
+
+        self.started = time.time()
+
+    def get_api_status(self):
+
+        if not self.api_statuses:
+            return super().get_api_status()
+
+        status = dict(random.choice(self.api_statuses))
+        status.setdefault('success', True)
+
+        return status
+
+    def get_latency(self, method, path):
+
+        durations = self.durations.get(tracing.get_kind(method, re.sub('^/api', '', path)), None)
+
+        return random.choice(durations) / self.speed if durations else self.latency
+
+    def get_status(self, process_id):
+
+        with self.lock:
+            process = self.processes.get(process_id, None)
+
+        if process is None or not self.timelines:
+            return super().get_status(process_id)
+
+        # The submitted processes follow the recorded ones in turns
+        timeline = self.timelines[(process_id - 1) % len(self.timelines)]
+        elapsed = (time.time() - process['created']) * self.speed
+
+        status = timeline[0][1]
+        for offset, recorded_status in timeline:
+            if offset > elapsed:
+                break
+            status = recorded_status
+
+        status = copy.deepcopy(status)
+        if isinstance(status.get('process', None), dict):
+            status['process']['id'] = process_id
+        for result in status.get('results', None) or []:
+            if isinstance(result, dict) and result.get('type', None) == 'zip':
+                result['value'] = self.results_url
+
+        return status
+
+    def list_processes(self):
+
+        if not self.listings:
+            return super().list_processes()
+
+        elapsed = (time.time() - self.started) * self.speed
+
+        processes = self.listings[0][1]
+        for offset, listing in self.listings:
+            if offset > elapsed:
+                break
+            processes = listing
+
+        return processes
+
+# ------------------------------------------------------------------------------
+
+def get_timelines(records):
+    """
+    Status of each recorded process by time since its submission (or since its
+    first status request, if the submission was not recorded)
+
+    :return: List (one per process) of lists of (time, status) tuples
+    """
+
+    submitted = {}
+    for record in records:
+        if record['kind'] == tracing.SUBMIT and isinstance(record.get('json', None), dict) and \
+           'id' in record['json']:
+            submitted[int(record['json']['id'])] = record['t'] + record['duration']
+
+    statuses = collections.OrderedDict()
+    for record in records:
+        if record['kind'] == tracing.STATUS and record.get('status_code', None) == 200 and \
+           isinstance(record.get('json', None), dict):
+            statuses.setdefault(record['process_id'], []).append((record['t'] + record['duration'], record['json']))
+
+    timelines = []
+    for process_id, timeline in statuses.items():
+        origin = submitted.get(process_id, timeline[0][0])
+        timelines.append([(t - origin, status) for t, status in timeline])
+
+    return timelines
+
+
+def get_results_size(record):
+    """
+    Size of the results file of a recorded download
+    """
+
+    headers = record.get('headers', None) or {}
+
+    match = CONTENT_RANGE.match(headers.get('Content-Range', ''))
+    if match:
+        return int(match.group(1))
+
+    if record.get('status_code', None) == 200:
+        return int(headers.get('Content-Length', record.get('size', 0)))
+
+    return None
+
+# ------------------------------------------------------------------------------
+
+class Filler(object):
+    """
+    Filler files of the sizes of the recorded uploads
+    """
+
+    def __init__(self, folder):
+
+        self.folder = folder
+        self.files = {}
+        self.lock = threading.Lock()
+
+        with open(FILLER_FILE, 'rb') as fh:
+            self.content = fh.read()
+
+    def get(self, size, extension=''):
+
+        key = (size, extension)
+
+        with self.lock:
+            if key not in self.files:
+                filename = os.path.join(self.folder, 'filler_{}{}'.format(size, extension))
+                with open(filename, 'wb') as fh:
+                    remaining = size
+                    while remaining > 0:
+                        remaining -= fh.write(self.content[:remaining])
+                self.files[key] = filename
+
+            return self.files[key]
+
+
+def replay(records, api_url, speed=1.0, concurrency=1, folder=None):
+    """
+    Issue the recorded requests through the SDK
+
+    :param records: Recorded requests (see tracing.load)
+    :param api_url: URL of the API (e.g. of a ReplayServer)
+    :param speed: Speedup of the recorded timings
+    :param concurrency: Number of copies of the trace replayed at the same time
+    :return: Dictionary with the response times (list) and number of errors
+             of each kind of request
+    """
+
+    jason.API_URL = api_url
+
+    results_url = re.sub('/api$', '', api_url) + '/results/'
+    threads = max([r.get('thread', 0) for r in records] + [0]) + 1
+
+    stats = collections.defaultdict(lambda: {'times': [], 'errors': 0, 'skipped': 0})
+    lock = threading.Lock()
+
+    owned_folder = folder is None
+    folder = folder or tempfile.mkdtemp(prefix='jason_replay_')
+    filler = Filler(folder)
+
+    def issue(record, process_ids):
+
+        kind = record['kind']
+        recorded_id = record.get('process_id', None)
+
+        if kind == tracing.STATUS and recorded_id not in process_ids:
+            # Process submitted before the trace started
+            with lock:
+                stats[kind]['skipped'] += 1
+            return
+
+        try:
+            tic = time.time()
+            if kind == tracing.SUBMIT:
+                __submit__(record, filler, process_ids)
+            elif kind == tracing.STATUS:
+                jason.get_status(process_ids[recorded_id].result(), use_cache=False)
+            elif kind == tracing.PROCESSES:
+                jason.list_processes()
+            elif kind == tracing.API_STATUS:
+                jason.api_status()
+            elif kind == tracing.RESULTS:
+                __download__(record, results_url + record['path'])
+            else:
+                with lock:
+                    stats[kind]['skipped'] += 1
+                return
+            elapsed = time.time() - tic
+
+            with lock:
+                stats[kind]['times'].append(elapsed)
+        except Exception:
+            with lock:
+                stats[kind]['errors'] += 1
+
+    def replay_copy(_):
+
+        process_ids = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            start = time.time()
+            futures = []
+            for record in records:
+                delay = start + record['t'] / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+                # Later requests wait for the new ID of the process
+                if record['kind'] == tracing.SUBMIT and isinstance(record.get('json', None), dict):
+                    record = dict(record, process_id=record['json'].get('id', None))
+                    process_ids[record['process_id']] = concurrent.futures.Future()
+
+                futures.append(executor.submit(issue, record, process_ids))
+
+            concurrent.futures.wait(futures)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(replay_copy, range(concurrency)))
+    finally:
+        if owned_folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    return dict(stats)
+
+
+def __submit__(record, filler, process_ids):
+
+    future = process_ids.get(record.get('process_id', None), concurrent.futures.Future())
+
+    try:
+        upload = record.get('upload', None) or {}
+
+        files = {}
+        for field in ('rover_file', 'base_file', 'camera_metadata_file'):
+            if isinstance(upload.get(field, None), dict):
+                files[field] = filler.get(upload[field]['size'], upload[field].get('extension', ''))
+
+        args = {SUBMIT_FIELDS[k]: v for k, v in upload.items() if k in SUBMIT_FIELDS}
+
+        ret, status_code = jason.submit_process(files.get('rover_file', None) or filler.get(0),
+                                                base_file=files.get('base_file', None),
+                                                camera_metadata_file=files.get('camera_metadata_file', None),
+                                                compression=upload.get('encoding', 'none'), **args)
+        if status_code != 200:
+            raise RuntimeError('Submission rejected (HTTP {})'.format(status_code))
+
+        future.set_result(ret['id'])
+    except Exception as e:
+        future.set_exception(e)
+        raise
+
+
+def __download__(record, url):
+
+    headers = {k: v for k, v in (record.get('request_headers', None) or {}).items() if k == 'Range'}
+
+    r = jason.__request__('get', url, stream=True, headers=headers)
+    try:
+        for _ in r.iter_content(chunk_size=1024 * 1024):
+            pass
+    finally:
+        r.close()
@@ -0,0 +1,385 @@
+"""
+Local stand-in of the Jason API for the tests and the benchmarks
+
+The server implements the subset of the API used by the SDK:
+
+- GET  /api/status                    API status
+- POST /api/processes                 Submission of a process (the uploaded
+                                      data is read and discarded)
+- GET  /api/processes/<id>            Status of a process, which is RUNNING
+                                      for `processing_time` seconds and
+                                      FINISHED afterwards
+- GET  /api/users/<token>/processes   List of processes
+- GET  /results/<name>                Results bundle of the processes, with
+                                      support of Range requests (optional)
+
+A bandwidth limit per connection can be set to emulate the throughput cap of
+a single connection through a wide area network.
+
+Usage (from the root of the repository):
+
+    python -m test.server --port 8080 --bundle_size 100
+
+and then, for instance:
+
+    JASON_API_URL=http://localhost:8080/api jason status 1
+"""
+import argparse
+import http.server
+import json
+import os
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import zipfile
+
+RESULTS_NAME = 'rokubun_gnss_results.zip'
+
+RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+# ------------------------------------------------------------------------------
+
+def build_bundle(filename, size):
+    """
+    Build a results bundle (zip file) of approximately the given size (in
+    bytes) with incompressible contents
+    """
+
+    trajectory = '#week,sow,latitude(deg),longitude(deg),height(m)\n' + \
+                 ''.join('2096,{}.0,41.0,2.0,100.0\n'.format(sow) for sow in range(3600))
+
+    # The raw data is written to a file first, so that it is added to the
+    # bundle without being held in memory
+    raw_data_file = filename + '.raw'
+    with open(raw_data_file, 'wb') as fh:
+        remaining = max(0, size - len(trajectory))
+        while remaining > 0:
+            block = os.urandom(min(remaining, 1024 * 1024))
+            fh.write(block)
+            remaining -= len(block)
+
+    try:
+        with zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED) as z:
+            z.writestr('trajectory.csv', trajectory)
+            z.write(raw_data_file, 'raw_data.bin')
+    finally:
+        os.remove(raw_data_file)
+
+    return filename
+
+# ------------------------------------------------------------------------------
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    HTTP server that handles each request in a new thread
+    """
+
+    daemon_threads = True
+
+# ------------------------------------------------------------------------------
+
+class StandInServer(object):
+    """
+    Stand-in of the Jason API running in a background thread
+
+    :param bundle_file: Results bundle served for all the processes. If not
+                    provided, a bundle of `bundle_size` bytes is built
+    :param processing_time: Time (in seconds) until a process is finished
+    :param range_requests: Support Range requests in the download of results
+    :param connection_rate: Maximum throughput (bytes per second) of each
+                    connection when downloading results (None for no limit)
+    :param latency: Time (in seconds) to answer each API request
+    :param capabilities: Capabilities advertised in the API status
+    """
+
+    def __init__(self, bundle_file=None, bundle_size=1024 * 1024, processing_time=0.0, range_requests=True,
+                 connection_rate=None, latency=0.0, capabilities=None, host='127.0.0.1', port=0):
+
+        self.folder = tempfile.mkdtemp(prefix='jason_stand_in_')
+        self.bundle_file = bundle_file or build_bundle(os.path.join(self.folder, RESULTS_NAME), bundle_size)
+        self.processing_time = processing_time
+        self.range_requests = range_requests
+        self.connection_rate = connection_rate
+        self.latency = latency
+        self.capabilities = capabilities or []
+
+        self.processes = {}
+        self.uploaded_bytes = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self.__handler__())
+        self.thread = None
+
+    @property
+    def url(self):
+
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def api_url(self):
+
+        return '{}/api'.format(self.url)
+
+    @property
+    def results_url(self):
+
+        return '{}/results/{}'.format(self.url, RESULTS_NAME)
+
+    def start(self):
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='jason-stand-in')
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self
+
+    def stop(self):
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def __enter__(self):
+
+        return self.start()
+
+    def __exit__(self, *args):
+
+        self.stop()
+
+    # --------------------------------------------------------------------------
+
+    def submit(self, uploaded_bytes, label=None):
+
+        with self.lock:
+            process_id = len(self.processes) + 1
+            self.processes[process_id] = {'id': process_id, 'created': time.time(), 'label': label,
+                                          'size': uploaded_bytes}
+            self.uploaded_bytes += uploaded_bytes
+
+        return process_id
+
+    def get_api_status(self):
+
+        return {'success': True, 'version': 'stand-in', 'capabilities': self.capabilities}
+
+    def get_latency(self, method, path):
+        """
+        Time (in seconds) to answer an API request
+        """
+
+        return self.latency
+
+    def get_status(self, process_id):
+
+        with self.lock:
+            process = self.processes.get(process_id, None)
+
+        if process is None:
+            return None
+
+        finished = time.time() - process['created'] >= self.processing_time
+
+        status = {
+            'process': {'id': process_id, 'status': 'FINISHED' if finished else 'RUNNING',
+                        'type': 'GNSS', 'label': process['label']},
+            'results': []
+        }
+
+        if finished:
+            status['results'].append({'type': 'zip', 'name': RESULTS_NAME, 'value': self.results_url})
+
+        return status
+
+    def list_processes(self):
+
+        with self.lock:
+            processes = list(self.processes.values())
+
+        return [{'id': p['id'], 'type': 'GNSS', 'status': self.get_status(p['id'])['process']['status'],
+                 'source_file': 'rover_{}.obs'.format(p['id']), 'created': p['created']} for p in processes]
+
+    # --------------------------------------------------------------------------
+
+    def __handler__(self):
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            # Headers and body are written separately, which would otherwise
+            # be delayed ~40 ms by the delayed acknowledgements of the client
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+
+                with server.lock:
+                    server.requests += 1
+
+                path = self.path.split('?')[0].rstrip('/')
+                parts = path.split('/')
+
+                if path.startswith('/results/'):
+                    return self.send_bundle()
+
+                time.sleep(server.get_latency('GET', path))
+
+                if path == '/api/status':
+                    return self.send_json(server.get_api_status())
+
+                if len(parts) == 4 and parts[2] == 'processes' and parts[3].isdigit():
+                    status = server.get_status(int(parts[3]))
+                    if status is None:
+                        return self.send_json({'message': 'Process not found'}, 404)
+                    return self.send_json(status)
+
+                if len(parts) == 5 and parts[2] == 'users' and parts[4] == 'processes':
+                    return self.send_json(server.list_processes())
+
+                self.send_json({'message': 'Not found'}, 404)
+
+            def do_POST(self):
+
+                with server.lock:
+                    server.requests += 1
+
+                uploaded_bytes = self.read_body()
+
+                time.sleep(server.get_latency('POST', self.path.split('?')[0].rstrip('/')))
+
+                if self.path.split('?')[0].rstrip('/') != '/api/processes':
+                    return self.send_json({'message': 'Not found'}, 404)
+
+                process_id = server.submit(uploaded_bytes)
+                self.send_json({'message': 'success', 'id': process_id})
+
+            def read_body(self):
+
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    total = 0
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0], 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return total
+                        total += len(self.rfile.read(size))
+                        self.rfile.readline()
+
+                remaining = int(self.headers.get('Content-Length', 0))
+                total = 0
+                while remaining > 0:
+                    data = self.rfile.read(min(remaining, CHUNK_SIZE))
+                    if not data:
+                        break
+                    total += len(data)
+                    remaining -= len(data)
+
+                return total
+
+            def send_json(self, content, code=200):
+
+                body = json.dumps(content).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. timeout)
+                    pass
+
+            def send_bundle(self):
+
+                size = os.path.getsize(server.bundle_file)
+                etag = '"{}-{}"'.format(size, int(os.path.getmtime(server.bundle_file)))
+
+                start, end = 0, size - 1
+                match = RANGE.match(self.headers.get('Range', '')) if server.range_requests else None
+                if_range = self.headers.get('If-Range', None)
+
+                if match and (if_range is None or if_range == etag):
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(size - 1, int(match.group(2))) if match.group(2) else size - 1
+                    else:
+                        start = max(0, size - int(match.group(2)))
+
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header('Content-Range', 'bytes */{}'.format(size))
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+
+                    self.send_response(206)
+                    self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, size))
+                else:
+                    self.send_response(200)
+
+                self.send_header('Content-Type', 'application/zip')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.send_header('ETag', etag)
+                if server.range_requests:
+                    self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+
+                with open(server.bundle_file, 'rb') as fh:
+                    fh.seek(start)
+                    remaining = end - start + 1
+                    tic = time.time()
+                    sent = 0
+                    while remaining > 0:
+                        data = fh.read(min(remaining, CHUNK_SIZE))
+                        try:
+                            self.wfile.write(data)
+                        except (BrokenPipeError, ConnectionResetError):
+                            return
+                        remaining -= len(data)
+                        sent += len(data)
+
+                        if server.connection_rate:
+                            delay = sent / float(server.connection_rate) - (time.time() - tic)
+                            if delay > 0:
+                                time.sleep(delay)
+
+        return Handler
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description=__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    argParser.add_argument('--port', type=int, default=8080, help='Port of the server')
+    argParser.add_argument('--bundle_size', type=float, default=10, help='Size (MB) of the results bundle')
+    argParser.add_argument('--processing_time', type=float, default=5, help='Time (s) to process a job')
+    argParser.add_argument('--connection_rate', type=float, default=None,
+                           help='Maximum download throughput (MB/s) per connection')
+    argParser.add_argument('--no_range', action='store_true', help='Do not support Range requests')
+    args = argParser.parse_args()
+
+    stand_in = StandInServer(bundle_size=int(args.bundle_size * 1e6), processing_time=args.processing_time,
+                             range_requests=not args.no_range,
+                             connection_rate=args.connection_rate * 1e6 if args.connection_rate else None,
+                             port=args.port)
+
+    print('Stand-in server listening at {}'.format(stand_in.api_url))
+    try:
+        stand_in.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.httpd.server_close()
+        shutil.rmtree(stand_in.folder, ignore_errors=True)
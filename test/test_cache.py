@@ -0,0 +1,106 @@
+import concurrent.futures
+import threading
+import time
+
+import jason_gnss.cache as cache
+
+# ------------------------------------------------------------------------------
+
+def build_fetch(statuses, calls, etag=None, delay=0):
+
+    def fetch(previous_etag):
+        calls.append(previous_etag)
+        time.sleep(delay)
+        status = statuses.pop(0)
+        if status is None:
+            return None, 304, previous_etag
+        return {'process': {'status': status}}, 200, etag
+
+    return fetch
+
+# ------------------------------------------------------------------------------
+
+def test_ttl():
+    '''Cache :: TTL :: Should query the API only when the entry has expired'''
+
+    status_cache = cache.StatusCache(ttl=0.05)
+    calls = []
+    fetch = build_fetch(['RUNNING', 'RUNNING'], calls)
+
+    assert status_cache.get(1, fetch) == ({'process': {'status': 'RUNNING'}}, 200)
+    assert status_cache.get(1, fetch) == ({'process': {'status': 'RUNNING'}}, 200)
+    assert len(calls) == 1
+
+    time.sleep(0.06)
+    status_cache.get(1, fetch)
+    assert len(calls) == 2
+
+# ------------------------------------------------------------------------------
+
+def test_terminal_status():
+    '''Cache :: terminal status :: Should be cached for the longer TTL'''
+
+    status_cache = cache.StatusCache(ttl=0, terminal_ttl=0.05)
+    calls = []
+    fetch = build_fetch(['FINISHED', 'FINISHED'], calls)
+
+    for _ in range(3):
+        assert status_cache.get(1, fetch)[0]['process']['status'] == 'FINISHED'
+
+    assert len(calls) == 1
+
+    # The URLs of the results may have expired
+    time.sleep(0.06)
+    status_cache.get(1, fetch)
+    assert len(calls) == 2
+
+
+def test_invalidate():
+    '''Cache :: invalidate :: Should query the API again'''
+
+    status_cache = cache.StatusCache()
+    calls = []
+    fetch = build_fetch(['FINISHED', 'FINISHED'], calls)
+
+    status_cache.get(1, fetch)
+    status_cache.invalidate(1)
+    status_cache.invalidate(2)
+    status_cache.get(1, fetch)
+
+    assert len(calls) == 2
+
+# ------------------------------------------------------------------------------
+
+def test_etag():
+    '''Cache :: not modified :: Should return the cached status'''
+
+    status_cache = cache.StatusCache(ttl=0)
+    calls = []
+    fetch = build_fetch(['RUNNING', None], calls, etag='"v1"')
+
+    status_cache.get(1, fetch)
+
+    assert status_cache.get(1, fetch) == ({'process': {'status': 'RUNNING'}}, 200)
+    assert calls == [None, '"v1"']
+
+# ------------------------------------------------------------------------------
+
+def test_coalescing():
+    '''Cache :: concurrent lookups :: Should share a single request'''
+
+    status_cache = cache.StatusCache(ttl=0)
+    calls = []
+    fetch = build_fetch(['RUNNING'], calls, delay=0.1)
+    barrier = threading.Barrier(8)
+
+    def lookup(_):
+        barrier.wait()
+        return status_cache.get(1, fetch)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lookup, range(8)))
+
+    assert len(calls) == 1
+    assert all(r == ({'process': {'status': 'RUNNING'}}, 200) for r in results)
+
+# ------------------------------------------------------------------------------
@@ -0,0 +1,151 @@
+import email.parser
+import gzip
+import io
+import os
+
+import pytest
+
+import jason_gnss.compression as compression
+import jason_gnss.inputs as inputs
+import jason_gnss.jason as jason
+
+from .server import StandInServer
+
+ROVER_FILE = 'test/jason_gnss_test_file_rover.txt'
+
+# ------------------------------------------------------------------------------
+
+def parse_multipart(body, content_type):
+
+    message = email.parser.BytesParser().parsebytes(
+              'Content-Type: {}\r\n\r\n'.format(content_type).encode('utf-8') + body)
+
+    return {part.get_param('name', header='content-disposition'): part for part in message.get_payload()}
+
+# ------------------------------------------------------------------------------
+
+def test_multipart_stream():
+    '''Compression :: multipart stream :: Should compress only the rover and base files'''
+
+    with open(ROVER_FILE, 'rb') as fh:
+        content = fh.read()
+
+    with open(ROVER_FILE, 'rb') as rover_fh:
+        files = {
+            'token': (None, 'secret'),
+            'rover_file': (ROVER_FILE, rover_fh),
+            'config_file': ('config_file', io.StringIO('rover_dynamics:\n    dynamic\n')),
+            'camera_metadata_file': (None, None)
+        }
+        stream = compression.MultipartStream(files, compression.GZIP)
+
+        body = b''.join(stream)
+        assert b''.join(stream) == body
+
+    parts = parse_multipart(body, stream.content_type)
+
+    assert sorted(parts) == ['config_file', 'rover_file', 'token']
+    assert parts['token'].get_payload() == 'secret'
+    assert parts['config_file'].get_payload(decode=True) == b'rover_dynamics:\n    dynamic\n'
+
+    rover_part = parts['rover_file']
+    assert rover_part.get_filename() == 'jason_gnss_test_file_rover.txt.gz'
+    assert rover_part['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(rover_part.get_payload(decode=True)) == content
+    assert len(body) < len(content) / 3
+
+# ------------------------------------------------------------------------------
+
+def test_already_compressed():
+    '''Compression :: compressed input :: Should be sent as it is'''
+
+    compressed = gzip.compress(b'RINEX' * 1000)
+    stream = compression.MultipartStream({'rover_file': ('rover.obs.gz', io.BytesIO(compressed))},
+                                         compression.GZIP)
+
+    part = parse_multipart(b''.join(stream), stream.content_type)['rover_file']
+
+    assert part.get_filename() == 'rover.obs.gz'
+    assert part.get_payload(decode=True) == compressed
+
+# ------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('capabilities,compressed', [(['compression:gzip'], True), ([], False)])
+def test_submit_compressed(capabilities, compressed, monkeypatch):
+    '''Compression :: submission :: Should compress only if supported by the server'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(jason, '__capabilities__', {})
+
+    with StandInServer(capabilities=capabilities) as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        ret, status_code = jason.submit_process(ROVER_FILE, compression='auto')
+
+        assert status_code == 200
+        uploaded_bytes = server.processes[ret['id']]['size']
+
+    with open(ROVER_FILE, 'rb') as fh:
+        size = len(fh.read())
+
+    assert (uploaded_bytes < size / 3) == compressed
+
+# ------------------------------------------------------------------------------
+
+def test_compression_not_available(monkeypatch):
+    '''Compression :: encoding not available :: Should close the input files and remove the config file'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(compression, 'get_available', lambda: [compression.GZIP])
+
+    opened, config_files = [], []
+    input_file, create_config_file = inputs.InputFile, jason.__create_config_file__
+
+    def open_input_file(*args, **kwargs):
+        opened.append(input_file(*args, **kwargs))
+        return opened[-1]
+
+    def create_config_file_(*args):
+        config_files.append(create_config_file(*args))
+        return config_files[-1]
+
+    monkeypatch.setattr(inputs, 'InputFile', open_input_file)
+    monkeypatch.setattr(jason, '__create_config_file__', create_config_file_)
+
+    with pytest.raises(ValueError):
+        jason.submit_process(ROVER_FILE, base_lonlathgt=[2.0, 41.0, 100.0], compression=compression.ZSTD)
+
+    assert opened and all(fh.closed for fh in opened)
+    assert config_files and not any(os.path.exists(name) for name, _ in config_files)
+
+# ------------------------------------------------------------------------------
+
+def test_capabilities_not_available(monkeypatch):
+    '''Compression :: API status not available :: Should not be requested again for a while'''
+
+    monkeypatch.setattr(jason, '__capabilities__', {})
+    calls = []
+
+    def api_status(**_):
+        calls.append(1)
+        if len(calls) == 1:
+            raise IOError('Connection refused')
+        return None
+
+    monkeypatch.setattr(jason, 'api_status', api_status)
+
+    assert jason.__get_capabilities__('key') == []
+    assert jason.__get_capabilities__('key') == []
+    assert len(calls) == 1
+
+    # Requested again once expired
+    monkeypatch.setattr(jason, 'CAPABILITIES_RETRY_S', 0)
+    jason.__capabilities__[(jason.API_URL, 'key')] = ([], 0)
+    jason.__get_capabilities__('key')
+    jason.__get_capabilities__('key')
+    assert len(calls) == 3
+
+    monkeypatch.setattr(jason, 'api_status', lambda **_: {'capabilities': ['compression:gzip']})
+    assert jason.__get_capabilities__('key') == ['gzip']
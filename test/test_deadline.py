@@ -0,0 +1,70 @@
+import time
+import types
+
+import pytest
+
+import jason_gnss.jason as jason
+import jason_gnss.transport as transport
+
+from jason_gnss import DeadlineExceeded
+from jason_gnss.deadline import Deadline
+
+# ------------------------------------------------------------------------------
+
+class Response(object):
+    def __init__(self, status_code, retry_after='0'):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after}
+
+# ------------------------------------------------------------------------------
+
+def test_deadline():
+    '''Deadline :: expiration :: Should clip the timeouts to the remaining time'''
+
+    assert Deadline().remaining() is None
+    assert Deadline().get_timeouts(10, 60) == (10, 60)
+
+    deadline = Deadline(0.5)
+    connect_timeout, read_timeout = deadline.get_timeouts(10, 60)
+    assert 0 < connect_timeout <= 0.5 and 0 < read_timeout <= 0.5
+
+    assert not deadline.sleep(1)
+    assert deadline.expired()
+
+    with pytest.raises(DeadlineExceeded):
+        deadline.get_timeouts(10, 60)
+
+# ------------------------------------------------------------------------------
+
+def test_request_timeouts(monkeypatch):
+    '''Deadline :: request :: Should always set the connect and read timeouts'''
+
+    timeouts = []
+
+    def request(method, url, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        return Response(200)
+
+    monkeypatch.setattr(transport, '__transport__', types.SimpleNamespace(request=request))
+
+    jason.__request__('get', 'http://localhost/status')
+    jason.__request__('post', 'http://localhost/processes', upload=True)
+    jason.__request__('get', 'http://localhost/status', deadline=Deadline(2))
+
+    assert timeouts[0] == (jason.CONNECT_TIMEOUT_S, jason.READ_TIMEOUT_S)
+    assert timeouts[1] == (jason.CONNECT_TIMEOUT_S, jason.UPLOAD_READ_TIMEOUT_S)
+    assert timeouts[2][0] <= 2 and timeouts[2][1] <= 2
+
+# ------------------------------------------------------------------------------
+
+def test_request_throttled_beyond_deadline(monkeypatch):
+    '''Deadline :: throttled request :: Should not retry after the deadline'''
+
+    monkeypatch.setattr(transport, '__transport__',
+                        types.SimpleNamespace(request=lambda method, url, **kwargs: Response(429, '10')))
+
+    tic = time.time()
+    with pytest.raises(DeadlineExceeded):
+        jason.__request__('get', 'http://localhost/status', deadline=Deadline(0.2))
+
+    assert time.time() - tic < 1
@@ -0,0 +1,94 @@
+import datetime
+
+import jason_gnss.decimation as decimation
+import jason_gnss.rinex as rinex
+import jason_gnss.ubx as ubx
+
+from .helpers import build_high_rate_rinex, build_high_rate_ubx
+
+# ------------------------------------------------------------------------------
+
+def test_epoch_selector():
+    '''Decimation :: epoch selector :: Should select epochs on the grid'''
+
+    selector = decimation.EpochSelector(1.0)
+    epochs = [0.05 * i + 0.004 for i in range(60)]
+
+    selected = [t for t in epochs if selector(t)]
+
+    assert selected == [0.004, 1.004, 2.004]
+
+# ------------------------------------------------------------------------------
+
+def test_epoch_selector_unaligned_epochs():
+    '''Decimation :: epoch selector :: Should keep the rate if epochs are off grid'''
+
+    selector = decimation.EpochSelector(1.0)
+    epochs = [0.1 * i + 0.03 for i in range(50)]
+
+    selected = [t for t in epochs if selector(t)]
+
+    assert len(selected) == 5
+
+# ------------------------------------------------------------------------------
+
+def test_decimate_rinex(tmp_path):
+    '''Decimation :: RINEX 10 Hz to 1 Hz :: Should keep one epoch per second'''
+
+    high_rate_file = str(tmp_path / 'rover.obs')
+    build_high_rate_rinex('test/jason_gnss_test_file_rover.txt', high_rate_file, 10)
+
+    output_filename = decimation.decimate(high_rate_file, 1, output_filename=str(tmp_path / 'rover_1hz.obs'))
+
+    with open(output_filename, 'r') as fh:
+        header = rinex.read_header(fh)
+        times = [epoch.time for epoch in rinex.iter_epochs(fh, header)]
+
+    assert len(times) == 60
+    assert all(t.microsecond == 0 for t in times)
+    assert rinex.get_time_span(output_filename)[1] == datetime.datetime(2017, 2, 22, 10, 26, 59)
+
+# ------------------------------------------------------------------------------
+
+def test_decimate_rinex_higher_rate(tmp_path):
+    '''Decimation :: RINEX 1 Hz to 10 Hz :: Should keep all the epochs and the original interval'''
+
+    output_filename = decimation.decimate('test/jason_gnss_test_file_rover.txt', 10,
+                                          output_filename=str(tmp_path / 'rover_10hz.obs'))
+
+    with open(output_filename, 'r') as fh:
+        header = rinex.read_header(fh)
+        n_epochs = len(list(rinex.iter_epochs(fh, header)))
+
+    with open('test/jason_gnss_test_file_rover.txt', 'r') as fh:
+        original_header = rinex.read_header(fh)
+        assert n_epochs == len(list(rinex.iter_epochs(fh, original_header)))
+
+    interval = [line for line in header if line[rinex.HEADER_LABEL_SLICE].strip() == rinex.INTERVAL][0]
+    assert float(interval[0:10]) == 1.0
+
+# ------------------------------------------------------------------------------
+
+def test_decimate_ubx(tmp_path):
+    '''Decimation :: UBX 5 Hz to 1 Hz :: Should keep non raw measurement frames'''
+
+    high_rate_file = str(tmp_path / 'rover.ubx')
+    build_high_rate_ubx('test/ubx_with_tim_tp.ubx', high_rate_file, 5)
+
+    output_filename = decimation.decimate(high_rate_file, 1, output_filename=str(tmp_path / 'rover_1hz.ubx'))
+
+    with open(output_filename, 'rb') as fh:
+        frames = [(c, i) for c, i, _ in ubx.iter_frames(fh)]
+
+    assert frames.count(ubx.RXM_RAWX) == 357
+    assert frames.count((0x0D, 0x01)) == 357
+    assert (None, None) not in frames
+
+# ------------------------------------------------------------------------------
+
+def test_decimate_unsupported_format():
+    '''Decimation :: smartphone file :: Should return None'''
+
+    assert decimation.decimate('test/jason_gnss_test_file_smartphone.txt', 1) is None
+
+# ------------------------------------------------------------------------------
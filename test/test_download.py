@@ -0,0 +1,102 @@
+import filecmp
+import zipfile
+
+import pytest
+
+import jason_gnss.cache as cache
+import jason_gnss.download as download
+import jason_gnss.jason as jason
+
+from jason_gnss import InvalidResponse
+
+from .server import StandInServer
+
+SEGMENT_SIZE = 256 * 1024
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def server():
+
+    with StandInServer(bundle_size=2 * 1024 * 1024 + 12345) as stand_in:
+        yield stand_in
+
+# ------------------------------------------------------------------------------
+
+def test_segmented_download(server, tmp_path):
+    '''Download :: several connections :: Should assemble the file from byte ranges'''
+
+    filename = str(tmp_path / 'results.zip')
+    requests_before = server.requests
+
+    download.download(server.results_url, filename, connections=4, segment_size=SEGMENT_SIZE)
+
+    assert filecmp.cmp(filename, server.bundle_file, shallow=False)
+    assert server.requests - requests_before == 9
+
+# ------------------------------------------------------------------------------
+
+def test_no_range_support(server, tmp_path, monkeypatch):
+    '''Download :: server without Range support :: Should fall back to a single stream'''
+
+    monkeypatch.setattr(server, 'range_requests', False)
+    filename = str(tmp_path / 'results.zip')
+    requests_before = server.requests
+
+    download.download(server.results_url, filename, connections=4, segment_size=SEGMENT_SIZE)
+
+    assert filecmp.cmp(filename, server.bundle_file, shallow=False)
+    assert server.requests - requests_before == 1
+
+# ------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('connections', [1, 4])
+def test_error_response(server, tmp_path, connections):
+    '''Download :: error response :: Should raise and not keep the file'''
+
+    filename = str(tmp_path / 'results.zip')
+
+    with pytest.raises(InvalidResponse):
+        download.download(server.url + '/expired/results.zip', filename, connections=connections,
+                          segment_size=SEGMENT_SIZE)
+
+    assert not (tmp_path / 'results.zip').exists()
+
+
+def test_expired_results_url(server, tmp_path, monkeypatch):
+    '''Download :: expired results URL :: Should drop the cached status of the process'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(jason, 'API_URL', server.api_url)
+    monkeypatch.setattr(cache, '__cache__', cache.StatusCache())
+    monkeypatch.setattr(StandInServer, 'results_url', property(lambda s: s.url + '/expired/results.zip'))
+    monkeypatch.chdir(tmp_path)
+
+    process_id = server.submit(100)
+
+    with pytest.raises(InvalidResponse):
+        jason.download_results(process_id, connections=1)
+
+    assert cache.__cache__.entries == {}
+    assert list(tmp_path.iterdir()) == []
+
+# ------------------------------------------------------------------------------
+
+def test_verify(tmp_path):
+    '''Download :: corrupted file :: Should not pass the verification'''
+
+    filename = str(tmp_path / 'results.zip')
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED) as z:
+        z.writestr('trajectory.csv', 'abcdefghijklmnopqrstuvwxyz' * 100)
+
+    with open(filename, 'r+b') as fh:
+        content = fh.read()
+        fh.seek(content.index(b'abcdef') + 10)
+        fh.write(b'X')
+
+    with pytest.raises(InvalidResponse):
+        download.verify_file(filename, len(content))
+
+    with pytest.raises(InvalidResponse):
+        download.verify_file(filename, len(content) + 1)
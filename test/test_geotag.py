@@ -0,0 +1,116 @@
+import json
+import shutil
+import zipfile
+
+import numpy as np
+import pytest
+
+import jason_gnss.exif as exif
+import jason_gnss.geotag as geotag
+
+IMAGES_FOLDER = 'test/data/exif'
+
+# GPS week and seconds of week of 2020/03/10 12:44:13 UTC
+WEEK = 2096
+SOW_0001 = 2 * 86400 + 12 * 3600 + 44 * 60 + 13 + 18
+
+# ------------------------------------------------------------------------------
+
+def build_results_file(filename):
+    '''Results bundle with a 1 Hz trajectory moving north 1e-5 deg per second'''
+
+    rows = ['{},{:.1f},{:.9f},{:.9f},{:.3f}\n'.format(WEEK, sow, 41.0 + (sow - SOW_0001) * 1e-5, 2.0, 100.0)
+            for sow in range(SOW_0001 - 10, SOW_0001 + 100)]
+
+    with zipfile.ZipFile(filename, 'w') as z:
+        z.writestr('report.txt', 'Processing report\n')
+        z.writestr('trajectory.csv', '#week,sow,latitude(deg),longitude(deg),height(m)\n' + ''.join(rows))
+
+    return filename
+
+# ------------------------------------------------------------------------------
+
+def test_interpolate():
+    '''Geotag :: interpolate :: Should not interpolate outside the trajectory or in gaps'''
+
+    t = np.array([0.0, 1.0, 2.0, 10.0])
+    values = np.array([[0.0, 179.0, 0.0], [1.0, 179.5, 1.0], [2.0, -179.5, 2.0], [10.0, -179.0, 10.0]])
+
+    out = geotag.interpolate(t, values, np.array([-1.0, 0.5, 1.5, 5.0, 10.0]), max_gap=5)
+
+    assert np.isnan(out[0]).all()
+    np.testing.assert_allclose(out[1], [0.5, 179.25, 0.5])
+    np.testing.assert_allclose(out[2], [1.5, -180.0, 1.5])
+    assert np.isnan(out[3]).all()
+    np.testing.assert_allclose(out[4], [10.0, -179.0, 10.0])
+
+# ------------------------------------------------------------------------------
+
+def test_load_trajectory(tmp_path):
+    '''Geotag :: load trajectory from results bundle :: Should guess the columns'''
+
+    t, lat, lon, hgt = geotag.load_trajectory(build_results_file(str(tmp_path / 'results.zip')))
+
+    assert t[0] == WEEK * 604800 + SOW_0001 - 10
+    assert lat[10] == 41.0
+    assert (lon == 2.0).all() and (hgt == 100.0).all()
+
+# ------------------------------------------------------------------------------
+
+def test_geotag_csv(tmp_path):
+    '''Geotag :: sidecar CSV :: Should interpolate the position of each image'''
+
+    results_file = build_results_file(str(tmp_path / 'results.zip'))
+    output_filename = str(tmp_path / 'geotags.csv')
+
+    geotag.geotag(results_file, IMAGES_FOLDER, output_filename=output_filename)
+
+    with open(output_filename, 'r') as fh:
+        lines = fh.read().splitlines()
+
+    assert lines[0] == 'image,time,latitude,longitude,height'
+    assert lines[1].startswith('DJI_0001_small.JPG,') and lines[1].endswith(',41.000000000,2.000000000,100.0000')
+    assert lines[2].startswith('DJI_0002_small.JPG,') and lines[2].endswith(',41.000920000,2.000000000,100.0000')
+
+# ------------------------------------------------------------------------------
+
+def test_geotag_exif(tmp_path):
+    '''Geotag :: EXIF tags :: Should write the GPS tags of the images'''
+
+    pytest.importorskip('piexif')
+
+    images_folder = tmp_path / 'images'
+    shutil.copytree(IMAGES_FOLDER, str(images_folder))
+    results_file = build_results_file(str(tmp_path / 'results.zip'))
+
+    geotag.geotag(results_file, str(images_folder), write_exif=True, max_workers=2)
+
+    tags = exif.get_image_exif(str(images_folder / 'DJI_0002_small.JPG'))
+
+    assert tags['GPS GPSLatitudeRef'] == 'N'
+    # 41 deg 0 min 3.312 sec
+    assert tags['GPS GPSLatitude'] == '[41, 0, 414/125]'
+    assert tags['GPS GPSLongitude'] == '[2, 0, 0]'
+    assert tags['GPS GPSAltitude'] == '100'
+
+# ------------------------------------------------------------------------------
+
+def test_invalid_image_times(tmp_path):
+    '''Geotag :: invalid EXIF timestamps :: Should skip the images'''
+
+    tags = {
+        'valid.JPG': {geotag.DATETIME_TAG: '2020:03:10 12:44:13', geotag.SUBSEC_TAG: '25'},
+        'blank.JPG': {geotag.DATETIME_TAG: '0000:00:00 00:00:00'},
+        'garbage.JPG': {geotag.DATETIME_TAG: 'unknown'},
+        'subseconds.JPG': {geotag.DATETIME_TAG: '2020:03:10 12:44:13', geotag.SUBSEC_TAG: 'x'},
+        'no_time.JPG': {}
+    }
+    with open(str(tmp_path / geotag.CAMERA_METADATA_FILENAME), 'w') as fh:
+        json.dump(tags, fh)
+
+    names, seconds = geotag.get_image_times(str(tmp_path))
+
+    assert names == ['valid.JPG']
+    assert seconds[0] % 604800 == pytest.approx(SOW_0001 - 18 + 0.25)
+
+# ------------------------------------------------------------------------------
@@ -0,0 +1,104 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+import jason_gnss.hedging as hedging
+
+# ------------------------------------------------------------------------------
+
+def test_fast_request():
+    '''Hedging :: fast response :: Should not issue a second request'''
+
+    hedger = hedging.Hedger(default_delay=0.5)
+    calls = []
+
+    def request():
+        calls.append(1)
+        return 'response'
+
+    assert hedger.call('status', request) == 'response'
+    assert len(calls) == 1 and hedger.hedged == 0
+
+# ------------------------------------------------------------------------------
+
+def test_slow_request():
+    '''Hedging :: slow response :: Should return the response of the hedged request'''
+
+    hedger = hedging.Hedger(default_delay=0.05)
+    lock = threading.Lock()
+    calls = []
+
+    def request():
+        with lock:
+            calls.append(1)
+            attempt = len(calls)
+        time.sleep(1.0 if attempt == 1 else 0.01)
+        return attempt
+
+    tic = time.time()
+    assert hedger.call('status', request) == 2
+    assert time.time() - tic < 0.5
+    assert hedger.hedged == 1
+
+# ------------------------------------------------------------------------------
+
+def test_failed_requests():
+    '''Hedging :: both requests fail :: Should raise the error'''
+
+    hedger = hedging.Hedger(default_delay=0.01)
+
+    def request():
+        time.sleep(0.05)
+        raise IOError('Connection reset')
+
+    with pytest.raises(IOError):
+        hedger.call('status', request)
+
+# ------------------------------------------------------------------------------
+
+def test_busy_pool():
+    '''Hedging :: hedged copies blocked :: Should not delay the first request of other calls'''
+
+    hedger = hedging.Hedger(default_delay=0.01, max_workers=1)
+    release = threading.Event()
+
+    def blocked_request():
+        release.wait(5)
+        return 'blocked'
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        blocked = [executor.submit(hedger.call, 'status', blocked_request) for _ in range(3)]
+        time.sleep(0.1)
+
+        # The pool of hedged copies is busy
+        tic = time.time()
+        assert hedger.call('processes', lambda: 'response') == 'response'
+        assert time.time() - tic < 0.1
+
+        release.set()
+        assert all(f.result() == 'blocked' for f in blocked)
+
+
+def test_latency_from_call():
+    '''Hedging :: latency :: Should be measured from the call'''
+
+    hedger = hedging.Hedger(default_delay=1.0)
+    hedger.call('status', lambda: time.sleep(0.05))
+
+    assert hedger.trackers['status'].latencies[0] >= 0.05
+
+# ------------------------------------------------------------------------------
+
+def test_delay_from_latencies():
+    '''Hedging :: delay :: Should be the 95th percentile of the latencies'''
+
+    hedger = hedging.Hedger(default_delay=1.0, min_delay=0.01)
+    assert hedger.get_delay('status') == 1.0
+
+    for latency in range(1, 101):
+        hedger.trackers['status'].add(latency / 1000.0)
+
+    assert hedger.get_delay('status') == pytest.approx(0.096)
+    assert hedger.get_delay('processes') == 1.0
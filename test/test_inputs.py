@@ -0,0 +1,152 @@
+import email.parser
+import gzip
+import hashlib
+import io
+
+import pytest
+
+import jason_gnss.commands as commands
+import jason_gnss.compression as compression
+import jason_gnss.inputs as inputs
+import jason_gnss.jason as jason
+import jason_gnss.journal as journal
+
+from .server import StandInServer
+
+ROVER_FILE = 'test/jason_gnss_test_file_rover.txt'
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def content():
+
+    with open(ROVER_FILE, 'rb') as fh:
+        return fh.read()
+
+# ------------------------------------------------------------------------------
+
+def test_input_file(content, monkeypatch):
+    '''Inputs :: input file :: Should be sliced without copies and checksummed along'''
+
+    monkeypatch.setattr(inputs, '__checksums__', inputs.__checksums__.__class__())
+
+    with inputs.InputFile(ROVER_FILE) as fh:
+        assert fh.size == len(content)
+        assert b''.join(fh.iter_chunks(chunk_size=1000)) == content
+        assert fh.checksum == hashlib.sha256(content).hexdigest()
+        assert fh.bytes_copied == 0
+
+        fh.seek(10)
+        assert fh.read(5) == content[10:15]
+        assert fh.bytes_copied == 5
+
+    # The checksum is not computed again
+    monkeypatch.setattr(inputs, 'InputFile', None)
+    assert inputs.get_checksum(ROVER_FILE) == hashlib.sha256(content).hexdigest()
+
+
+def test_invalid_input_file(tmp_path):
+    '''Inputs :: invalid input file :: Should raise OSError, and accept empty files'''
+
+    with pytest.raises(OSError):
+        inputs.InputFile(str(tmp_path / 'missing.obs'))
+
+    with pytest.raises(OSError):
+        inputs.InputFile(str(tmp_path))
+
+    empty_file = tmp_path / 'empty.obs'
+    empty_file.write_bytes(b'')
+
+    with inputs.InputFile(str(empty_file)) as fh:
+        assert list(fh.iter_chunks()) == []
+        assert fh.checksum == hashlib.sha256(b'').hexdigest()
+
+# ------------------------------------------------------------------------------
+
+def test_multipart_length(content):
+    '''Inputs :: multipart stream :: Should know the length of uncompressed bodies'''
+
+    with inputs.InputFile(ROVER_FILE) as rover_fh:
+        files = {
+            'token': (None, 'secret'),
+            'rover_file': (ROVER_FILE, rover_fh),
+            'camera_metadata_file': (None, None)
+        }
+
+        stream = compression.MultipartStream(files)
+        body = b''.join(stream)
+
+        assert stream.len == len(body)
+        assert compression.MultipartStream(files, compression.GZIP).len is None
+
+    message = email.parser.BytesParser().parsebytes(
+              'Content-Type: {}\r\n\r\n'.format(stream.content_type).encode('utf-8') + body)
+    parts = {part.get_param('name', header='content-disposition'): part for part in message.get_payload()}
+
+    assert parts['rover_file'].get_payload(decode=True) == content
+    # Filenames of uncompressed uploads are sent as given
+    assert parts['rover_file'].get_filename() == ROVER_FILE
+    assert compression.MultipartStream({'config_file': ('config_file', io.StringIO('text'))}).len is None
+
+
+def test_multipart_chunked(content):
+    '''Inputs :: chunked multipart stream :: Should send bytes, which every HTTP client accepts'''
+
+    compressed = gzip.compress(content)
+
+    with inputs.InputFile(ROVER_FILE) as rover_fh:
+        files = {
+            'rover_file': (ROVER_FILE, rover_fh),
+            # Already compressed, not compressed again
+            'base_file': ('base.obs.gz', io.BytesIO(compressed)),
+            'config_file': ('config_file', io.StringIO('text'))
+        }
+
+        for encoding in (compression.GZIP, None):
+            chunks = list(compression.MultipartStream(files, encoding))
+            assert all(isinstance(chunk, bytes) for chunk in chunks)
+
+        # Bodies of known length are sent without copies
+        del files['config_file']
+        assert any(isinstance(chunk, memoryview) for chunk in compression.MultipartStream(files))
+
+# ------------------------------------------------------------------------------
+
+def test_submit(content, monkeypatch, tmp_path):
+    '''Inputs :: submission :: Should upload the files once and journal their checksums'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+
+    with StandInServer() as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        process_id = commands.submit(ROVER_FILE, compression='none', record=True)
+
+        # Multipart body with the whole rover file
+        assert server.processes[process_id]['size'] > len(content)
+
+    entry = journal.load()[str(process_id)]
+    assert entry['rover_checksum'] == hashlib.sha256(content).hexdigest()
+
+# ------------------------------------------------------------------------------
+
+def test_submit_decimated(content, monkeypatch, tmp_path):
+    '''Inputs :: decimated submission :: Should journal the checksum of the original file'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+
+    with StandInServer() as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        process_id = commands.submit(ROVER_FILE, decimate=0.1, compression='none', record=True)
+
+        # Only the decimated rover file is uploaded
+        assert server.processes[process_id]['size'] < len(content)
+
+    entry = journal.load()[str(process_id)]
+    assert entry['rover_file'] == ROVER_FILE
+    assert entry['rover_checksum'] == hashlib.sha256(content).hexdigest()
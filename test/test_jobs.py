@@ -0,0 +1,116 @@
+import concurrent.futures
+import time
+
+import pytest
+
+import jason_gnss.jason as jason
+import jason_gnss.jobs as jobs
+
+from jason_gnss import InvalidResponse, ProcessError
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def api(monkeypatch):
+    '''Fake API in which process N ends after N status requests'''
+
+    requests = {}
+    final_status = {1: 'FINISHED', 20: 'FINISHED', 3: 'ERROR'}
+
+    def get_status(process_id, **_):
+        requests[process_id] = requests.get(process_id, 0) + 1
+        status = final_status[process_id] if requests[process_id] >= process_id else 'RUNNING'
+        return {'process': {'id': process_id, 'status': status}}, 200
+
+    monkeypatch.setattr(jason, 'get_status', get_status)
+    monkeypatch.setattr(jason, 'download_results', lambda process_id, **_: 'results_{}.zip'.format(process_id))
+
+    jobs.configure(interval=0.01)
+
+    return requests
+
+# ------------------------------------------------------------------------------
+
+def test_as_completed(api):
+    '''Jobs :: as_completed :: Should yield the handles as the processes end'''
+
+    handles = [jobs.track(process_id) for process_id in [20, 1]]
+
+    completed = list(concurrent.futures.as_completed(handles, timeout=5))
+
+    assert [h.process_id for h in completed] == [1, 20]
+    assert [h.result() for h in handles] == ['results_20.zip', 'results_1.zip']
+
+# ------------------------------------------------------------------------------
+
+def test_status_result_and_callback(api):
+    '''Jobs :: no download :: Should return the status and run the callbacks'''
+
+    done = []
+    handle = jobs.track(1, download=False)
+    handle.add_done_callback(lambda h: done.append(h.process_id))
+
+    assert handle.result(timeout=5)['process']['status'] == 'FINISHED'
+    assert done == [1]
+
+# ------------------------------------------------------------------------------
+
+def test_process_error(api):
+    '''Jobs :: process with error :: Should raise a ProcessError'''
+
+    handle = jobs.track(3)
+
+    with pytest.raises(ProcessError):
+        handle.result(timeout=5)
+
+# ------------------------------------------------------------------------------
+
+def test_invalid_status(api, monkeypatch):
+    '''Jobs :: status without the process status :: Should fail only that handle'''
+
+    get_status = jason.get_status
+    monkeypatch.setattr(jason, 'get_status',
+                        lambda process_id, **kwargs: ({'process': {}}, 200) if process_id == 20
+                        else get_status(process_id, **kwargs))
+
+    invalid_handle = jobs.track(20)
+    handle = jobs.track(1)
+
+    assert isinstance(invalid_handle.exception(timeout=5), InvalidResponse)
+    assert handle.result(timeout=5) == 'results_1.zip'
+
+# ------------------------------------------------------------------------------
+
+def test_poller_restart(api, monkeypatch):
+    '''Jobs :: poller stopped by an error :: Should start a new poller for the next handle'''
+
+    poller = jobs.JobPoller(interval=0.01)
+    map_status = poller.status_executor.map
+    monkeypatch.setattr(poller.status_executor, 'map', lambda *_: 1 / 0)
+
+    poller.add(jobs.JobHandle(20))
+
+    deadline = time.time() + 5
+    while poller.thread is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert poller.thread is None
+
+    monkeypatch.setattr(poller.status_executor, 'map', map_status)
+
+    handle = jobs.JobHandle(1)
+    poller.add(handle)
+
+    assert handle.result(timeout=5) == 'results_1.zip'
+
+# ------------------------------------------------------------------------------
+
+def test_submit_process_as_handle():
+    '''Jobs :: submit missing file :: Should return a failed handle'''
+
+    handle = jason.submit_process('missing_rover_file.obs', as_handle=True)
+
+    assert isinstance(handle, concurrent.futures.Future)
+    assert isinstance(handle.exception(timeout=0), InvalidResponse)
+
+# ------------------------------------------------------------------------------
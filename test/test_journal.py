@@ -0,0 +1,85 @@
+import jason_gnss.commands as commands
+import jason_gnss.jason as jason
+import jason_gnss.journal as journal
+
+# ------------------------------------------------------------------------------
+
+def test_record_and_load(tmp_path):
+    '''Journal :: record states :: Should merge the records of each process'''
+
+    journal_file = str(tmp_path / 'journal.jsonl')
+
+    journal.record(1, journal.SUBMITTED, journal_file=journal_file, rover_file='rover.obs')
+    journal.record(2, journal.SUBMITTED, journal_file=journal_file, rover_file='rover2.obs')
+    journal.record(1, journal.DOWNLOADED, journal_file=journal_file, results_file='results.zip')
+
+    processes = journal.load(journal_file=journal_file)
+
+    assert list(processes.keys()) == ['1', '2']
+    assert processes['1']['state'] == journal.DOWNLOADED
+    assert processes['1']['rover_file'] == 'rover.obs'
+    assert processes['1']['results_file'] == 'results.zip'
+
+    assert [e['process_id'] for e in journal.get_unfinished(journal_file=journal_file)] == ['2']
+
+# ------------------------------------------------------------------------------
+
+def test_load_truncated_journal(tmp_path):
+    '''Journal :: truncated last record :: Should skip the record'''
+
+    journal_file = str(tmp_path / 'journal.jsonl')
+
+    journal.record(1, journal.SUBMITTED, journal_file=journal_file)
+    with open(journal_file, 'a') as fh:
+        fh.write('{"process_id": "1", "sta')
+
+    assert journal.load(journal_file=journal_file)['1']['state'] == journal.SUBMITTED
+
+# ------------------------------------------------------------------------------
+
+def test_resume(tmp_path, monkeypatch):
+    '''Journal :: resume :: Should download only the unfinished processes'''
+
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setattr(jason, 'get_status', lambda process_id, **_: ({'process': {'status': 'FINISHED'}}, 200))
+    monkeypatch.setattr(jason, 'download_results', lambda process_id, **_: 'results_{}.zip'.format(process_id))
+
+    journal.record(1, journal.SUBMITTED)
+    journal.record(2, journal.POLLING)
+    journal.record(3, journal.DOWNLOADED, results_file='results_3.zip')
+
+    assert commands.resume() == 'results_1.zip\nresults_2.zip'
+    assert journal.get_unfinished() == []
+    assert commands.resume() is None
+
+# ------------------------------------------------------------------------------
+
+def test_submit_record(tmp_path, monkeypatch):
+    '''Journal :: submit :: Should record only the processes that are waited for'''
+
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setattr(jason, 'submit_process', lambda rover_file, **_: ({'id': 5}, 200))
+
+    assert commands.submit('test/jason_gnss_test_file_rover.txt') == 5
+    assert journal.load() == {}
+
+    assert commands.submit('test/jason_gnss_test_file_rover.txt', record=True) == 5
+    assert journal.load()['5']['state'] == journal.SUBMITTED
+
+# ------------------------------------------------------------------------------
+
+def test_failed_segment_group(tmp_path, monkeypatch):
+    '''Journal :: segments that cannot be merged :: Should end the group only if a segment failed'''
+
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+
+    journal.record(1, journal.DOWNLOADED, group='a', segment=0, segments=2, results_file='results_1.zip')
+    journal.record(2, journal.POLLING, group='a', segment=1, segments=2)
+    journal.record(3, journal.DOWNLOADED, group='b', segment=0, segments=2, results_file='results_3.zip')
+    journal.record(4, journal.ERROR, group='b', segment=1, segments=2)
+
+    assert commands.__merge_segments__('a') is None
+    assert commands.__merge_segments__('b') is None
+
+    # Pending segments can still be resumed
+    assert [e['process_id'] for e in journal.get_unfinished()] == ['1', '2']
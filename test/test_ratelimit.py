@@ -0,0 +1,104 @@
+import concurrent.futures
+import threading
+import time
+import types
+
+import jason_gnss.jason as jason
+import jason_gnss.ratelimit as ratelimit
+import jason_gnss.transport as transport
+
+# ------------------------------------------------------------------------------
+
+def test_token_bucket():
+    '''Rate limit :: token bucket :: Should not exceed the rate after the burst'''
+
+    bucket = ratelimit.TokenBucket(50, capacity=1)
+
+    tic = time.time()
+    for _ in range(6):
+        bucket.acquire()
+
+    assert time.time() - tic >= 0.09
+
+# ------------------------------------------------------------------------------
+
+def test_shared_token_bucket(tmp_path):
+    '''Rate limit :: shared token bucket :: Should be shared by several instances'''
+
+    filename = str(tmp_path / 'bucket.json')
+    buckets = [ratelimit.SharedTokenBucket(filename, 50, capacity=1) for _ in range(3)]
+
+    tic = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda b: [b.acquire() for _ in range(2)], buckets))
+
+    assert time.time() - tic >= 0.09
+
+# ------------------------------------------------------------------------------
+
+def test_max_uploads(tmp_path):
+    '''Rate limit :: concurrent uploads :: Should not exceed the maximum uploads'''
+
+    running = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def upload(limiter):
+        with limiter.request(upload=True):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    for limiter in [ratelimit.RateLimiter(max_uploads=2),
+                    ratelimit.RateLimiter(max_uploads=2, shared_folder=str(tmp_path))]:
+        peak[0] = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(upload, [limiter] * 6))
+
+        assert peak[0] == 2
+
+# ------------------------------------------------------------------------------
+
+def test_request_throttled(monkeypatch):
+    '''Rate limit :: throttled request :: Should retry after the requested delay'''
+
+    class Response(object):
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.headers = {'Retry-After': '0'}
+
+    responses = [Response(429), Response(429), Response(200)]
+    monkeypatch.setattr(transport, '__transport__',
+                        types.SimpleNamespace(request=lambda method, url, **kwargs: responses.pop(0)))
+
+    r = jason.__request__('get', 'http://localhost/status')
+
+    assert r.status_code == 200
+    assert responses == []
+
+# ------------------------------------------------------------------------------
+
+def test_max_requests():
+    '''Rate limit :: concurrent requests :: Should not exceed the concurrency budget'''
+
+    limiter = ratelimit.RateLimiter(max_requests=3)
+    running = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def request(upload):
+        with limiter.request(upload=upload):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(request, [False, True] * 4))
+
+    assert peak[0] == 3
@@ -0,0 +1,97 @@
+import datetime
+
+import jason_gnss.rinex as rinex
+
+ROVER_FILE = 'test/jason_gnss_test_file_rover.txt'
+BASE_FILE = 'test/jason_gnss_test_file_base.txt'
+
+T0 = datetime.datetime(2017, 2, 22, 10, 26, 0)
+
+RINEX3_FILE_CONTENTS = (
+    '     3.03           OBSERVATION DATA    G                   RINEX VERSION / TYPE\n'
+    'G    2 C1C L1C                                              SYS / # / OBS TYPES\n'
+    '  2017     2    22    10    26    0.0000000     GPS         TIME OF FIRST OBS\n'
+    '                                                            END OF HEADER\n'
+    '> 2017 02 22 10 26  0.0000000  0  2\n'
+    'G01  20321855.603   -133087.593\n'
+    'G02  21252572.651    144841.391\n'
+    '> 2017 02 22 10 26  0.5000000  5  0\n'
+    '> 2017 02 22 10 26  1.0000000  0  1\n'
+    'G01  20321639.623   -134226.539\n'
+)
+
+# ------------------------------------------------------------------------------
+
+def test_get_version():
+    '''RINEX :: get version :: Should return None for non RINEX files'''
+
+    assert rinex.get_version(ROVER_FILE) == 2.11
+    assert rinex.get_version('test/jason_gnss_test_file_smartphone.txt') is None
+    assert rinex.get_version('test/ubx_with_tim_tp.ubx') is None
+
+# ------------------------------------------------------------------------------
+
+def test_get_time_span():
+    '''RINEX :: time span :: Should return first and last epochs'''
+
+    first, last = rinex.get_time_span(ROVER_FILE)
+
+    assert first == T0
+    assert last == T0 + datetime.timedelta(seconds=59)
+
+# ------------------------------------------------------------------------------
+
+def test_iter_epochs_rinex3(tmp_path):
+    '''RINEX :: iterate epochs of a RINEX 3 file :: Should return events as well'''
+
+    filename = str(tmp_path / 'rover.obs')
+    with open(filename, 'w') as fh:
+        fh.write(RINEX3_FILE_CONTENTS)
+
+    with open(filename, 'r') as fh:
+        header = rinex.read_header(fh)
+        epochs = list(rinex.iter_epochs(fh, header))
+
+    assert [e.flag for e in epochs] == [0, 5, 0]
+    assert [len(e.lines) for e in epochs] == [3, 1, 2]
+    assert epochs[1].time == T0 + datetime.timedelta(seconds=0.5)
+
+# ------------------------------------------------------------------------------
+
+def test_trim(tmp_path):
+    '''RINEX :: trim :: Should keep the header and the epochs in the window'''
+
+    output_filename = str(tmp_path / 'base.obs')
+    start = T0 + datetime.timedelta(seconds=10)
+    end = T0 + datetime.timedelta(seconds=19)
+
+    rinex.trim(BASE_FILE, start, end, output_filename=output_filename)
+
+    assert rinex.get_time_span(output_filename) == (start, end)
+
+    with open(BASE_FILE, 'r') as fh:
+        header = rinex.read_header(fh)
+    with open(output_filename, 'r') as fh:
+        trimmed_header = rinex.read_header(fh)
+
+    assert len(header) == len(trimmed_header)
+    for line, trimmed_line in zip(header, trimmed_header):
+        if 'TIME OF FIRST OBS' in line:
+            assert trimmed_line.startswith('  2017     2    22    10    26   10.0000000')
+        else:
+            assert line == trimmed_line
+
+# ------------------------------------------------------------------------------
+
+def test_trim_to_span():
+    '''RINEX :: trim to span :: Should not trim if the reference is not RINEX'''
+
+    assert rinex.trim_to_span(BASE_FILE, 'test/jason_gnss_test_file_smartphone.txt') is None
+
+    trimmed_file = rinex.trim_to_span(BASE_FILE, ROVER_FILE, margin=5)
+    try:
+        assert rinex.get_time_span(trimmed_file) == rinex.get_time_span(ROVER_FILE)
+    finally:
+        rinex.remove(trimmed_file)
+
+# ------------------------------------------------------------------------------
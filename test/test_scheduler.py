@@ -0,0 +1,155 @@
+import pytest
+
+import jason_gnss.commands as commands
+import jason_gnss.jason as jason
+import jason_gnss.journal as journal
+import jason_gnss.scheduler as scheduler
+
+# ------------------------------------------------------------------------------
+
+def build_job(job_id, project, priority=0, state=scheduler.QUEUED, **info):
+
+    job = {'job_id': job_id, 'project': project, 'priority': priority, 'state': state}
+    job.update(info)
+
+    return job
+
+# ------------------------------------------------------------------------------
+
+def test_select_priority_and_fairness():
+    '''Scheduler :: select :: Should serve priorities first and share slots between projects'''
+
+    jobs = [build_job('b{}'.format(i), 'bulk') for i in range(5)] + \
+           [build_job('c1', 'customer'), build_job('c2', 'customer'), build_job('u1', 'urgent', priority=10)]
+
+    assert [job['job_id'] for job in scheduler.select(jobs, 4)] == ['u1', 'b0', 'c1', 'b1']
+
+    # Projects with fewer jobs in flight go first
+    jobs.append(build_job('b9', 'bulk', state=scheduler.SUBMITTED, submitted_at=1))
+    assert [job['job_id'] for job in scheduler.select(jobs, 3)] == ['u1', 'c1', 'b0']
+
+    # Then the ones served least recently, including the jobs selected now
+    jobs = [build_job('b0', 'bulk'), build_job('b1', 'bulk'), build_job('c0', 'customer'),
+            build_job('c1', 'customer'), build_job('b8', 'bulk', state=scheduler.DOWNLOADED, submitted_at=2),
+            build_job('c9', 'customer', state=scheduler.DOWNLOADED, submitted_at=1)]
+    assert [job['job_id'] for job in scheduler.select(jobs, 4)] == ['c0', 'b0', 'c1', 'b1']
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    '''Fake API in which processes end after 2 status requests'''
+
+    state = {'submitted': [], 'polls': {}, 'in_flight': 0, 'max_in_flight': 0, 'rejections': []}
+
+    def submit(rover_file, **_):
+        if state['rejections']:
+            return None, state['rejections'].pop(0)
+        process_id = len(state['submitted']) + 1
+        state['submitted'].append(rover_file)
+        state['in_flight'] += 1
+        state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+        return process_id, 200
+
+    def get_status(process_id, **_):
+        state['polls'][process_id] = state['polls'].get(process_id, 0) + 1
+        if state['polls'][process_id] < 2:
+            return {'process': {'status': 'RUNNING'}}, 200
+        if state['polls'][process_id] == 2:
+            state['in_flight'] -= 1
+        return {'process': {'status': 'FINISHED'}}, 200
+
+    monkeypatch.setattr(commands, '__submit__', submit)
+    monkeypatch.setattr(jason, 'get_status', get_status)
+    monkeypatch.setattr(jason, 'download_results', lambda process_id, **_: 'results_{}.zip'.format(process_id))
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+
+    return state
+
+# ------------------------------------------------------------------------------
+
+def test_run(api, tmp_path):
+    '''Scheduler :: run :: Should keep at most max_in_flight jobs in the server'''
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+
+    for i in range(4):
+        scheduler.enqueue('bulk_{}.obs'.format(i), project='bulk', queue_file=queue_file)
+    scheduler.enqueue('urgent.obs', project='urgent', priority=5, queue_file=queue_file)
+
+    jobs = scheduler.run(max_in_flight=2, queue_file=queue_file, interval=0.01)
+
+    assert [f.split('/')[-1] for f in api['submitted']] == \
+           ['urgent.obs', 'bulk_0.obs', 'bulk_1.obs', 'bulk_2.obs', 'bulk_3.obs']
+    assert api['max_in_flight'] == 2
+    assert all(job['state'] == scheduler.DOWNLOADED for job in jobs)
+
+# ------------------------------------------------------------------------------
+
+def test_cancel(tmp_path):
+    '''Scheduler :: cancel :: Should only cancel queued jobs'''
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+
+    job_id = scheduler.enqueue('rover.obs', queue_file=queue_file)
+
+    assert scheduler.cancel(job_id, queue_file=queue_file)
+    assert not scheduler.cancel(job_id, queue_file=queue_file)
+    assert scheduler.load(queue_file=queue_file)[job_id]['state'] == scheduler.CANCELLED
+
+# ------------------------------------------------------------------------------
+
+def test_rejected_submissions(api, tmp_path):
+    '''Scheduler :: rejected submission :: Should retry on 429 and 5xx, and fail on the rest of 4xx'''
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+    api['rejections'] = [429, 503, 400]
+
+    jobs = [scheduler.enqueue('rover_{}.obs'.format(i), queue_file=queue_file) for i in range(2)]
+
+    scheduler.Scheduler(max_in_flight=1, queue_file=queue_file).step()
+    scheduler.Scheduler(max_in_flight=1, queue_file=queue_file).step()
+    assert [job['state'] for job in scheduler.load(queue_file=queue_file).values()] == [scheduler.QUEUED] * 2
+
+    scheduler.run(max_in_flight=1, queue_file=queue_file, interval=0.01)
+    states = scheduler.load(queue_file=queue_file)
+
+    assert states[jobs[0]]['state'] == scheduler.ERROR
+    assert states[jobs[0]]['error'] == 'Submission rejected (HTTP 400)'
+    assert states[jobs[1]]['state'] == scheduler.DOWNLOADED
+
+# ------------------------------------------------------------------------------
+
+def test_no_download(api, tmp_path):
+    '''Scheduler :: jobs without download :: Should not be resumed from the journal'''
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+
+    scheduler.enqueue('rover.obs', download=False, queue_file=queue_file)
+    scheduler.enqueue('rover_downloaded.obs', queue_file=queue_file)
+
+    jobs = scheduler.run(queue_file=queue_file, interval=0.01)
+
+    assert [job['state'] for job in jobs] == [scheduler.FINISHED, scheduler.DOWNLOADED]
+    assert list(journal.load()) == [str(jobs[1]['process_id'])]
+    assert journal.get_unfinished() == []
+
+# ------------------------------------------------------------------------------
+
+def test_invalid_status(api, monkeypatch, tmp_path):
+    '''Scheduler :: status without the process status :: Should keep the job in flight and retry'''
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+    get_status = jason.get_status
+    invalid_statuses = [({'process': {}}, 200), ({'message': 'Internal error'}, 200)]
+
+    monkeypatch.setattr(jason, 'get_status',
+                        lambda process_id, **kwargs: invalid_statuses.pop(0) if invalid_statuses
+                        else get_status(process_id, **kwargs))
+
+    job_id = scheduler.enqueue('rover.obs', queue_file=queue_file)
+
+    jobs = scheduler.run(queue_file=queue_file, interval=0.01)
+
+    assert not invalid_statuses
+    assert [(job['job_id'], job['state']) for job in jobs] == [(job_id, scheduler.DOWNLOADED)]
@@ -0,0 +1,93 @@
+import datetime
+import zipfile
+
+import jason_gnss.rinex as rinex
+import jason_gnss.segmentation as segmentation
+
+ROVER_FILE = 'test/jason_gnss_test_file_rover.txt'
+
+T0 = datetime.datetime(2017, 2, 22, 10, 26, 0)
+
+# ------------------------------------------------------------------------------
+
+def test_get_windows():
+    '''Segmentation :: windows :: Should cover the span with overlapping segments'''
+
+    windows = segmentation.get_windows(T0, T0 + datetime.timedelta(seconds=59), 20, overlap=4)
+
+    assert [((s - T0).total_seconds(), (e - T0).total_seconds()) for s, e in windows] == \
+           [(0, 22), (18, 42), (38, 59)]
+
+# ------------------------------------------------------------------------------
+
+def test_split():
+    '''Segmentation :: split RINEX file :: Should create one file per segment'''
+
+    segment_files = segmentation.split(ROVER_FILE, 20, overlap=4)
+
+    try:
+        spans = [rinex.get_time_span(f) for f in segment_files]
+    finally:
+        rinex.remove(segment_files[0])
+
+    assert len(segment_files) == 3
+    assert [((s - T0).total_seconds(), (e - T0).total_seconds()) for s, e in spans] == \
+           [(0, 22), (18, 42), (38, 59)]
+
+# ------------------------------------------------------------------------------
+
+def test_split_short_session():
+    '''Segmentation :: split file shorter than a segment :: Should return None'''
+
+    assert segmentation.split(ROVER_FILE, 3600) is None
+    assert segmentation.split('test/ubx_with_tim_tp.ubx', 10) is None
+
+# ------------------------------------------------------------------------------
+
+def test_merge_time_series():
+    '''Segmentation :: merge time series :: Should cut at the midpoint of the overlaps'''
+
+    def build(start, end):
+        rows = ['2100,{:.1f},41.0,2.0,100.0\n'.format(t) for t in range(start, end + 1)]
+        return ('#week,sow,lat,lon,hgt\n' + ''.join(rows)).encode('utf-8')
+
+    merged = segmentation.merge_time_series([build(0, 22), build(18, 42), build(38, 59)])
+    lines = merged.decode('utf-8').splitlines()
+
+    assert lines[0] == '#week,sow,lat,lon,hgt'
+    assert [float(line.split(',')[1]) for line in lines[1:]] == list(range(60))
+
+# ------------------------------------------------------------------------------
+
+def test_merge_not_time_series():
+    '''Segmentation :: lines without time tag after the first row :: Should not be stitched'''
+
+    contents = [b'0.0,1,2\n1.0,1,2\nTotal: 2 epochs\n', b'1.0,1,2\n2.0,1,2\nTotal: 2 epochs\n']
+
+    assert segmentation.merge_time_series(contents) is None
+    assert segmentation.merge_time_series([b'0.0,1,2\n\n1.0,1,2\n', b'2.0,1,2\n']) == b'0.0,1,2\n1.0,1,2\n2.0,1,2\n'
+
+# ------------------------------------------------------------------------------
+
+def test_merge_results(tmp_path):
+    '''Segmentation :: merge results bundles :: Should keep non time series per segment'''
+
+    results_files = []
+    for i, (start, end) in enumerate([(0, 10), (8, 20)]):
+        filename = str(tmp_path / 'results_{}.zip'.format(i))
+        with zipfile.ZipFile(filename, 'w') as z:
+            z.writestr('positions.csv', ''.join('{}.0,1,2\n'.format(t) for t in range(start, end + 1)))
+            z.writestr('report.pdf', b'%PDF')
+            z.writestr('summary.txt', '{}.0 First epoch\nFix ratio 98%\n'.format(start))
+        results_files.append(filename)
+
+    merged_file = segmentation.merge_results(results_files)
+
+    assert merged_file == str(tmp_path / 'results_0_merged.zip')
+    with zipfile.ZipFile(merged_file) as z:
+        assert sorted(z.namelist()) == ['positions.csv', 'segment_00/report.pdf', 'segment_00/summary.txt',
+                                        'segment_01/report.pdf', 'segment_01/summary.txt']
+        assert len(z.read('positions.csv').splitlines()) == 21
+        assert z.read('segment_01/summary.txt') == b'8.0 First epoch\nFix ratio 98%\n'
+
+# ------------------------------------------------------------------------------
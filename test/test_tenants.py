@@ -0,0 +1,194 @@
+import concurrent.futures
+import json
+import threading
+import time
+
+import pytest
+
+import jason_gnss.commands as commands
+import jason_gnss.hedging as hedging
+import jason_gnss.jason as jason
+import jason_gnss.journal as journal
+import jason_gnss.scheduler as scheduler
+import jason_gnss.tenants as tenants
+
+from jason_gnss import AuthenticationError
+
+from .server import StandInServer
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def registry(monkeypatch):
+    '''Empty registry of tenants'''
+
+    monkeypatch.setattr(tenants, '__tenants__', {})
+    monkeypatch.setattr(tenants, '__loaded__', True)
+    monkeypatch.delenv('JASON_API_KEY', raising=False)
+    monkeypatch.delenv('JASON_SECRET_TOKEN', raising=False)
+
+    yield
+
+    for name in tenants.get_names():
+        tenants.remove(name)
+
+# ------------------------------------------------------------------------------
+
+def test_credentials(registry, tmp_path):
+    '''Tenants :: credentials :: Should be taken from the tenant unless explicitly given'''
+
+    filename = str(tmp_path / 'tenants.json')
+    with open(filename, 'w') as fh:
+        json.dump({'customer_a': {'api_key': 'key_a', 'secret_token': 'token_a', 'rate': 10},
+                   'customer_b': {'api_key': 'key_b', 'secret_token': 'token_b', 'max_requests': 2}}, fh)
+
+    assert tenants.load(filename) == ['customer_a', 'customer_b']
+
+    customer_a = tenants.get('customer_a')
+    customer_b = tenants.get('customer_b')
+
+    assert jason.__fetch_credentials__(None, None, customer_a) == ('key_a', 'token_a')
+    assert jason.__fetch_credentials__('key', None, customer_b) == ('key', 'token_b')
+    assert customer_a.transport is not customer_b.transport
+    assert 'token_a' not in repr(customer_a)
+
+    with pytest.raises(AuthenticationError):
+        tenants.get('customer_c')
+
+    with pytest.raises(AuthenticationError):
+        jason.__fetch_credentials__(None, None, None)
+
+
+def test_default_file(registry, monkeypatch, tmp_path):
+    '''Tenants :: default file :: Should not replace the tenants already registered'''
+
+    filename = str(tmp_path / 'tenants.json')
+    with open(filename, 'w') as fh:
+        json.dump({'customer_a': {'api_key': 'file_key_a', 'secret_token': 'file_token_a'},
+                   'customer_b': {'api_key': 'key_b', 'secret_token': 'token_b'}}, fh)
+
+    monkeypatch.setattr(tenants, 'TENANTS_FILE', filename)
+    monkeypatch.setattr(tenants, '__loaded__', False)
+
+    customer_a = tenants.register('customer_a', 'key_a', 'token_a')
+
+    assert tenants.get('customer_a') is customer_a
+    assert tenants.get('customer_b').api_key == 'key_b'
+    assert tenants.get_names() == ['customer_a', 'customer_b']
+
+# ------------------------------------------------------------------------------
+
+class FakeTransport(object):
+    '''Transport that answers the API status after the delay given by `wait`'''
+
+    def __init__(self, wait):
+
+        self.wait = wait
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **_):
+
+        with self.lock:
+            self.requests += 1
+            attempt = self.requests
+
+        self.wait(attempt)
+
+        response = lambda: None
+        response.status_code, response.headers = 200, {}
+        response.json = lambda: {'success': True, 'version': 'fake'}
+
+        return response
+
+    def close(self):
+        pass
+
+# ------------------------------------------------------------------------------
+
+def test_isolation(registry, monkeypatch):
+    '''Tenants :: concurrency budget :: Should not delay the requests of other tenants'''
+
+    tenants.register('bulk', 'key_bulk', 'token_bulk', max_requests=1)
+    tenants.register('urgent', 'key_urgent', 'token_urgent')
+
+    with StandInServer(latency=0.2) as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            tic = time.time()
+            bulk = [executor.submit(jason.api_status, tenant='bulk') for _ in range(4)]
+
+            time.sleep(0.05)
+            assert jason.api_status(tenant='urgent')['version'] == 'stand-in'
+            urgent_time = time.time() - tic
+
+            assert all(future.result()['version'] == 'stand-in' for future in bulk)
+            bulk_time = time.time() - tic
+
+    # Bulk requests are issued one at a time
+    assert bulk_time >= 0.8
+    assert urgent_time < 0.5
+
+
+def test_hedging_isolation(registry, monkeypatch):
+    '''Tenants :: hedged requests :: Should not be delayed by the backlog of other tenants'''
+
+    monkeypatch.setattr(hedging, '__hedger__', hedging.Hedger(default_delay=0.05, max_workers=4))
+
+    release = threading.Event()
+    tenants.register('bulk', 'key_bulk', 'token_bulk', max_requests=1,
+                     transport=FakeTransport(lambda attempt: release.wait(5)))
+    # The first request of the urgent tenant is slow, its hedged copy is not
+    tenants.register('urgent', 'key_urgent', 'token_urgent',
+                     transport=FakeTransport(lambda attempt: time.sleep(1.0 if attempt == 1 else 0)))
+
+    # More bulk requests waiting for their limits than hedging threads
+    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+        bulk = [executor.submit(jason.api_status, tenant='bulk') for _ in range(20)]
+        time.sleep(0.1)
+
+        try:
+            tic = time.time()
+            assert jason.api_status(tenant='urgent') == {'version': 'fake'}
+            assert time.time() - tic < 0.5
+        finally:
+            release.set()
+
+        assert all(future.result() == {'version': 'fake'} for future in bulk)
+
+# ------------------------------------------------------------------------------
+
+def test_scheduler(registry, monkeypatch, tmp_path):
+    '''Tenants :: scheduler :: Should submit and poll each job with its tenant'''
+
+    tenants.register('customer_a', 'key_a', 'token_a')
+
+    submitted = []
+
+    def submit(rover_file, tenant=None, **_):
+        tenants.get(tenant)
+        submitted.append(tenant)
+        return len(submitted), 200
+
+    polled = []
+
+    def get_status(process_id, tenant=None, **_):
+        polled.append(tenant)
+        return {'process': {'status': 'FINISHED'}}, 200
+
+    monkeypatch.setattr(commands, '__submit__', submit)
+    monkeypatch.setattr(jason, 'get_status', get_status)
+    monkeypatch.setattr(journal, 'JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+
+    queue_file = str(tmp_path / 'queue.jsonl')
+    scheduler.enqueue('rover_a.obs', download=False, tenant=tenants.get('customer_a'), queue_file=queue_file)
+    scheduler.enqueue('rover.obs', download=False, queue_file=queue_file)
+    scheduler.enqueue('rover_c.obs', download=False, tenant='customer_c', queue_file=queue_file)
+
+    jobs = scheduler.run(queue_file=queue_file, interval=0.01)
+
+    # Jobs are submitted concurrently
+    assert sorted(submitted, key=str) == [None, 'customer_a']
+    assert polled == ['customer_a', None]
+    assert [job['state'] for job in jobs] == [scheduler.FINISHED, scheduler.FINISHED, scheduler.ERROR]
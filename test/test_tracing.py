@@ -0,0 +1,118 @@
+import gzip
+import os
+
+import pytest
+
+import jason_gnss.jason as jason
+import jason_gnss.tracing as tracing
+
+from .replay import ReplayServer, replay
+from .server import StandInServer
+
+ROVER_FILE = os.path.abspath(os.path.join('test', 'jason_gnss_test_file_rover.txt'))
+
+API_KEY = 'secret_api_key'
+SECRET_TOKEN = 'secret_user_token'
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def trace(monkeypatch, tmp_path):
+    '''Trace of a session (submission, polling until finished and download)'''
+
+    monkeypatch.setenv('JASON_API_KEY', API_KEY)
+    monkeypatch.setenv('JASON_SECRET_TOKEN', SECRET_TOKEN)
+
+    filename = str(tmp_path / 'trace.jsonl.gz')
+
+    with StandInServer(processing_time=0.3, capabilities=['gzip']) as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        tracing.start(filename)
+        try:
+            jason.api_status()
+            ret, _ = jason.submit_process(ROVER_FILE, compression='gzip')
+            status = 'RUNNING'
+            while status != 'FINISHED':
+                status = jason.get_status(ret['id'], use_cache=False)[0]['process']['status']
+            jason.list_processes()
+            # Results are downloaded to the working folder
+            with monkeypatch.context() as m:
+                m.chdir(tmp_path)
+                jason.download_results(ret['id'], connections=1)
+        finally:
+            tracing.stop()
+
+    return filename
+
+# ------------------------------------------------------------------------------
+
+def test_record(trace):
+    '''Tracing :: record :: Should record the requests without credentials nor file contents'''
+
+    with gzip.open(trace, 'rt') as fh:
+        content = fh.read()
+
+    assert API_KEY not in content
+    assert SECRET_TOKEN not in content
+    assert not tracing.is_enabled()
+
+    records = tracing.load(trace)
+    kinds = [r['kind'] for r in records]
+
+    assert kinds[:2] == [tracing.API_STATUS, tracing.SUBMIT]
+    assert set(kinds) == {tracing.API_STATUS, tracing.SUBMIT, tracing.STATUS, tracing.PROCESSES, tracing.RESULTS}
+
+    upload = records[1]['upload']
+    assert upload['rover_file'] == {'size': os.path.getsize(ROVER_FILE), 'extension': '.txt'}
+    assert upload['token'] == tracing.TOKEN_PLACEHOLDER
+    assert upload['encoding'] == 'gzip'
+
+    statuses = [r['json']['process']['status'] for r in records if r['kind'] == tracing.STATUS]
+    assert statuses[0] == 'RUNNING'
+    assert statuses[-1] == 'FINISHED'
+
+    results = [r for r in records if r['kind'] == tracing.RESULTS]
+    assert results[0]['size'] > 0
+
+
+def test_replay(trace, monkeypatch):
+    '''Tracing :: replay :: Should serve and replay the recorded traffic faster'''
+
+    records = tracing.load(trace)
+
+    with ReplayServer(records, speed=10) as server:
+        stats = replay(records, server.api_url, speed=10, concurrency=2)
+
+        processes = list(server.processes)
+        assert len(processes) == 2
+        assert server.get_status(processes[0])['process']['status'] == 'FINISHED'
+
+    assert all(stats[kind]['errors'] == 0 for kind in stats)
+    assert len(stats[tracing.SUBMIT]['times']) == 2
+    assert len(stats[tracing.STATUS]['times']) == 2 * len([r for r in records if r['kind'] == tracing.STATUS])
+    assert len(stats[tracing.RESULTS]['times']) >= 2
+
+# ------------------------------------------------------------------------------
+
+def test_record_errors(monkeypatch, tmp_path):
+    '''Tracing :: recording fails :: Should not fail the request'''
+
+    monkeypatch.setenv('JASON_API_KEY', API_KEY)
+    monkeypatch.setenv('JASON_SECRET_TOKEN', SECRET_TOKEN)
+
+    with StandInServer() as server:
+        monkeypatch.setattr(jason, 'API_URL', server.api_url)
+
+        tracing.start(str(tmp_path / 'trace.jsonl.gz'))
+        try:
+            # Trace file closed while recording (e.g. stop racing with a request)
+            tracing.__recorder__.fh.close()
+            assert jason.api_status()['version'] == 'stand-in'
+
+            # Size of an uploaded file that cannot be taken
+            monkeypatch.setattr(tracing, '__get_size__', lambda fh: 1 / 0)
+            ret, status_code = jason.submit_process(ROVER_FILE, compression='none')
+            assert status_code == 200
+        finally:
+            tracing.stop()
@@ -0,0 +1,92 @@
+import filecmp
+import os
+
+import pytest
+import requests
+
+import jason_gnss.download as download
+import jason_gnss.jason as jason
+import jason_gnss.transport as transport
+
+from jason_gnss.deadline import Deadline
+
+from .server import StandInServer
+
+ROVER_FILE = os.path.abspath('test/jason_gnss_test_file_rover.txt')
+
+# ------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module')
+def server():
+
+    with StandInServer(bundle_size=1024 * 1024 + 123) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture(params=transport.get_available())
+def api(request, server, monkeypatch):
+    '''API calls through each of the available transports'''
+
+    monkeypatch.setenv('JASON_API_KEY', 'key')
+    monkeypatch.setenv('JASON_SECRET_TOKEN', 'token')
+    monkeypatch.setattr(jason, 'API_URL', server.api_url)
+    monkeypatch.setattr(jason, '__capabilities__', {})
+    monkeypatch.setattr(transport, '__transport__', transport.create(request.param))
+
+    yield server
+
+    transport.get().close()
+
+# ------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+def test_submit_and_download(api, compression, tmp_path, monkeypatch):
+    '''Transport :: submission, status and download :: Should work with every transport'''
+
+    monkeypatch.chdir(tmp_path)
+
+    ret, status_code = jason.submit_process(ROVER_FILE, compression=compression)
+    assert status_code == 200
+
+    uploaded_bytes = api.processes[ret['id']]['size']
+    if compression == 'none':
+        assert uploaded_bytes > os.path.getsize(ROVER_FILE)
+    else:
+        assert uploaded_bytes < os.path.getsize(ROVER_FILE) / 3
+
+    status, status_code = jason.get_status(ret['id'], use_cache=False)
+    assert status_code == 200 and status['process']['status'] == 'FINISHED'
+
+    assert ret['id'] in [p['id'] for p in jason.list_processes()]
+
+    results_file = jason.download_results(ret['id'], connections=3)
+    assert filecmp.cmp(results_file, api.bundle_file, shallow=False)
+
+    filename = str(tmp_path / 'segments.zip')
+    download.download(api.results_url, filename, connections=4, segment_size=256 * 1024)
+    assert filecmp.cmp(filename, api.bundle_file, shallow=False)
+
+# ------------------------------------------------------------------------------
+
+def test_errors(api, monkeypatch):
+    '''Transport :: network errors :: Should be raised as the exceptions of requests'''
+
+    monkeypatch.setattr(api, 'latency', 0.5)
+    with pytest.raises(requests.exceptions.Timeout):
+        jason.api_status(deadline=Deadline(0.1))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        transport.get().request('get', 'http://127.0.0.1:1/api/status', timeout=(1, 1))
+
+# ------------------------------------------------------------------------------
+
+def test_configure(monkeypatch):
+    '''Transport :: configure :: Should create the transports by name'''
+
+    monkeypatch.setattr(transport, '__transport__', None)
+
+    transport.configure('urllib3', pool_size=4)
+    assert isinstance(transport.get(), transport.Urllib3Transport)
+
+    with pytest.raises(ValueError):
+        transport.configure('unknown')